@@ -0,0 +1,68 @@
+"""
+Micro-benchmark da formatação de tabelas: apply/iterrows linha a linha x colunas vetorizadas
+
+Uso:  python -m benchmarks.bench_formatos [linhas]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from oficina.formatos import fmt_moeda, fmt_km
+from oficina.formatos_series import fmt_moeda_series, fmt_km_series
+
+
+def gerar(n):
+    rng = np.random.default_rng(42)
+    return pd.DataFrame({
+        'id':       np.arange(1, n + 1),
+        'nome':     [f"Cliente {i}" for i in range(n)],
+        'placa':    [f"ABC{i % 10000:04d}" for i in range(n)],
+        'marca':    rng.choice(["Fiat", "Ford", "VW"], n),
+        'modelo':   rng.choice(["Uno", "Ka", "Gol"], n),
+        'km':       rng.integers(0, 400_000, n),
+        'valor':    rng.integers(0, 5_000_000, n) / 100,
+    })
+
+
+def por_linha(df):
+    """Caminho original: apply elemento a elemento e dicts via iterrows"""
+    vf = df['valor'].apply(fmt_moeda)
+    kf = df['km'].apply(fmt_km)
+    opts = {f"{r['placa']} — {r['marca']} {r['modelo']}": r['id'] for _, r in df.iterrows()}
+    return vf, kf, opts
+
+
+def vetorizado(df):
+    vf = fmt_moeda_series(df['valor'])
+    kf = fmt_km_series(df['km'])
+    opts = dict(zip(df['placa'] + " — " + df['marca'] + " " + df['modelo'], df['id']))
+    return vf, kf, opts
+
+
+def medir(rotulo, fn, rep=3):
+    t = min(timeit.repeat(fn, number=1, repeat=rep))
+    print(f"  {rotulo:<34} {t * 1e3:>10.1f} ms")
+    return t
+
+
+def main(n=20_000):
+    df = gerar(n)
+    a, b = por_linha(df), vetorizado(df)
+    assert a[0].tolist() == b[0].tolist() and a[1].tolist() == b[1].tolist() and a[2] == b[2]
+
+    print(f"{n} linhas")
+    print("Somente colunas (moeda + km)")
+    x = medir("apply (original)", lambda: (df['valor'].apply(fmt_moeda), df['km'].apply(fmt_km)))
+    y = medir("fmt_*_series", lambda: (fmt_moeda_series(df['valor']), fmt_km_series(df['km'])))
+    print(f"  ganho: {x / y:.1f}x")
+    print("Colunas + opções de selectbox")
+    x = medir("apply + iterrows (original)", lambda: por_linha(df))
+    y = medir("series + zip", lambda: vetorizado(df))
+    print(f"  ganho: {x / y:.1f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20_000)
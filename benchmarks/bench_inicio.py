@@ -0,0 +1,69 @@
+"""
+Partida a frio e custo fixo de cada rerun do app (via streamlit.testing)
+
+Cada amostra roda num interpretador novo: importa o Streamlit (o servidor
+já o tem carregado) e mede o primeiro run do script até a tela de login —
+imports do app + inicialização do banco — e depois a média dos reruns na
+tela de login e numa página leve com usuário logado.
+
+Uso:  python -m benchmarks.bench_inicio [amostras]
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+from benchmarks import gerar_dados
+from oficina import db
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_AMOSTRA = r"""
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t0 = time.perf_counter(); at.run(); primeiro = time.perf_counter() - t0
+assert not at.exception, at.exception
+mods = sorted(m for m in ("reportlab", "qrcode") if m in sys.modules)
+n = 20
+t0 = time.perf_counter()
+for _ in range(n): at.run()
+login = (time.perf_counter() - t0) / n
+for k, v in dict(logged_in=True, user_id=1, user_nome="Admin", user_nivel="admin").items():
+    at.session_state[k] = v
+at.run(); at.sidebar.radio[0].set_value("🔑 Alterar Senha").run()
+t0 = time.perf_counter()
+for _ in range(n): at.run()
+pagina = (time.perf_counter() - t0) / n
+print(json.dumps({"primeiro": primeiro, "login": login, "pagina": pagina, "modulos": mods}))
+"""
+
+
+def amostra(app, env):
+    r = subprocess.run([sys.executable, "-c", _AMOSTRA, app], env=env, cwd=RAIZ,
+                       capture_output=True, text=True, check=True)
+    return json.loads(r.stdout.strip().splitlines()[-1])
+
+
+def main(amostras=5):
+    pasta = tempfile.mkdtemp()
+    db.DB = os.path.join(pasta, "oficina.db")
+    gerar_dados.gerar(1000)
+    db.fechar_conexoes()
+    env = dict(os.environ, OFICINA_DB=db.DB)
+    app = os.path.join(RAIZ, "sistema_oficina_completo.py")
+    rs = [amostra(app, env) for _ in range(amostras)]
+
+    def ms(k): return statistics.median(r[k] for r in rs) * 1e3
+    print(f"{amostras} amostras (mediana)")
+    print(f"  primeiro run até o login       {ms('primeiro'):>8.1f} ms")
+    print(f"  rerun na tela de login         {ms('login'):>8.1f} ms")
+    print(f"  rerun de página leve (logado)  {ms('pagina'):>8.1f} ms")
+    print(f"  módulos pesados carregados: {', '.join(rs[0]['modulos']) or 'nenhum'}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
@@ -0,0 +1,68 @@
+"""
+Micro-benchmark do PIX: CRC16 bit a bit x tabela, QR Code sem x com memoização
+
+Uso:  python -m benchmarks.bench_pix [repeticoes]
+"""
+
+import io
+import sys
+import timeit
+
+import qrcode
+
+from oficina import pix
+
+CHAVE, VALOR = "19995056708", 1234.56
+
+
+def crc16_bit_a_bit(data):
+    """Implementação original (um laço por bit), mantida só para comparação"""
+    crc = 0xFFFF
+    for byte in data.encode('utf-8'):
+        crc ^= byte << 8
+        for _ in range(8):
+            if crc & 0x8000:
+                crc = (crc << 1) ^ 0x1021
+            else:
+                crc = crc << 1
+            crc &= 0xFFFF
+    return f"{crc:04X}"
+
+
+def qrcode_sem_cache(payload):
+    qr = qrcode.QRCode(version=1, error_correction=qrcode.constants.ERROR_CORRECT_M,
+                       box_size=10, border=2)
+    qr.add_data(payload); qr.make(fit=True)
+    buf = io.BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buf, format='PNG')
+    return buf
+
+
+def medir(rotulo, fn, n):
+    t = min(timeit.repeat(fn, number=n, repeat=3)) / n
+    print(f"  {rotulo:<34} {t * 1e6:>12.2f} µs/chamada")
+    return t
+
+
+def main(n=200):
+    payload = pix.payload_pix(CHAVE, VALOR)
+    assert crc16_bit_a_bit(payload[:-4]) == pix.crc16_ccitt(payload[:-4]) == payload[-4:]
+
+    print("CRC16-CCITT")
+    a = medir("bit a bit (original)", lambda: crc16_bit_a_bit(payload), n * 50)
+    b = medir("tabela de 256 entradas", lambda: pix.crc16_ccitt(payload), n * 50)
+    print(f"  ganho: {a / b:.1f}x")
+
+    print("QR Code PIX completo (payload + PNG)")
+    a = medir("sem cache (original)", lambda: qrcode_sem_cache(payload), max(n // 10, 5))
+    pix.gerar_qrcode_pix(CHAVE, VALOR)
+    b = medir("memoizado (mesma chave/valor)", lambda: pix.gerar_qrcode_pix(CHAVE, VALOR), n * 50)
+    print(f"  ganho: {a / b:.0f}x")
+
+    print("Somente texto copia e cola")
+    pix.payload_pix.cache_clear()
+    medir("payload_pix (sem memo)", lambda: pix.payload_pix.__wrapped__(CHAVE, VALOR), n * 50)
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,178 @@
+"""
+Gerador de dados sintéticos (determinístico pela semente) para benchmarks
+
+Preenche um banco de rascunho com clientes, carros (marcas/modelos de
+MODELOS_POR_MARCA), catálogo, orçamentos com itens e os serviços
+realizados dos orçamentos aprovados/finalizados. A escala é o número de
+orçamentos; as demais tabelas crescem na mesma proporção. Datas em ISO,
+distribuídas nos dois anos anteriores a REFERENCIA e crescentes com o id,
+como num banco real.
+
+Uso:  python -m benchmarks.gerar_dados /tmp/oficina_100k.db --escala 100000 [--semente 42]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from oficina import db
+from oficina.formatos import FORMATO_ISO
+from oficina.migracoes import migrar
+from oficina.veiculos import MODELOS_POR_MARCA, chave_placa
+
+REFERENCIA = datetime(2026, 1, 1, 8, 0)
+DIAS = 730
+LOTE = 20_000          # linhas por executemany
+
+CLIENTES_POR_ORCAMENTO = 0.25
+CARROS_POR_CLIENTE = 1.3
+ITENS_CATALOGO = 250
+STATUS_PESOS = {"PENDENTE": 30, "APROVADO": 35, "RECUSADO": 10, "FINALIZADO": 25}
+
+_NOMES = ("Ana", "Bruno", "Carla", "Daniel", "Eduardo", "Fernanda", "Gabriel", "Helena", "Igor",
+          "Juliana", "Karina", "Lucas", "Mariana", "Nelson", "Otávio", "Patrícia", "Rafael",
+          "Sandra", "Thiago", "Vanessa", "Wagner", "José", "Maria", "Antônio", "Francisco")
+_SOBRENOMES = ("Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira", "Alves", "Pereira",
+               "Lima", "Gomes", "Costa", "Ribeiro", "Martins", "Carvalho", "Almeida", "Lopes",
+               "Soares", "Fernandes", "Vieira", "Barbosa", "Rocha", "Dias", "Nascimento", "Moreira")
+_RUAS = ("Rua das Flores", "Av. Brasil", "Rua XV de Novembro", "Rua São João", "Av. Paulista",
+         "Rua Sete de Setembro", "Rua Tiradentes", "Av. Independência", "Rua Santos Dumont")
+_SERVICOS = ("Troca de óleo", "Alinhamento", "Balanceamento", "Troca de pastilhas", "Revisão",
+             "Troca de correia dentada", "Limpeza de bicos", "Troca de amortecedor", "Embreagem",
+             "Troca de velas", "Higienização do ar-condicionado", "Troca de filtro de ar",
+             "Diagnóstico eletrônico", "Troca de bateria", "Retífica de discos", "Suspensão")
+_OBS = ("", "", "", "Cliente aguarda no local", "Peças por conta do cliente", "Retorno em 30 dias",
+        "Urgente")
+
+
+def _lotes(linhas, tamanho=LOTE):
+    lote = []
+    for linha in linhas:
+        lote.append(linha)
+        if len(lote) >= tamanho:
+            yield lote; lote = []
+    if lote: yield lote
+
+
+def _placa(rnd, usadas):
+    while True:
+        p = ("".join(rnd.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=3)) + str(rnd.randrange(10))
+             + rnd.choice("ABCDEFGHIJ0123456789") + f"{rnd.randrange(100):02d}")
+        if chave_placa(p) not in usadas:   # antiga e Mercosul da mesma placa colidem
+            usadas.add(chave_placa(p)); return p
+
+
+def gerar(escala, semente=42, progresso=None):
+    """Preenche o banco atual (db.DB, já vazio ou recém-criado) com `escala` orçamentos.
+
+    Retorna {tabela: linhas inseridas}.
+    """
+    rnd = random.Random(semente)
+    n_cli = max(1, int(escala * CLIENTES_POR_ORCAMENTO))
+    n_car = max(n_cli, int(n_cli * CARROS_POR_CLIENTE))
+    marcas = sorted(m for m, modelos in MODELOS_POR_MARCA.items() if modelos)
+    contagem = {}
+
+    conn = db.get_conn(); migrar(conn); conn.close()
+
+    def inserir(tabela, sql, linhas):
+        with db.transacao() as c:
+            for lote in _lotes(linhas):
+                c.executemany(sql, lote)
+                contagem[tabela] = contagem.get(tabela, 0) + len(lote)
+                if progresso: progresso(tabela, contagem[tabela])
+
+    inserir("clientes", "INSERT INTO clientes(id,nome,telefone,logradouro,numero) VALUES(?,?,?,?,?)",
+            ((i, f"{rnd.choice(_NOMES)} {rnd.choice(_SOBRENOMES)} {rnd.choice(_SOBRENOMES)}",
+              f"({rnd.randint(11, 99)}) 9{rnd.randint(1000, 9999)}-{rnd.randint(1000, 9999)}",
+              rnd.choice(_RUAS), str(rnd.randint(1, 3000))) for i in range(1, n_cli + 1)))
+
+    # Todo cliente tem ao menos um carro; os demais vão para clientes sorteados
+    dono = [i for i in range(1, n_cli + 1)] + [rnd.randint(1, n_cli) for _ in range(n_car - n_cli)]
+    placas = set()
+
+    def carros():
+        for i, cid in enumerate(dono, 1):
+            marca = rnd.choice(marcas)
+            placa = _placa(rnd, placas)
+            yield (i, cid, placa, chave_placa(placa), rnd.choice(MODELOS_POR_MARCA[marca]), marca,
+                   rnd.randint(0, 300_000))
+    inserir("carros", "INSERT INTO carros(id,cliente_id,placa,placa_chave,modelo,marca,km) "
+                      "VALUES(?,?,?,?,?,?,?)", carros())
+    carros_de = {}
+    for carro_id, cid in enumerate(dono, 1):
+        carros_de.setdefault(cid, []).append(carro_id)
+
+    catalogo = [(i, f"{_SERVICOS[(i - 1) % len(_SERVICOS)]}" + (f" ({(i - 1) // len(_SERVICOS) + 1})"
+                                                                 if i > len(_SERVICOS) else ""),
+                 round(rnd.uniform(40, 2500), 2)) for i in range(1, ITENS_CATALOGO + 1)]
+    inserir("catalogo_servicos", "INSERT INTO catalogo_servicos(id,descricao,valor) VALUES(?,?,?)", catalogo)
+
+    status_pop, status_pesos = list(STATUS_PESOS), list(STATUS_PESOS.values())
+    inicio = REFERENCIA - timedelta(days=DIAS)
+    passo = DIAS * 86400 / escala
+    orcamentos, itens, servicos, itens_serv = [], [], [], []
+    id_item = id_serv = id_item_serv = 0
+    for oid in range(1, escala + 1):
+        data = (inicio + timedelta(seconds=oid * passo + rnd.uniform(0, passo))).strftime(FORMATO_ISO)
+        cid = rnd.randint(1, n_cli)
+        carro = rnd.choice(carros_de[cid])
+        status = rnd.choices(status_pop, status_pesos)[0]
+        obs = rnd.choice(_OBS)
+        linhas = []
+        for sid, desc, valor in rnd.sample(catalogo, rnd.randint(1, 5)):
+            qtd = rnd.choice((1, 1, 1, 2, 4))
+            id_item += 1
+            linhas.append((id_item, oid, sid, desc, qtd, valor, round(qtd * valor, 2)))
+        total = round(sum(l[6] for l in linhas), 2)
+        orcamentos.append((oid, cid, carro, data, status, total, obs))
+        itens.extend(linhas)
+        if status in ("APROVADO", "FINALIZADO"):
+            id_serv += 1
+            servicos.append((id_serv, oid, cid, carro, data, total, obs))
+            for l in linhas:
+                id_item_serv += 1
+                itens_serv.append((id_item_serv, id_serv, l[3], l[4], l[5], l[6]))
+
+    inserir("orcamentos", "INSERT INTO orcamentos(id,cliente_id,carro_id,data,status,total,observacoes) "
+                          "VALUES(?,?,?,?,?,?,?)", orcamentos)
+    inserir("itens_orcamento", "INSERT INTO itens_orcamento(id,orcamento_id,servico_id,descricao,"
+                               "quantidade,valor_unitario,subtotal) VALUES(?,?,?,?,?,?,?)", itens)
+    inserir("servicos_realizados", "INSERT INTO servicos_realizados(id,orcamento_id,cliente_id,carro_id,"
+                                   "data,total,observacoes) VALUES(?,?,?,?,?,?,?)", servicos)
+    inserir("itens_servico", "INSERT INTO itens_servico(id,servico_id,descricao,quantidade,"
+                             "valor_unitario,subtotal) VALUES(?,?,?,?,?,?)", itens_serv)
+    if db.backend() == "postgres":
+        # ids explícitos não avançam as sequências do SERIAL
+        with db.transacao() as c:
+            for t in contagem:
+                c.execute(f"SELECT setval(pg_get_serial_sequence('{t}','id'), (SELECT MAX(id) FROM {t}))")
+    else:
+        conn = db.get_conn(); conn.execute("ANALYZE"); conn.close()
+    return contagem
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Gera um banco de rascunho com dados sintéticos")
+    ap.add_argument("destino", help="arquivo SQLite novo ou URL postgresql:// de um banco vazio")
+    ap.add_argument("--escala", type=int, default=10_000, help="número de orçamentos (padrão: %(default)s)")
+    ap.add_argument("--semente", type=int, default=42)
+    args = ap.parse_args(argv)
+    if not args.destino.startswith(("postgres://", "postgresql://")) and os.path.exists(args.destino):
+        ap.error(f"{args.destino} já existe; o gerador só preenche bancos novos")
+    db.DB = args.destino
+
+    t0 = time.perf_counter()
+    contagem = gerar(args.escala, args.semente,
+                     progresso=lambda t, n: print(f"\r  {t:<20} {n:>10}", end="", file=sys.stderr))
+    db.fechar_conexoes()
+    print(f"\n{args.destino} ({time.perf_counter() - t0:.1f}s)")
+    for t, n in contagem.items():
+        print(f"  {t:<20} {n:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Suíte de benchmarks da camada de dados, do PDF/PIX e das páginas, em várias escalas
+
+Para cada escala (número de orçamentos) gera — ou reaproveita — um banco
+de rascunho com benchmarks.gerar_dados e mede:
+
+- as funções de dados do app (sem o cache de consultas, isto é, o custo no banco);
+- gerar_pdf_orcamento e gerar_qrcode_pix com os caches vazios;
+- cada página inteira via streamlit.testing (AppTest), com o cache de consultas vazio.
+
+As funções de dados vivem no próprio sistema_oficina_completo.py; carregar_app()
+executa o script só até a seção INICIALIZAÇÃO, sem a interface.
+
+O relatório JSON guarda min/mediana por operação e escala. Com --comparar,
+operações mais lentas que a base além da tolerância são listadas e o
+processo sai com código 1 (para uso em CI).
+
+Uso:  python -m benchmarks.suite --escalas 10000 100000 -o relatorio.json
+      python -m benchmarks.suite --comparar benchmarks/baseline.json
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import types
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from benchmarks import gerar_dados
+from oficina import cache_consultas, db, pix
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(RAIZ, "sistema_oficina_completo.py")
+MARCA_INICIALIZACAO = "# ═══════════════════════════ INICIALIZAÇÃO"
+
+ESCALAS = (10_000, 100_000)
+REPETICOES = 5
+TOLERANCIA = 0.25     # 25% mais lento que a base = regressão
+PISO_MS = 2.0         # diferenças menores que isso são ruído
+
+
+def carregar_app():
+    """Módulo com as definições do app (banco, helpers e DADOS), sem executar a interface"""
+    with open(APP, encoding="utf-8") as f:
+        fonte = f.read()
+    corte = fonte.find(MARCA_INICIALIZACAO)
+    if corte < 0:
+        raise RuntimeError(f"seção INICIALIZAÇÃO não encontrada em {APP}")
+    # Sem servidor, cada chamada st.* fora de uma sessão avisa "missing ScriptRunContext"
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").addFilter(
+        lambda r: "ScriptRunContext" not in r.getMessage())
+    app = types.ModuleType("oficina_app")
+    app.__file__ = APP
+    exec(compile(fonte[:corte], APP, "exec"), app.__dict__)
+    app.PDF_CACHE_DIR = None   # não gravar PDFs do benchmark em disco
+    return app
+
+
+def _sem_cache(fn):
+    return getattr(fn, "__wrapped__", fn)
+
+
+def operacoes_dados(app, escala):
+    """[(nome, função sem argumentos)] das medições da camada de dados"""
+    fim = gerar_dados.REFERENCIA.date()
+    ini = fim - timedelta(days=30)
+    todos_status = ("PENDENTE", "APROVADO", "RECUSADO", "FINALIZADO")
+    oid = max(1, escala // 2)
+    cid = max(1, int(escala * gerar_dados.CLIENTES_POR_ORCAMENTO) // 2)
+    cache_pdf = app.get_cache_pdf()
+
+    def pdf():
+        cache_pdf.invalidar()
+        return app.gerar_pdf_orcamento(oid)
+
+    def qrcode():
+        pix.payload_pix.cache_clear(); pix._qrcode_png.cache_clear()
+        return pix.gerar_qrcode_pix(app.CHAVE_PIX_PADRAO, 1234.56)
+
+    f = {nome: _sem_cache(getattr(app, nome)) for nome in (
+        "get_orcamentos", "get_servicos_realizados", "get_orcamentos_pagina", "resumo_orcamentos",
+        "get_servicos_realizados_pagina", "resumo_servicos_realizados", "get_dashboard_stats",
+        "get_ultimos_servicos", "get_clientes", "buscar_clientes", "get_servicos",
+        "get_visao_cliente", "get_historico_cliente")}
+    return [
+        ("get_orcamentos",                    f["get_orcamentos"]),
+        ("get_servicos_realizados",           f["get_servicos_realizados"]),
+        ("get_servicos_realizados[30 dias]",  lambda: f["get_servicos_realizados"](ini, fim)),
+        ("get_orcamentos_pagina",             lambda: f["get_orcamentos_pagina"](todos_status)),
+        ("get_orcamentos_pagina[30 dias]",    lambda: f["get_orcamentos_pagina"](todos_status, ini, fim)),
+        ("resumo_orcamentos",                 lambda: f["resumo_orcamentos"](todos_status)),
+        ("get_servicos_realizados_pagina",    f["get_servicos_realizados_pagina"]),
+        ("resumo_servicos_realizados",        f["resumo_servicos_realizados"]),
+        ("get_dashboard_stats",               f["get_dashboard_stats"]),
+        ("get_ultimos_servicos",              f["get_ultimos_servicos"]),
+        ("get_clientes",                      f["get_clientes"]),
+        ("buscar_clientes",                   lambda: f["buscar_clientes"]("silva santos")),
+        ("get_servicos",                      f["get_servicos"]),
+        ("get_visao_cliente",                 lambda: f["get_visao_cliente"](cid)),
+        ("get_historico_cliente",             lambda: f["get_historico_cliente"](cid)),
+        ("gerar_pdf_orcamento",               pdf),
+        ("gerar_qrcode_pix",                  qrcode),
+    ]
+
+
+def operacoes_paginas(app):
+    """[(nome, função)] que renderizam cada página do menu via AppTest"""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(APP, default_timeout=600)
+    for k, v in dict(logged_in=True, user_id=1, user_nome="Benchmark", user_nivel="admin").items():
+        at.session_state[k] = v
+    at.run()
+
+    def abrir(pagina):
+        def f():
+            cache_consultas.invalidar_tudo()
+            at.sidebar.radio[0].set_value(pagina).run()
+            if at.exception:
+                raise RuntimeError(f"{pagina}: {at.exception[0].message}")
+        return f
+    return [(f"pagina:{p}", abrir(p)) for p in app.TODOS_MENUS]
+
+
+def medir(fn, repeticoes):
+    fn()   # aquecimento: conexões do pool, páginas do SQLite, imports tardios
+    tempos = []
+    for _ in range(repeticoes):
+        t0 = time.perf_counter(); fn()
+        tempos.append((time.perf_counter() - t0) * 1e3)
+    return {"min_ms": round(min(tempos), 3), "mediana_ms": round(statistics.median(tempos), 3),
+            "repeticoes": repeticoes}
+
+
+def preparar_banco(escala, semente, pasta, regerar=False):
+    """Caminho do banco de rascunho da escala, gerado uma vez e reaproveitado"""
+    os.makedirs(pasta, exist_ok=True)
+    caminho = os.path.join(pasta, f"oficina_{escala}_{semente}.db")
+    if regerar or not os.path.exists(caminho):
+        for sufixo in ("", "-wal", "-shm"):
+            if os.path.exists(caminho + sufixo): os.remove(caminho + sufixo)
+        db.fechar_conexoes(); db.DB = caminho
+        t0 = time.perf_counter()
+        gerar_dados.gerar(escala, semente)
+        print(f"  banco gerado em {time.perf_counter() - t0:.1f}s: {caminho}", file=sys.stderr)
+    return caminho
+
+
+def executar(escalas=ESCALAS, semente=42, repeticoes=REPETICOES, pasta=None, paginas=True,
+             regerar=False):
+    pasta = pasta or os.path.join(tempfile.gettempdir(), "oficina_bench")
+    relatorio = {"gerado_em": datetime.now().isoformat(timespec="seconds"), "semente": semente,
+                 "ambiente": {"python": platform.python_version(), "sqlite": sqlite3.sqlite_version,
+                              "pandas": pd.__version__, "plataforma": platform.platform(),
+                              "cpus": os.cpu_count()},
+                 "escalas": {}}
+    app = carregar_app()
+    for escala in escalas:
+        print(f"escala {escala}", file=sys.stderr)
+        caminho = preparar_banco(escala, semente, pasta, regerar)
+        db.fechar_conexoes(); db.DB = os.environ["OFICINA_DB"] = caminho
+        cache_consultas.invalidar_tudo()
+        app.init_db(caminho)
+        ops = operacoes_dados(app, escala) + (operacoes_paginas(app) if paginas else [])
+        resultados = relatorio["escalas"][str(escala)] = {}
+        for nome, fn in ops:
+            resultados[nome] = medir(fn, repeticoes)
+            print(f"  {nome:<40} {resultados[nome]['mediana_ms']:>10.1f} ms", file=sys.stderr)
+    db.fechar_conexoes()
+    return relatorio
+
+
+def comparar(atual, base, tolerancia=TOLERANCIA, piso_ms=PISO_MS):
+    """[(escala, operação, ms base, ms atual)] das operações que ficaram mais lentas que a base.
+
+    Compara o mínimo das repetições, menos sujeito a ruído que a mediana.
+    """
+    regressoes = []
+    for escala, ops in atual["escalas"].items():
+        for nome, r in ops.items():
+            b = base.get("escalas", {}).get(escala, {}).get(nome)
+            if b and r["min_ms"] > b["min_ms"] * (1 + tolerancia) and r["min_ms"] - b["min_ms"] > piso_ms:
+                regressoes.append((escala, nome, b["min_ms"], r["min_ms"]))
+    return regressoes
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmarks da camada de dados, PDF/PIX e páginas")
+    ap.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS),
+                    help="números de orçamentos (padrão: %(default)s; 1000000 também funciona)")
+    ap.add_argument("--semente", type=int, default=42)
+    ap.add_argument("--repeticoes", type=int, default=REPETICOES)
+    ap.add_argument("--pasta", help="onde guardar os bancos gerados (padrão: temporário do sistema)")
+    ap.add_argument("--regerar", action="store_true", help="gerar os bancos de novo mesmo se existirem")
+    ap.add_argument("--sem-paginas", action="store_true", help="pular as medições de página (AppTest)")
+    ap.add_argument("-o", "--saida", help="arquivo JSON do relatório")
+    ap.add_argument("--comparar", metavar="BASE", help="relatório JSON de referência")
+    ap.add_argument("--tolerancia", type=float, default=TOLERANCIA,
+                    help="fração acima da base considerada regressão (padrão: %(default)s)")
+    args = ap.parse_args(argv)
+
+    relatorio = executar(args.escalas, args.semente, args.repeticoes, args.pasta,
+                         not args.sem_paginas, args.regerar)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            json.dump(relatorio, f, ensure_ascii=False, indent=1)
+        print(f"relatório: {args.saida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regressoes = comparar(relatorio, json.load(f), args.tolerancia)
+        for escala, nome, b, a in regressoes:
+            print(f"REGRESSÃO [{escala}] {nome}: {b:.1f} → {a:.1f} ms ({a / b:.2f}x)")
+        if regressoes: sys.exit(1)
+        print(f"sem regressões acima de {args.tolerancia:.0%} em relação a {args.comparar}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,3 @@
+"""
+Módulos de apoio do Sistema Oficina (importáveis fora do script Streamlit)
+"""
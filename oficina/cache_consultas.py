@@ -0,0 +1,88 @@
+"""
+CACHE DE CONSULTAS — leitura com invalidação por tabela
+
+Cada tabela tem um contador de geração. Uma função decorada com
+@cache_consulta("clientes", ...) guarda o resultado sob a chave
+(argumentos, gerações das tabelas de que depende); as funções de escrita
+chamam invalidar("clientes") e só os caches que leem essa tabela deixam de
+acertar. O estado fica neste módulo (não no script do Streamlit), então
+sobrevive aos reruns e é compartilhado entre as sessões do processo.
+
+Com várias réplicas no mesmo banco (PostgreSQL), oficina.postgres registra
+em ao_invalidar() o aviso às demais réplicas e aplica aqui os avisos delas.
+"""
+
+import functools
+import sys
+import threading
+from collections import OrderedDict, defaultdict
+
+MAX_ITENS = 64   # resultados guardados por função
+
+_lock = threading.Lock()
+_geracoes = defaultdict(int)
+_caches = {}
+_stats = defaultdict(lambda: {"hits": 0, "misses": 0})
+_ouvintes = []   # chamados com as tabelas a cada invalidação local
+
+
+def ao_invalidar(fn):
+    if fn not in _ouvintes: _ouvintes.append(fn)
+
+
+def invalidar(*tabelas, propagar=True):
+    """Avança a geração das tabelas alteradas"""
+    with _lock:
+        for t in tabelas:
+            _geracoes[t] += 1
+    if propagar:
+        for fn in _ouvintes: fn(tabelas)
+
+
+def invalidar_tudo():
+    with _lock:
+        for cache in _caches.values(): cache.clear()
+
+
+def _copia(res):
+    """DataFrame: cada chamador recebe a sua cópia. Sem pandas carregado não há DataFrame,
+    então o módulo não o importa (as CLIs que só escrevem no banco ficam leves)."""
+    pd = sys.modules.get("pandas")
+    return res.copy() if pd and isinstance(res, pd.DataFrame) else res
+
+
+def cache_consulta(*tabelas):
+    def deco(fn):
+        nome = fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _lock:
+                chave = (args, tuple(sorted(kwargs.items())), tuple(_geracoes[t] for t in tabelas))
+                cache = _caches.setdefault(nome, OrderedDict())
+                if chave in cache:
+                    cache.move_to_end(chave)
+                    _stats[nome]["hits"] += 1
+                    res = cache[chave]
+                    return _copia(res)
+                _stats[nome]["misses"] += 1
+            res = fn(*args, **kwargs)
+            with _lock:
+                cache[chave] = res
+                while len(cache) > MAX_ITENS:
+                    cache.popitem(last=False)
+            return _copia(res)
+
+        wrapper.tabelas = tabelas
+        return wrapper
+    return deco
+
+
+def estatisticas():
+    """{função: {'hits', 'misses', 'taxa_acerto'}} para exibição"""
+    with _lock:
+        res = {}
+        for nome, s in _stats.items():
+            total = s["hits"] + s["misses"]
+            res[nome] = {**s, "taxa_acerto": (s["hits"] / total) if total else 0.0}
+        return res
@@ -0,0 +1,120 @@
+"""
+CACHE DE PDFs DE ORÇAMENTO — memória (LRU) + disco opcional
+"""
+
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+
+def versao_conteudo(*partes):
+    """Hash estável do conteúdo que compõe o PDF (linhas do banco + chave PIX)"""
+    return hashlib.sha1(repr(partes).encode("utf-8")).hexdigest()[:16]
+
+
+class CachePDF:
+    """Cache de bytes de PDF por (orçamento, versão do conteúdo).
+
+    Mantém até `max_itens` documentos em memória com despejo LRU e, se
+    `diretorio` for informado, grava cada PDF em disco para sobreviver a
+    reinícios do servidor. O disco também é LRU: cada leitura atualiza o
+    mtime do arquivo e, passado `max_arquivos` ou `max_bytes`, saem os de
+    mtime mais antigo.
+    """
+
+    def __init__(self, max_itens=256, diretorio=None, max_arquivos=2000, max_bytes=200 * 1024 * 1024):
+        self.max_itens = max_itens
+        self.diretorio = diretorio
+        self.max_arquivos = max_arquivos
+        self.max_bytes = max_bytes
+        self._itens = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _arquivo(self, oid, versao):
+        return os.path.join(self.diretorio, f"{oid}_{versao}.pdf")
+
+    def obter(self, oid, versao):
+        """Retorna os bytes do PDF ou None se não estiver em cache"""
+        chave = (oid, versao)
+        with self._lock:
+            if chave in self._itens:
+                self._itens.move_to_end(chave)
+                self.hits += 1
+                return self._itens[chave]
+        if self.diretorio:
+            try:
+                with open(self._arquivo(oid, versao), "rb") as f:
+                    dados = f.read()
+                os.utime(self._arquivo(oid, versao))   # uso recente: último a sair do disco
+            except OSError:
+                dados = None
+            if dados is not None:
+                with self._lock:
+                    self.hits += 1
+                    self._guardar_memoria(chave, dados)
+                return dados
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def guardar(self, oid, versao, dados):
+        # Versões antigas do mesmo orçamento nunca mais serão pedidas
+        self.invalidar([oid])
+        with self._lock:
+            self._guardar_memoria((oid, versao), dados)
+        if self.diretorio:
+            tmp = self._arquivo(oid, versao) + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(dados)
+            os.replace(tmp, self._arquivo(oid, versao))
+            self._limitar_disco()
+
+    def _guardar_memoria(self, chave, dados):
+        self._itens[chave] = dados
+        self._itens.move_to_end(chave)
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+
+    def _limitar_disco(self):
+        """Apaga os PDFs usados há mais tempo até caber em max_arquivos e max_bytes"""
+        arquivos = []
+        for e in os.scandir(self.diretorio):
+            if not e.name.endswith(".pdf"): continue
+            try: info = e.stat()
+            except OSError: continue   # apagado por outro processo
+            arquivos.append((info.st_mtime, info.st_size, e.path))
+        total = sum(a[1] for a in arquivos)
+        if len(arquivos) <= self.max_arquivos and total <= self.max_bytes: return
+        arquivos.sort()
+        n = len(arquivos)
+        for _, tamanho, caminho in arquivos:
+            if n <= self.max_arquivos and total <= self.max_bytes: break
+            try: os.remove(caminho)
+            except OSError: pass
+            n -= 1; total -= tamanho
+
+    def invalidar(self, oids=None):
+        """Remove os PDFs dos orçamentos informados (None = todos)"""
+        alvo = None if oids is None else {int(o) for o in oids}
+        with self._lock:
+            for chave in list(self._itens):
+                if alvo is None or chave[0] in alvo:
+                    del self._itens[chave]
+        if self.diretorio:
+            padroes = ["*.pdf"] if alvo is None else [f"{o}_*.pdf" for o in alvo]
+            for padrao in padroes:
+                for arq in glob.glob(os.path.join(self.diretorio, padrao)):
+                    try: os.remove(arq)
+                    except OSError: pass
+
+    def estatisticas(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses,
+                    "itens": len(self._itens),
+                    "taxa_acerto": (self.hits / total) if total else 0.0}
@@ -0,0 +1,71 @@
+"""
+CONSULTAS — SQL das leituras quentes do app
+
+O app executa estes textos e migracoes.CONSULTAS_INDEXADAS confere o plano
+dos mesmos (python -m oficina.migracoes --planos e tests/test_planos.py):
+o que é verificado é exatamente o que roda. Consultas com filtros opcionais
+são montadas por funções que retornam (sql, parâmetros).
+"""
+
+from oficina.db import filtros_periodo_status
+
+# Primeira página da lista de clientes, lida na ordem do índice da migração 13
+SQL_LISTA_CLIENTES = "SELECT * FROM clientes ORDER BY nome LIMIT ?"
+
+SQL_CARROS_DO_CLIENTE = "SELECT * FROM carros WHERE cliente_id=? ORDER BY placa"
+
+# Cadastros ligados a um cliente (impedem a exclusão), por tabela
+SQL_CONTAR_DO_CLIENTE = {t: f"SELECT COUNT(*) FROM {t} WHERE cliente_id=?"
+                         for t in ("carros", "orcamentos", "servicos_realizados")}
+
+SQL_SERVICO_POR_ID = "SELECT id,descricao,valor FROM catalogo_servicos WHERE id=?"
+
+# Começo da descrição sem diferenciar maiúsculas, lido já na ordem do índice da migração 10
+SQL_BUSCA_SERVICOS = {
+    "sqlite": """SELECT id,descricao,valor FROM catalogo_servicos
+                 WHERE descricao LIKE ? ESCAPE '\\' ORDER BY descricao COLLATE NOCASE LIMIT ?""",
+    "postgres": """SELECT id,descricao,valor FROM catalogo_servicos
+                   WHERE lower(descricao) LIKE lower(?) ESCAPE '\\' ORDER BY lower(descricao) LIMIT ?""",
+}
+
+# Prefixo da chave de placa: GLOB (SQLite) e LIKE sobre text_pattern_ops (PostgreSQL) usam o índice
+SQL_BUSCA_PLACA = {
+    backend: f"""SELECT ca.id,ca.placa,ca.marca,ca.modelo,ca.km,ca.cliente_id,c.nome
+                 FROM carros ca JOIN clientes c ON c.id=ca.cliente_id
+                 WHERE ca.placa_chave {operador} ? ORDER BY ca.placa_chave LIMIT ?"""
+    for backend, operador in (("sqlite", "GLOB"), ("postgres", "LIKE"))}
+CORINGA_PLACA = {"sqlite": "*", "postgres": "%"}
+
+SQL_ORCAMENTOS = """SELECT o.id,c.nome,ca.placa,o.data,o.status,o.total
+                    FROM orcamentos o
+                    JOIN clientes c ON o.cliente_id=c.id
+                    JOIN carros ca  ON o.carro_id=ca.id"""
+SQL_SERVICOS_REALIZADOS = """SELECT s.id,c.nome,ca.placa,s.data,s.total
+                             FROM servicos_realizados s
+                             JOIN clientes c ON s.cliente_id=c.id
+                             JOIN carros ca  ON s.carro_id=ca.id"""
+SQL_RESUMO_SERVICOS = "SELECT COUNT(*),COALESCE(SUM(s.total),0) FROM servicos_realizados s"
+
+
+def _filtrar(sql, alias, data_ini=None, data_fim=None, status=None, antes_de=None, final=""):
+    where, params = filtros_periodo_status(alias, data_ini, data_fim, status)
+    if antes_de is not None:
+        where.append(f"{alias}.id < ?"); params.append(antes_de)
+    if where: sql += " WHERE " + " AND ".join(where)
+    return sql + final, params
+
+
+def pagina_orcamentos(status=None, data_ini=None, data_fim=None, antes_de=None):
+    """Página do Histórico (id < antes_de, mais novos primeiro); falta o parâmetro do LIMIT"""
+    return _filtrar(SQL_ORCAMENTOS, "o", data_ini, data_fim, status, antes_de, " ORDER BY o.id DESC LIMIT ?")
+
+
+def pagina_servicos_realizados(data_ini=None, data_fim=None, antes_de=None):
+    """Página dos Serviços Realizados (id < antes_de, mais novos primeiro); falta o parâmetro do LIMIT"""
+    return _filtrar(SQL_SERVICOS_REALIZADOS, "s", data_ini, data_fim, None, antes_de,
+                    " ORDER BY s.id DESC LIMIT ?")
+
+
+def resumo_servicos_realizados(data_ini=None, data_fim=None):
+    """Quantidade e soma dos totais do período"""
+    return _filtrar(SQL_RESUMO_SERVICOS, "s", data_ini, data_fim)
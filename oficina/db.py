@@ -0,0 +1,253 @@
+"""
+BANCO — escolha do backend, pool de conexões e configurações
+
+DB é o arquivo SQLite (padrão) ou uma URL postgresql://... — vem da variável
+de ambiente OFICINA_DB ou do --db das CLIs. O restante do código só usa
+get_conn()/transacao() e SQL com parâmetros "?"; no PostgreSQL a tradução e
+o pool ficam em oficina.postgres.
+
+As conexões são abertas uma vez por processo e reaproveitadas: get_conn()
+empresta uma conexão do pool e conn.close() a devolve (sem fechá-la de
+fato). Os PRAGMAs de desempenho são aplicados só na abertura. Os cursores
+registram tempo e linhas de cada consulta em oficina.metricas.
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from oficina import metricas
+from oficina.formatos import intervalo_iso
+
+DB = os.environ.get("OFICINA_DB", "oficina.db")
+CHAVE_PIX_PADRAO = "19995056708"
+POOL_MAX = 8   # conexões ociosas mantidas por processo
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA cache_size=-16000",      # ~16 MB de cache de páginas
+    "PRAGMA mmap_size=268435456",    # 256 MB mapeados em memória
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+def backend():
+    """'postgres' quando DB é uma URL do PostgreSQL, senão 'sqlite'"""
+    return "postgres" if DB.startswith(("postgres://", "postgresql://")) else "sqlite"
+
+
+def erros_integridade():
+    """Exceções de violação de UNIQUE/chave do backend atual (para usar em except)"""
+    if backend() == "postgres":
+        import psycopg2
+        return (sqlite3.IntegrityError, psycopg2.IntegrityError)
+    return (sqlite3.IntegrityError,)
+
+
+class CursorMedido(sqlite3.Cursor):
+    """Cursor que mede execute + fetch* e registra a consulta ao concluí-la"""
+    _medicao = None
+
+    def _medir(self, metodo, sql, params):
+        if self._medicao: self._medicao.concluir()
+        self._medicao = m = metricas.Medicao(sql)
+        t0 = time.perf_counter()
+        try:
+            return metodo(sql, params)
+        finally:
+            m.somar(t0, max(self.rowcount, 0))
+
+    def execute(self, sql, params=()):
+        return self._medir(super().execute, sql, params)
+
+    def executemany(self, sql, seq):
+        return self._medir(super().executemany, sql, seq)
+
+    def fetchone(self):
+        t0 = time.perf_counter()
+        r = super().fetchone()
+        if self._medicao:
+            self._medicao.somar(t0, r is not None)
+            if r is None: self._medicao.concluir()
+        return r
+
+    def fetchmany(self, size=None):
+        t0 = time.perf_counter()
+        n = self.arraysize if size is None else size
+        r = super().fetchmany(n)
+        if self._medicao:
+            self._medicao.somar(t0, len(r))
+            if len(r) < n: self._medicao.concluir()
+        return r
+
+    def fetchall(self):
+        t0 = time.perf_counter()
+        r = super().fetchall()
+        if self._medicao:
+            self._medicao.somar(t0, len(r)); self._medicao.concluir()
+        return r
+
+    def __next__(self):
+        t0 = time.perf_counter()
+        try:
+            r = super().__next__()
+        except StopIteration:
+            if self._medicao: self._medicao.concluir()
+            raise
+        if self._medicao: self._medicao.somar(t0, 1)
+        return r
+
+    def close(self):
+        if self._medicao: self._medicao.concluir()
+        super().close()
+
+    def __del__(self):
+        if self._medicao: self._medicao.concluir()
+
+
+class ConexaoPool(sqlite3.Connection):
+    """sqlite3.Connection cujo close() devolve a conexão ao pool"""
+
+    def cursor(self, factory=CursorMedido):
+        return super().cursor(factory)
+
+    # sqlite3.Connection.execute cria um Cursor comum; passar pelo medido
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def executemany(self, sql, seq):
+        return self.cursor().executemany(sql, seq)
+
+    def close(self):
+        _devolver(self)
+
+    def fechar_de_verdade(self):
+        sqlite3.Connection.close(self)
+
+
+_pool = queue.LifoQueue(maxsize=POOL_MAX)
+_pool_pid = os.getpid()
+_pool_lock = threading.Lock()
+
+
+def _abrir():
+    conn = sqlite3.connect(DB, timeout=30, check_same_thread=False, factory=ConexaoPool)
+    for p in PRAGMAS:
+        conn.execute(p)
+    conn.caminho = DB
+    return conn
+
+
+def _devolver(conn):
+    if conn.in_transaction:
+        conn.rollback()
+    if conn.caminho != DB or os.getpid() != _pool_pid:
+        conn.fechar_de_verdade(); return
+    try:
+        _pool.put_nowait(conn)
+    except queue.Full:
+        conn.fechar_de_verdade()
+
+
+def get_conn():
+    """Empresta uma conexão do pool (abre uma nova se não houver ociosa)"""
+    global _pool, _pool_pid
+    if backend() == "postgres":
+        from oficina import postgres
+        return postgres.get_conn(DB, POOL_MAX)
+    if os.getpid() != _pool_pid:
+        # Processo filho (fork): não reutilizar conexões herdadas do pai
+        with _pool_lock:
+            _pool, _pool_pid = queue.LifoQueue(maxsize=POOL_MAX), os.getpid()
+    while True:
+        try:
+            conn = _pool.get_nowait()
+        except queue.Empty:
+            return _abrir()
+        if conn.caminho == DB:
+            return conn
+        conn.fechar_de_verdade()
+
+
+@contextmanager
+def transacao():
+    """Cursor dentro de uma transação: commit ao sair, rollback em erro
+
+        with transacao() as c:
+            c.execute("UPDATE ...")
+    """
+    conn = get_conn()
+    try:
+        yield conn.cursor()
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def iniciar_escrita(conn, nome="oficina"):
+    """Abre transação com trava de escrita exclusiva entre processos/réplicas"""
+    if backend() == "postgres":
+        from oficina import postgres
+        postgres.iniciar_escrita(conn, nome)
+    else:
+        conn.execute("BEGIN IMMEDIATE")
+
+
+def ler_em_blocos(sql, params=(), tamanho=2000):
+    """Gera DataFrames de até `tamanho` linhas sem carregar o resultado inteiro.
+
+    No PostgreSQL usa cursor no servidor; no SQLite o cursor já avança sob demanda.
+    """
+    import pandas as pd
+    conn = get_conn()
+    try:
+        c = conn.cursor_servidor() if backend() == "postgres" else conn.cursor()
+        c.execute(sql, params)
+        while True:
+            linhas = c.fetchmany(tamanho)
+            if not linhas: return
+            yield pd.DataFrame.from_records(linhas, columns=[d[0] for d in c.description])
+    finally:
+        conn.close()
+
+
+def fechar_conexoes():
+    """Fecha as conexões ociosas (ex.: antes de trocar de DB em scripts)"""
+    if backend() == "postgres":
+        from oficina import postgres
+        postgres.fechar_conexoes(); return
+    while True:
+        try: _pool.get_nowait().fechar_de_verdade()
+        except queue.Empty: return
+
+
+def filtros_periodo_status(alias, data_ini=None, data_fim=None, status=None):
+    """Cláusulas WHERE (lista) e parâmetros para período [ini, fim] e status.
+
+    As datas são comparadas como texto ISO, o que permite busca por faixa
+    no índice da coluna data.
+    """
+    where, params = [], []
+    ini, fim = intervalo_iso(data_ini, data_fim)
+    if ini:
+        where.append(f"{alias}.data >= ?"); params.append(ini)
+    if fim:
+        where.append(f"{alias}.data < ?"); params.append(fim)
+    if status:
+        where.append(f"{alias}.status IN ({','.join('?' * len(status))})"); params += list(status)
+    return where, params
+
+
+def get_config(chave, padrao=""):
+    conn = get_conn(); c = conn.cursor()
+    c.execute("SELECT valor FROM configuracoes WHERE chave=?", (chave,))
+    r = c.fetchone(); conn.close()
+    return r[0] if r else padrao
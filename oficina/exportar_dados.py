@@ -0,0 +1,137 @@
+"""
+EXPORTAÇÃO DE DADOS — serviços realizados e orçamentos, com itens, em CSV ou Parquet
+
+Uma linha por item (cabeçalho repetido; registro sem itens sai com os
+campos de item vazios). O JOIN é lido em blocos por db.ler_em_blocos
+(fetchmany no SQLite, cursor no servidor no PostgreSQL) e cada bloco é
+anexado à saída antes do próximo, então a memória usada não depende do
+tamanho do histórico. A ordem (data, id) vem do índice de data, sem
+ordenação temporária.
+
+CSV sai com ";" e vírgula decimal (abre direto no Excel em português);
+Parquet, com um row group por bloco.
+
+Uso:  python -m oficina.exportar_dados servicos -o servicos.csv --de 2026-01-01 --ate 2026-01-31
+      python -m oficina.exportar_dados orcamentos -o orcamentos.parquet --status APROVADO FINALIZADO
+"""
+
+import argparse
+import codecs
+import os
+import sys
+import time
+from datetime import date
+
+import pyarrow as pa
+
+from oficina import db
+
+TAMANHO_BLOCO = 5000   # linhas por ida ao banco / por escrita
+
+_TEXTO, _INT, _REAL = pa.string(), pa.int64(), pa.float64()
+_ITENS = [("item", _TEXTO), ("quantidade", _INT), ("valor_unitario", _REAL), ("subtotal", _REAL)]
+
+CONJUNTOS = {
+    "servicos": dict(
+        alias="s",
+        sql="""SELECT s.id AS servico_id, s.data, s.orcamento_id, c.nome AS cliente,
+                      ca.placa, ca.marca, ca.modelo, s.total, s.observacoes,
+                      i.descricao AS item, i.quantidade, i.valor_unitario, i.subtotal
+               FROM servicos_realizados s
+               LEFT JOIN clientes c  ON c.id=s.cliente_id
+               LEFT JOIN carros ca   ON ca.id=s.carro_id
+               LEFT JOIN itens_servico i ON i.servico_id=s.id""",
+        ordem=" ORDER BY s.data, s.id, i.id",
+        esquema=pa.schema([("servico_id", _INT), ("data", _TEXTO), ("orcamento_id", _INT),
+                           ("cliente", _TEXTO), ("placa", _TEXTO), ("marca", _TEXTO),
+                           ("modelo", _TEXTO), ("total", _REAL), ("observacoes", _TEXTO), *_ITENS])),
+    "orcamentos": dict(
+        alias="o",
+        sql="""SELECT o.id AS orcamento_id, o.data, o.status, c.nome AS cliente,
+                      ca.placa, ca.marca, ca.modelo, o.total, o.observacoes,
+                      i.descricao AS item, i.quantidade, i.valor_unitario, i.subtotal
+               FROM orcamentos o
+               LEFT JOIN clientes c  ON c.id=o.cliente_id
+               LEFT JOIN carros ca   ON ca.id=o.carro_id
+               LEFT JOIN itens_orcamento i ON i.orcamento_id=o.id""",
+        ordem=" ORDER BY o.data, o.id, i.id",
+        esquema=pa.schema([("orcamento_id", _INT), ("data", _TEXTO), ("status", _TEXTO),
+                           ("cliente", _TEXTO), ("placa", _TEXTO), ("marca", _TEXTO),
+                           ("modelo", _TEXTO), ("total", _REAL), ("observacoes", _TEXTO), *_ITENS])),
+}
+
+FORMATOS = {"csv": "text/csv", "parquet": "application/vnd.apache.parquet"}
+
+
+def blocos(conjunto, data_ini=None, data_fim=None, status=None, tamanho=TAMANHO_BLOCO):
+    """Gera DataFrames de até `tamanho` linhas do conjunto filtrado"""
+    cfg = CONJUNTOS[conjunto]
+    where, params = db.filtros_periodo_status(cfg["alias"], data_ini, data_fim, status)
+    q = cfg["sql"] + (" WHERE " + " AND ".join(where) if where else "") + cfg["ordem"]
+    yield from db.ler_em_blocos(q, params, tamanho)
+
+
+def _csv(f, partes, esquema):
+    n = 0
+    f.write(codecs.BOM_UTF8)   # o Excel só reconhece UTF-8 com o BOM
+    # Cabeçalho pelas colunas da consulta, e não pelo 1º bloco: sem linhas o arquivo ainda o tem
+    f.write((";".join(esquema.names) + os.linesep).encode("utf-8"))   # fim de linha do to_csv
+    for df in partes:
+        f.write(df.to_csv(index=False, header=False, sep=";", decimal=",").encode("utf-8"))
+        n += len(df)
+        yield n
+
+
+def _parquet(f, partes, esquema):
+    import pyarrow.parquet as pq
+    n = 0
+    with pq.ParquetWriter(f, esquema, compression="zstd") as w:
+        for df in partes:
+            w.write_table(pa.Table.from_pandas(df, schema=esquema, preserve_index=False))
+            n += len(df)
+            yield n
+
+
+def exportar(destino, conjunto, formato="csv", data_ini=None, data_fim=None, status=None,
+             tamanho=TAMANHO_BLOCO, progresso=None):
+    """Grava o conjunto ('servicos' | 'orcamentos') em `destino` (caminho ou arquivo binário).
+
+    `progresso(linhas)` é chamado após cada bloco gravado. Retorna o total de linhas.
+    """
+    proprio = isinstance(destino, str)
+    f = open(destino, "wb") if proprio else destino
+    try:
+        partes = blocos(conjunto, data_ini, data_fim, status, tamanho)
+        esquema = CONJUNTOS[conjunto]["esquema"]
+        escritor = _parquet(f, partes, esquema) if formato == "parquet" else _csv(f, partes, esquema)
+        n = 0
+        for n in escritor:
+            if progresso: progresso(n)
+        return n
+    finally:
+        if proprio: f.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Exporta serviços realizados ou orçamentos (com itens)")
+    ap.add_argument("conjunto", choices=list(CONJUNTOS))
+    ap.add_argument("-o", "--saida", required=True, help="arquivo .csv ou .parquet")
+    ap.add_argument("--formato", choices=list(FORMATOS), help="padrão: pela extensão da saída")
+    ap.add_argument("--de",  type=date.fromisoformat, help="data inicial (AAAA-MM-DD)")
+    ap.add_argument("--ate", type=date.fromisoformat, help="data final (AAAA-MM-DD)")
+    ap.add_argument("--status", nargs="*", help="só orçamentos; ex.: APROVADO FINALIZADO")
+    ap.add_argument("--db", default=db.DB, help="arquivo SQLite ou URL postgresql:// (padrão: %(default)s)")
+    args = ap.parse_args(argv)
+    db.DB = args.db
+    formato = args.formato or ("parquet" if args.saida.endswith(".parquet") else "csv")
+    if args.status and args.conjunto != "orcamentos":
+        ap.error("--status vale só para orcamentos")
+
+    t0 = time.perf_counter()
+    n = exportar(args.saida, args.conjunto, formato, args.de, args.ate, args.status,
+                 progresso=lambda n: print(f"\r  {n} linha(s)", end="", file=sys.stderr))
+    print(f"\n{n} linha(s) gravadas em {args.saida} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+EXPORTAÇÃO EM LOTE — PDFs de orçamentos por período/status num único ZIP
+
+Os dados são lidos em blocos (uma consulta de cabeçalhos + uma de itens por
+bloco) e renderizados num ProcessPoolExecutor. Só um número limitado de
+blocos fica em voo ao mesmo tempo e cada PDF vai direto para o ZIP, então a
+memória não cresce com a quantidade de documentos.
+
+Uso:  python -m oficina.exportar_pdfs --de 2026-02-01 --ate 2026-02-28 \\
+                                      --status APROVADO FINALIZADO -o fev.zip
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from oficina import db
+from oficina.pdf import SQL_ORCAMENTO_PDF, renderizar_pdf_orcamento
+
+TAMANHO_BLOCO = 25   # orçamentos por tarefa enviada a um processo
+
+
+def contar_orcamentos(data_ini=None, data_fim=None, status=None):
+    where, params = db.filtros_periodo_status("o", data_ini, data_fim, status)
+    q = "SELECT COUNT(*) FROM orcamentos o" + (" WHERE " + " AND ".join(where) if where else "")
+    conn = db.get_conn()
+    try: return conn.execute(q, params).fetchone()[0]
+    finally: conn.close()
+
+
+def iterar_blocos(data_ini=None, data_fim=None, status=None, tamanho=TAMANHO_BLOCO):
+    """Gera listas de (orc, itens) em ordem de id, um bloco por vez"""
+    where, params = db.filtros_periodo_status("o", data_ini, data_fim, status)
+    conn = db.get_conn(); c = conn.cursor()
+    try:
+        ultimo = 0
+        while True:
+            q = SQL_ORCAMENTO_PDF + " WHERE " + " AND ".join(where + ["o.id > ?"]) + " ORDER BY o.id LIMIT ?"
+            orcs = c.execute(q, params + [ultimo, tamanho]).fetchall()
+            if not orcs: return
+            ids = [o[0] for o in orcs]
+            itens = {oid: [] for oid in ids}
+            for r in c.execute(f"""SELECT orcamento_id,descricao,quantidade,valor_unitario,subtotal
+                                   FROM itens_orcamento WHERE orcamento_id IN ({','.join('?' * len(ids))})
+                                   ORDER BY orcamento_id, id""", ids):
+                itens[r[0]].append(r[1:])
+            yield [(o, itens[o[0]]) for o in orcs]
+            ultimo = ids[-1]
+    finally:
+        conn.close()
+
+
+def nome_arquivo(oid): return f"Orcamento_{oid:04d}.pdf"
+
+
+def _renderizar_bloco(bloco, chave_pix):
+    # Executado nos processos filhos
+    return [(nome_arquivo(orc[0]), renderizar_pdf_orcamento(orc, itens, chave_pix))
+            for orc, itens in bloco]
+
+
+def exportar_zip(destino, data_ini=None, data_fim=None, status=None,
+                 processos=None, progresso=None):
+    """Grava em `destino` (caminho ou arquivo binário) um ZIP com os PDFs.
+
+    `progresso(feitos)` é chamado após cada bloco gravado. Retorna a
+    quantidade de PDFs exportados.
+    """
+    chave_pix = db.get_config('chave_pix', db.CHAVE_PIX_PADRAO)
+    processos = processos or os.cpu_count() or 1
+    max_em_voo = processos * 2
+    feitos = 0
+    # spawn: filhos limpos, sem herdar threads nem conexões do processo pai
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=processos, mp_context=ctx) as ex, \
+         zipfile.ZipFile(destino, "w", zipfile.ZIP_DEFLATED) as zf:
+        pendentes = deque()
+
+        def gravar_mais_antigo():
+            nonlocal feitos
+            for nome, pdf in pendentes.popleft().result():
+                zf.writestr(nome, pdf)
+                feitos += 1
+            if progresso: progresso(feitos)
+
+        for bloco in iterar_blocos(data_ini, data_fim, status):
+            pendentes.append(ex.submit(_renderizar_bloco, bloco, chave_pix))
+            if len(pendentes) >= max_em_voo:
+                gravar_mais_antigo()
+        while pendentes:
+            gravar_mais_antigo()
+    return feitos
+
+
+def exportar_zip_em_processo(destino, data_ini=None, data_fim=None, status=None,
+                             processos=None, progresso=None):
+    """Executa exportar_zip num interpretador separado (a própria CLI).
+
+    Dentro do Streamlit o módulo __main__ é o script do app, que os filhos
+    "spawn" do pool reexecutariam; isolando o pool num processo próprio o
+    servidor não é afetado. Retorna a quantidade de PDFs exportados.
+    """
+    cmd = [sys.executable, "-m", "oficina.exportar_pdfs", "-o", os.path.abspath(destino),
+           "--progresso", "linhas"]
+    if data_ini: cmd += ["--de", data_ini.isoformat()]
+    if data_fim: cmd += ["--ate", data_fim.isoformat()]
+    if status:   cmd += ["--status", *status]
+    if processos: cmd += ["-j", str(processos)]
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    feitos = 0
+    # Banco pelo ambiente: a URL do PostgreSQL (com senha) não aparece na linha de comando
+    banco = db.DB if db.backend() == "postgres" else os.path.abspath(db.DB)
+    with subprocess.Popen(cmd, cwd=raiz, stdout=subprocess.PIPE, text=True,
+                          env={**os.environ, "OFICINA_DB": banco}) as proc:
+        for linha in proc.stdout:
+            feitos = int(linha)
+            if progresso: progresso(feitos)
+    if proc.returncode:
+        raise RuntimeError(f"exportação de PDFs falhou (código {proc.returncode})")
+    return feitos
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Exporta PDFs de orçamentos em lote para um ZIP")
+    ap.add_argument("--de",  type=date.fromisoformat, help="data inicial (AAAA-MM-DD)")
+    ap.add_argument("--ate", type=date.fromisoformat, help="data final (AAAA-MM-DD)")
+    ap.add_argument("--status", nargs="*", help="ex.: APROVADO FINALIZADO")
+    ap.add_argument("-o", "--saida", default="orcamentos.zip")
+    ap.add_argument("-j", "--processos", type=int, default=None)
+    ap.add_argument("--db", default=db.DB, help="arquivo SQLite ou URL postgresql:// (padrão: %(default)s)")
+    ap.add_argument("--progresso", choices=["barra", "linhas"], default="barra",
+                    help="'linhas' imprime só a contagem, uma por linha, em stdout")
+    args = ap.parse_args(argv)
+    db.DB = args.db
+
+    if args.progresso == "linhas":
+        exportar_zip(args.saida, args.de, args.ate, args.status, args.processos,
+                     progresso=lambda f: print(f, flush=True))
+        return
+    total = contar_orcamentos(args.de, args.ate, args.status)
+    print(f"{total} orçamento(s) a exportar")
+    t0 = time.perf_counter()
+    n = exportar_zip(args.saida, args.de, args.ate, args.status, args.processos,
+                     progresso=lambda f: print(f"\r  {f}/{total}", end="", file=sys.stderr))
+    print(f"\n{n} PDF(s) gravados em {args.saida} ({time.perf_counter() - t0:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+FORMATAÇÃO — moeda, quilometragem e datas no padrão brasileiro
+
+No banco as datas ficam em ISO-8601 ("AAAA-MM-DD HH:MM"), que ordena e
+indexa corretamente; o formato dd/mm/AAAA só é aplicado na exibição.
+
+Só a biblioteca padrão: db, pdf e as CLIs importam este módulo. As versões
+para colunas inteiras (pandas/pyarrow) ficam em oficina.formatos_series.
+"""
+
+from datetime import date, datetime, timedelta
+
+FORMATO_ISO = "%Y-%m-%d %H:%M"
+
+
+def fmt_moeda(v):
+    return f"R$ {v:,.2f}".replace(",","X").replace(".",",").replace("X",".")
+
+
+def fmt_km(v):
+    try: return f"{int(v):,} km".replace(",",".")
+    except: return str(v)
+
+
+def agora_iso(): return datetime.now().strftime(FORMATO_ISO)
+
+
+def fmt_data(v):
+    """'2026-02-04 13:04' → '04/02/2026 13:04' (valores fora do padrão passam direto)"""
+    if not isinstance(v, str) or len(v) < 10 or v[4] != "-":
+        return v
+    return f"{v[8:10]}/{v[5:7]}/{v[0:4]}{v[10:16]}"
+
+
+def intervalo_iso(data_ini, data_fim):
+    """Datas (date ou 'AAAA-MM-DD') → limites [ini, fim+1 dia) para comparar com colunas ISO"""
+    ini = date.fromisoformat(str(data_ini)) if data_ini else None
+    fim = date.fromisoformat(str(data_fim)) + timedelta(days=1) if data_fim else None
+    return (ini.isoformat() if ini else None), (fim.isoformat() if fim else None)
@@ -0,0 +1,76 @@
+"""
+FORMATAÇÃO DE COLUNAS — versões vetorizadas de oficina.formatos para DataFrames
+
+Mesmo resultado de s.apply(fmt_...), calculado sobre a coluna inteira com
+numpy/pyarrow, sem laço Python por linha. Separado de oficina.formatos para
+que db e as CLIs não carreguem pandas e pyarrow.
+"""
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+_TEXTO = pd.ArrowDtype(pa.string())
+
+
+def _milhares(n):
+    """ndarray de inteiros ≥ 0 → pyarrow StringArray com '.' a cada 3 dígitos"""
+    grupos = max(1, (len(str(int(n.max()))) + 2) // 3) if len(n) else 1
+    partes = []
+    for k in range(grupos - 1, -1, -1):
+        # +1000 e corte do 1º caractere = grupo com 3 dígitos ("007")
+        g = pa.array((n // 10 ** (3 * k)) % 1000 + 1000)
+        partes.append(pc.utf8_slice_codeunits(pc.cast(g, pa.string()), 1))
+    txt = pc.binary_join_element_wise(*partes, ".") if len(partes) > 1 else partes[0]
+    txt = pc.utf8_ltrim(txt, "0.")
+    return pc.if_else(pc.equal(txt, ""), "0", txt)
+
+
+def _centavos(a):
+    """Centavos de floats ≥ 0 arredondados como f"{a:.2f}": sobre o valor binário exato, empate
+    para o par (12.345 é 12.3449… e vira 12,34). np.round(a*100) erraria, pois a*100 já arredonda."""
+    mant, exp = np.frexp(a)
+    p = (mant * 2.0 ** 53).astype("int64") * 100          # a*100 = p * 2**e, exato (p < 2**60)
+    e = exp.astype("int64") - 53
+    cent = np.left_shift(p, np.clip(e, 0, 62))
+    s = np.clip(-e, 1, 62)
+    q = np.right_shift(p, s)
+    resto, meio = p - np.left_shift(q, s), np.left_shift(1, s - 1)
+    sobe = (resto > meio) | ((resto == meio) & (q % 2 == 1))
+    return np.where(e >= 0, cent, q + sobe)
+
+
+def fmt_moeda_series(s):
+    """Mesmo resultado de s.apply(fmt_moeda), inclusive no arredondamento de valores com
+    mais de 2 casas (quantidade × valor unitário); valores nulos viram <NA>"""
+    v = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    nulo = np.isnan(v)
+    cent = _centavos(np.abs(np.where(nulo, 0, v)))
+    inteiro = pc.binary_join_element_wise(pc.if_else(pa.array(np.signbit(v)), "R$ -", "R$ "),
+                                          _milhares(cent // 100), "")
+    dec = pc.utf8_slice_codeunits(pc.cast(pa.array(cent % 100 + 100), pa.string()), 1)
+    txt = pc.binary_join_element_wise(inteiro, dec, ",")
+    if nulo.any():
+        txt = pc.if_else(pa.array(nulo), pa.scalar(None, pa.string()), txt)
+    return pd.Series(txt, index=s.index, dtype=_TEXTO)
+
+
+def fmt_km_series(s):
+    """Mesmo resultado de s.apply(fmt_km)"""
+    num = pd.to_numeric(s, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    ok = ~np.isnan(num)
+    n = np.trunc(np.where(ok, num, 0)).astype("int64")
+    txt = pc.binary_join_element_wise(pc.if_else(pa.array(n < 0), "-", ""),
+                                      _milhares(np.abs(n)), " km", "")
+    if not ok.all():
+        txt = pc.if_else(pa.array(ok), txt, pa.array(s.astype(str).to_numpy(), pa.string()))
+    return pd.Series(txt, index=s.index, dtype=_TEXTO)
+
+
+def fmt_data_series(s):
+    """Versão vetorizada de fmt_data para colunas de DataFrame"""
+    s = s.astype("string")
+    iso = s.str[4] == "-"
+    br = s.str[8:10] + "/" + s.str[5:7] + "/" + s.str[0:4] + s.str[10:16]
+    return br.where(iso, s)
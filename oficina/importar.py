@@ -0,0 +1,310 @@
+"""
+IMPORTAÇÃO EM LOTE — clientes, carros e catálogo de serviços a partir de CSV/Excel
+
+O arquivo é lido em fluxo (módulo csv / openpyxl em modo read_only), cada
+linha é validada e normalizada como nos formulários do app, e as válidas
+são gravadas com executemany, uma transação por lote de TAMANHO_LOTE
+linhas. Linhas inválidas não interrompem a importação: vão para a lista de
+erros com o número da linha no arquivo (o cabeçalho é a linha 1).
+
+Colunas (cabeçalho; maiúsculas, acentos e espaços são ignorados):
+  clientes: nome*, telefone, endereco, numero
+  carros:   placa*, marca*, modelo*, km + dono por cliente_id, cliente (nome) ou telefone
+  servicos: descricao*, valor*
+
+Uso:  python -m oficina.importar clientes clientes.csv [--db oficina.db] [--erros erros.csv]
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import time
+import unicodedata
+from itertools import islice
+
+from oficina import cache_consultas, db
+from oficina.veiculos import chave_placa, normalizar_marca_modelo, normalizar_placa
+
+TAMANHO_LOTE = 2000   # linhas por transação
+
+# Nome normalizado do cabeçalho → campo
+APELIDOS_COLUNA = {
+    "nome": "nome", "cliente": "cliente", "cliente_id": "cliente_id", "id_cliente": "cliente_id",
+    "telefone": "telefone", "fone": "telefone", "celular": "telefone",
+    "endereco": "logradouro", "logradouro": "logradouro", "rua": "logradouro",
+    "numero": "numero", "no": "numero", "n": "numero",
+    "placa": "placa", "marca": "marca", "modelo": "modelo",
+    "km": "km", "quilometragem": "km",
+    "descricao": "descricao", "servico": "descricao", "valor": "valor", "preco": "valor",
+}
+
+COLUNAS = {
+    "clientes": "nome*, telefone, endereco, numero",
+    "carros":   "placa*, marca*, modelo*, km e cliente_id, cliente (nome) ou telefone do dono",
+    "servicos": "descricao*, valor*",
+}
+
+
+# ═══════════════════════════ LEITURA ═══════════════════════════
+
+def _nome_coluna(h):
+    t = unicodedata.normalize("NFKD", str(h or "")).encode("ascii", "ignore").decode().lower()
+    t = re.sub(r"[^a-z0-9]+", "_", t).strip("_")
+    return APELIDOS_COLUNA.get(t, t)
+
+
+def _linhas_csv(f):
+    amostra = f.read(65536); f.seek(0)
+    # Planilhas exportadas no Windows costumam vir em cp1252 e separadas por ";"
+    try:
+        amostra.decode("utf-8-sig"); codificacao = "utf-8-sig"
+    except UnicodeDecodeError as e:
+        codificacao = "utf-8-sig" if e.start > len(amostra) - 4 else "cp1252"
+    texto = amostra.decode(codificacao, errors="ignore")
+    try:
+        sep = csv.Sniffer().sniff(texto.split("\n", 1)[0], ";,\t|").delimiter
+    except csv.Error:
+        sep = ","
+    texto = io.TextIOWrapper(f, encoding=codificacao, errors="replace", newline="")
+    try:
+        yield from csv.reader(texto, delimiter=sep)
+    finally:
+        texto.detach()   # não fechar o arquivo de quem chamou
+
+
+def _linhas_excel(f):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RuntimeError("para importar .xlsx instale o openpyxl (pip install openpyxl)") from None
+    wb = openpyxl.load_workbook(f, read_only=True, data_only=True)
+    try:
+        yield from wb.worksheets[0].iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def ler_linhas(arquivo, nome=None):
+    """Gera (número da linha, {campo: valor}) de um caminho ou arquivo binário (.csv/.xlsx)"""
+    nome = nome or getattr(arquivo, "name", None) or str(arquivo)
+    proprio = isinstance(arquivo, (str, os.PathLike))
+    f = open(arquivo, "rb") if proprio else arquivo
+    try:
+        excel = nome.lower().endswith((".xlsx", ".xlsm"))
+        linhas = _linhas_excel(f) if excel else _linhas_csv(f)
+        cab = [_nome_coluna(h) for h in next(linhas, [])]
+        for n, valores in enumerate(linhas, start=2):
+            if not any(v not in (None, "") for v in valores): continue
+            yield n, dict(zip(cab, valores))
+    finally:
+        if proprio: f.close()
+
+
+# ═══════════════════════════ VALIDAÇÃO ═══════════════════════════
+
+def _texto(v):
+    if v is None: return ""
+    if isinstance(v, float) and v.is_integer(): return str(int(v))   # telefone/número vindos do Excel
+    return str(v).strip()
+
+
+def _inteiro(v):
+    """'12.345', '12345 km', 12345.0 → 12345"""
+    if isinstance(v, (int, float)): return int(v)
+    s = re.sub(r"[\s.]|km", "", _texto(v).lower()).split(",")[0]
+    return int(s) if s else 0
+
+
+def _decimal(v):
+    """'R$ 1.234,56', '1234.56', 1234.56 → 1234.56"""
+    if isinstance(v, (int, float)): return float(v)
+    s = _texto(v).replace("R$", "").replace(" ", "")
+    if "," in s: s = s.replace(".", "").replace(",", ".")
+    return float(s)
+
+
+def _so_digitos(v): return re.sub(r"\D", "", _texto(v))
+
+
+def _obrigatorio(r, campo):
+    v = _texto(r.get(campo))
+    if not v: raise ValueError(f"{campo} é obrigatório")
+    return v
+
+
+class _Clientes:
+    tabela = "clientes"
+    sql = "INSERT INTO clientes(nome,telefone,logradouro,numero) VALUES(?,?,?,?)"
+
+    def validar(self, r):
+        nome = _texto(r.get("nome")) or _texto(r.get("cliente"))
+        if not nome: raise ValueError("nome é obrigatório")
+        return (nome.upper(), _texto(r.get("telefone")),
+                _texto(r.get("logradouro")).upper(), _texto(r.get("numero")))
+
+
+class _Carros:
+    tabela = "carros"
+    sql = "INSERT INTO carros(cliente_id,placa,placa_chave,marca,modelo,km) VALUES(?,?,?,?,?,?)"
+
+    def __init__(self):
+        # Placas e donos carregados uma vez por importação
+        conn = db.get_conn()
+        try:
+            self.chaves = {k for (k,) in conn.execute("SELECT placa_chave FROM carros")}
+            self.ids, self.por_nome, self.por_fone = set(), {}, {}
+            for cid, nome, fone in conn.execute("SELECT id,nome,telefone FROM clientes"):
+                self.ids.add(cid)
+                # Nome/telefone repetido em mais de um cliente fica ambíguo (None)
+                k = (nome or "").upper()
+                self.por_nome[k] = None if k in self.por_nome else cid
+                f = _so_digitos(fone)
+                if f: self.por_fone[f] = None if f in self.por_fone else cid
+        finally:
+            conn.close()
+
+    def _dono(self, r):
+        if _texto(r.get("cliente_id")):
+            try: cid = _inteiro(r["cliente_id"])
+            except ValueError: raise ValueError(f"cliente_id inválido: '{_texto(r['cliente_id'])}'") from None
+            if cid not in self.ids: raise ValueError(f"cliente_id {cid} não existe")
+            return cid
+        for campo, mapa, chave in (("cliente", self.por_nome, _texto(r.get("cliente")).upper()),
+                                   ("telefone", self.por_fone, _so_digitos(r.get("telefone")))):
+            if not chave: continue
+            if chave not in mapa: raise ValueError(f"{campo} '{_texto(r.get(campo))}' não encontrado")
+            if mapa[chave] is None: raise ValueError(f"{campo} '{_texto(r.get(campo))}' é ambíguo; use cliente_id")
+            return mapa[chave]
+        raise ValueError("informe cliente_id, cliente ou telefone do dono")
+
+    def validar(self, r):
+        placa = normalizar_placa(_obrigatorio(r, "placa"))
+        if not placa: raise ValueError(f"placa inválida: '{_texto(r.get('placa'))}'")
+        chave = chave_placa(placa)
+        if chave in self.chaves: raise ValueError(f"placa {placa} já cadastrada")
+        marca, modelo = normalizar_marca_modelo(_obrigatorio(r, "marca"), _obrigatorio(r, "modelo"))
+        if marca is None: raise ValueError(f"marca desconhecida: '{_texto(r.get('marca'))}' (use OUTRA)")
+        try: km = _inteiro(r.get("km"))
+        except ValueError: raise ValueError(f"km inválido: '{_texto(r.get('km'))}'") from None
+        if km < 0: raise ValueError("km negativo")
+        linha = (self._dono(r), placa, chave, marca, modelo, km)
+        self.chaves.add(chave)
+        return linha
+
+
+class _Servicos:
+    tabela = "catalogo_servicos"
+    sql = "INSERT INTO catalogo_servicos(descricao,valor) VALUES(?,?)"
+
+    def validar(self, r):
+        desc, bruto = _obrigatorio(r, "descricao"), _obrigatorio(r, "valor")
+        try: valor = _decimal(bruto)
+        except ValueError: raise ValueError(f"valor inválido: '{bruto}'") from None
+        if valor <= 0: raise ValueError("valor deve ser maior que zero")
+        return desc.upper(), valor
+
+
+IMPORTADORES = {"clientes": _Clientes, "carros": _Carros, "servicos": _Servicos}
+
+
+# ═══════════════════════════ GRAVAÇÃO ═══════════════════════════
+
+def _gravar_lote(sql, lote, erros):
+    """executemany numa transação; se o banco recusar, refaz linha a linha para apontar qual"""
+    try:
+        with db.transacao() as c:
+            c.executemany(sql, [t for _, t in lote])
+        return len(lote)
+    except db.erros_integridade():
+        pass
+    gravadas = 0
+    conn = db.get_conn()
+    try:
+        # Transação aberta antes dos SAVEPOINTs: sem ela, no sqlite3 o primeiro SAVEPOINT
+        # vira a transação e cada RELEASE grava uma linha
+        db.iniciar_escrita(conn, "importar")
+        c = conn.cursor()
+        for n, t in lote:
+            c.execute("SAVEPOINT linha")
+            try:
+                c.execute(sql, t)
+            except db.erros_integridade() as e:
+                c.execute("ROLLBACK TO SAVEPOINT linha")
+                erros.append((n, f"recusada pelo banco: {e}"))
+            else:
+                gravadas += 1
+            c.execute("RELEASE SAVEPOINT linha")
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+    return gravadas
+
+
+def importar(tipo, arquivo, nome=None, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """Importa `arquivo` (caminho ou binário) como `tipo` ('clientes', 'carros', 'servicos').
+
+    Retorna {'lidas', 'gravadas', 'erros': [(linha, mensagem)]}; `progresso(lidas, gravadas)`
+    é chamado após cada lote.
+    """
+    imp = IMPORTADORES[tipo]()
+    res = {"lidas": 0, "gravadas": 0, "erros": []}
+    linhas = ler_linhas(arquivo, nome)
+    try:
+        while True:
+            bloco = list(islice(linhas, tamanho_lote))
+            if not bloco: break
+            lote = []
+            for n, r in bloco:
+                try: lote.append((n, imp.validar(r)))
+                except ValueError as e: res["erros"].append((n, str(e)))
+            if lote: res["gravadas"] += _gravar_lote(imp.sql, lote, res["erros"])
+            res["lidas"] += len(bloco)
+            if progresso: progresso(res["lidas"], res["gravadas"])
+    finally:
+        if res["gravadas"]: cache_consultas.invalidar(imp.tabela)
+    res["erros"].sort()
+    return res
+
+
+def erros_csv(erros):
+    """Relatório das linhas recusadas (bytes CSV com linha;erro)"""
+    buf = io.StringIO()
+    w = csv.writer(buf, delimiter=";")
+    w.writerow(["linha", "erro"]); w.writerows(erros)
+    return buf.getvalue().encode("utf-8-sig")
+
+
+def main(argv=None):
+    from oficina.migracoes import migrar
+    ap = argparse.ArgumentParser(description="Importa clientes, carros ou serviços de CSV/Excel")
+    ap.add_argument("tipo", choices=list(IMPORTADORES))
+    ap.add_argument("arquivo", help=".csv (separador , ou ;) ou .xlsx")
+    ap.add_argument("--db", default=db.DB, help="arquivo SQLite ou URL postgresql:// (padrão: %(default)s)")
+    ap.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="linhas por transação")
+    ap.add_argument("--erros", help="grava as linhas recusadas neste CSV")
+    args = ap.parse_args(argv)
+    db.DB = args.db
+    migrar()
+
+    t0 = time.perf_counter()
+    res = importar(args.tipo, args.arquivo, tamanho_lote=args.lote,
+                   progresso=lambda l, g: print(f"\r  {l} lidas, {g} gravadas", end="", file=sys.stderr))
+    print(f"\n{res['lidas']} linha(s) lidas, {res['gravadas']} gravadas, "
+          f"{len(res['erros'])} com erro ({time.perf_counter() - t0:.1f}s)")
+    for n, msg in res["erros"][:20]:
+        print(f"  linha {n}: {msg}")
+    if len(res["erros"]) > 20 and not args.erros:
+        print(f"  ... use --erros arquivo.csv para ver as {len(res['erros'])}")
+    if args.erros and res["erros"]:
+        with open(args.erros, "wb") as f: f.write(erros_csv(res["erros"]))
+    raise SystemExit(1 if res["erros"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+"""
+JOBS — PDFs, ZIPs e exportações em segundo plano, com progresso
+
+enviar() grava a tarefa na tabela jobs (PENDENTE) e a entrega a um
+ThreadPoolExecutor limitado do processo; a página guarda só o id e acompanha
+status e progresso com consultar(), sem segurar o rerun. O resultado vai
+para um arquivo em PASTA; linha e arquivo são apagados TTL_RESULTADO depois
+de a tarefa terminar (limpar_expirados()).
+
+Cada tarefa tem um dono (INSTANCIA, o processo que a enfileirou) e é
+assumida com UPDATE ... WHERE status='PENDENTE' AND dono=?, então só um
+executor a roda mesmo com vários processos no mesmo banco. Uma thread do
+processo renova a cada BATIMENTO segundos o atualizado_em das tarefas ativas
+que são dele — sinal de vida que não depende de a tarefa chamar progresso()
+— e roda retomar(): tarefas ativas sem sinal de vida há ABANDONO (dono
+morto ou reiniciado) passam para este processo e voltam à fila; depois de
+MAX_TENTATIVAS execuções interrompidas, viram ERRO.
+
+Os tipos são funções registradas com registrar(nome, fn) e chamadas como
+fn(destino, progresso, **parametros): gravam o resultado no caminho
+`destino`, chamam progresso(feitos, total=None) e retornam
+(nome do arquivo para download, mime, resumo).
+"""
+
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from oficina import db, exportar_dados, exportar_pdfs
+
+MAX_TAREFAS = 2                       # tarefas rodando ao mesmo tempo por processo
+TTL_RESULTADO = timedelta(hours=1)
+BATIMENTO = 15                        # segundos entre sinais de vida (e varreduras) do processo
+ABANDONO = timedelta(minutes=1)       # ativa sem sinal de vida do dono há mais que isso = dono parou
+MAX_TENTATIVAS = 3                    # execuções interrompidas antes de desistir
+INTERVALO_PROGRESSO = 0.5             # segundos entre gravações de progresso
+INSTANCIA = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+PASTA = os.environ.get("OFICINA_JOBS_DIR", os.path.join(tempfile.gettempdir(), "oficina_jobs"))
+
+ATIVOS = ("PENDENTE", "EXECUTANDO")
+COLUNAS = ("id", "tipo", "status", "feitos", "total", "resumo", "arquivo", "nome_arquivo", "mime",
+           "erro", "dono", "tentativas", "criado_em", "atualizado_em", "expira_em")
+
+_TIPOS = {}
+_executor = None
+_parar = None     # Event da thread de sinal de vida em andamento
+_lock = threading.Lock()
+_log = logging.getLogger(__name__)
+
+
+def registrar(nome, fn):
+    _TIPOS[nome] = fn
+
+
+def _agora(delta=timedelta()):
+    return (datetime.now() + delta).isoformat(timespec="seconds")
+
+
+def _pool():
+    global _executor, _parar
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=MAX_TAREFAS, thread_name_prefix="oficina-job")
+            _parar = threading.Event()
+            threading.Thread(target=_vigiar, args=(_parar, _executor), name="oficina-job-vigia",
+                             daemon=True).start()
+        return _executor
+
+
+def parar():
+    """Para a thread de sinal de vida e espera as tarefas em andamento (testes, fim do processo)"""
+    global _executor
+    with _lock:
+        executor, _executor = _executor, None
+        if _parar: _parar.set()
+    if executor: executor.shutdown(wait=True)
+
+
+def _vigiar(parar_evento, executor):
+    while not parar_evento.wait(BATIMENTO):
+        try:
+            _bater()
+            _assumir(executor)
+        except Exception:
+            if not parar_evento.is_set(): _log.exception("sinal de vida dos jobs")
+
+
+def _bater():
+    """Sinal de vida das tarefas ativas deste processo, rodando ou na fila do executor"""
+    with db.transacao() as c:
+        c.execute("UPDATE jobs SET atualizado_em=? WHERE dono=? AND status IN ('PENDENTE','EXECUTANDO')",
+                  (_agora(), INSTANCIA))
+
+
+def enviar(tipo, **parametros):
+    """Enfileira uma tarefa e retorna o id (parâmetros em JSON; datas viram 'AAAA-MM-DD')"""
+    if tipo not in _TIPOS:
+        raise ValueError(f"tipo de tarefa desconhecido: {tipo}")
+    agora = _agora()
+    with db.transacao() as c:
+        jid = c.execute("""INSERT INTO jobs(tipo,parametros,status,dono,criado_em,atualizado_em)
+                           VALUES(?,?,'PENDENTE',?,?,?) RETURNING id""",
+                        (tipo, json.dumps(parametros, default=str), INSTANCIA, agora, agora)).fetchone()[0]
+    _pool().submit(_executar, jid)
+    return jid
+
+
+def _finalizar(jid, status, **campos):
+    campos.update(status=status, atualizado_em=_agora(), expira_em=_agora(TTL_RESULTADO))
+    with db.transacao() as c:
+        # dono=?: se outro processo assumiu a tarefa (este ficou sem sinal de vida), vale a execução dele
+        c.execute(f"UPDATE jobs SET {','.join(f'{k}=?' for k in campos)} WHERE id=? AND dono=?",
+                  (*campos.values(), jid, INSTANCIA))
+
+
+def _executar(jid):
+    try:
+        with db.transacao() as c:
+            r = c.execute("""UPDATE jobs SET status='EXECUTANDO', atualizado_em=?, tentativas=tentativas+1
+                             WHERE id=? AND status='PENDENTE' AND dono=? RETURNING tipo,parametros""",
+                          (_agora(), jid, INSTANCIA)).fetchone()
+        if r is None: return       # já assumida por outro processo, ou descartada
+        tipo, parametros = r
+        arquivo = os.path.join(PASTA, f"job_{jid}")
+        ultimo = 0.0
+
+        def progresso(feitos, total=None):
+            nonlocal ultimo
+            if time.monotonic() - ultimo < INTERVALO_PROGRESSO: return
+            ultimo = time.monotonic()
+            with db.transacao() as c:
+                c.execute("""UPDATE jobs SET feitos=?,total=COALESCE(?,total),atualizado_em=?
+                             WHERE id=? AND dono=?""", (feitos, total, _agora(), jid, INSTANCIA))
+
+        try:
+            os.makedirs(PASTA, exist_ok=True)
+            nome, mime, resumo = _TIPOS[tipo](arquivo, progresso, **json.loads(parametros))
+        except Exception as e:
+            if os.path.exists(arquivo): os.remove(arquivo)
+            _finalizar(jid, "ERRO", erro=f"{type(e).__name__}: {e}")
+        else:
+            _finalizar(jid, "CONCLUIDO", arquivo=arquivo, nome_arquivo=nome, mime=mime, resumo=resumo)
+        limpar_expirados()
+    except Exception:
+        _log.exception("job %s", jid)
+
+
+def consultar(jid):
+    """{coluna: valor} da tarefa, ou None se não existe (expirada ou descartada)"""
+    conn = db.get_conn()
+    try:
+        r = conn.execute(f"SELECT {','.join(COLUNAS)} FROM jobs WHERE id=?", (jid,)).fetchone()
+    finally:
+        conn.close()
+    return dict(zip(COLUNAS, r)) if r else None
+
+
+def aguardar(jid, limite):
+    """Espera até `limite` segundos a tarefa terminar; retorna consultar(jid)"""
+    fim = time.monotonic() + limite
+    while True:
+        job = consultar(jid)
+        if not job or job["status"] not in ATIVOS or time.monotonic() >= fim: return job
+        time.sleep(0.05)
+
+
+def descartar(jid):
+    """Apaga uma tarefa que não está rodando (cancela se ainda PENDENTE) e seu arquivo"""
+    with db.transacao() as c:
+        r = c.execute("DELETE FROM jobs WHERE id=? AND status<>'EXECUTANDO' RETURNING arquivo",
+                      (jid,)).fetchone()
+    if r and r[0] and os.path.exists(r[0]): os.remove(r[0])
+
+
+def limpar_expirados():
+    """Apaga as tarefas vencidas e seus arquivos; sem expira_em (nunca finalizadas), após TTL_RESULTADO parada"""
+    with db.transacao() as c:
+        arquivos = [r[0] for r in c.execute(
+            """DELETE FROM jobs WHERE expira_em < ? OR (expira_em IS NULL AND atualizado_em < ?)
+               RETURNING arquivo""", (_agora(), _agora(-TTL_RESULTADO))).fetchall()]
+    for a in arquivos:
+        if a and os.path.exists(a): os.remove(a)
+    return len(arquivos)
+
+
+def retomar():
+    """Assume as tarefas ativas sem sinal de vida do dono e as reenvia; retorna os ids reenviados
+
+    Chamada na inicialização do app; a thread de sinal de vida, que ela liga, repete a
+    varredura a cada BATIMENTO. Só assume os tipos registrados neste processo, que são
+    os que ele sabe executar.
+    """
+    return _assumir(_pool())
+
+
+def _assumir(executor):
+    tipos = sorted(_TIPOS)
+    marcas = ",".join("?" * len(tipos))
+    agora, limite = _agora(), _agora(-ABANDONO)
+    with db.transacao() as c:
+        c.execute(f"""UPDATE jobs SET status='ERRO', erro=?, atualizado_em=?, expira_em=?
+                      WHERE status IN ('PENDENTE','EXECUTANDO') AND atualizado_em < ?
+                        AND tentativas >= ? AND tipo IN ({marcas})""",
+                  (f"interrompida {MAX_TENTATIVAS} vez(es); gere de novo", agora, _agora(TTL_RESULTADO),
+                   limite, MAX_TENTATIVAS, *tipos))
+        ids = [r[0] for r in c.execute(
+            f"""UPDATE jobs SET status='PENDENTE', dono=?, atualizado_em=?
+                WHERE status IN ('PENDENTE','EXECUTANDO') AND atualizado_em < ? AND tipo IN ({marcas})
+                RETURNING id""", (INSTANCIA, agora, limite, *tipos)).fetchall()]
+    for jid in sorted(ids):
+        executor.submit(_executar, jid)
+    limpar_expirados()
+    return sorted(ids)
+
+
+# ── Tipos embutidos ──
+
+def _data(v): return date.fromisoformat(v) if v else None
+
+
+def _zip_pdfs(destino, progresso, data_ini=None, data_fim=None, status=None):
+    ini, fim = _data(data_ini), _data(data_fim)
+    total = exportar_pdfs.contar_orcamentos(ini, fim, status)
+    progresso(0, total)
+    n = exportar_pdfs.exportar_zip_em_processo(destino, ini, fim, status,
+                                               progresso=lambda f: progresso(f, total))
+    return "orcamentos.zip", "application/zip", f"{n} PDF(s)"
+
+
+def _exportar_dados(destino, progresso, conjunto, formato="csv", **filtros):
+    n = exportar_dados.exportar(destino, conjunto, formato, progresso=progresso, **filtros)
+    return f"{conjunto}.{formato}", exportar_dados.FORMATOS[formato], f"{n} linha(s)"
+
+
+registrar("zip_pdfs", _zip_pdfs)
+registrar("exportar_dados", _exportar_dados)
@@ -0,0 +1,139 @@
+"""
+MÉTRICAS — tempo das consultas SQL e das páginas, em memória
+
+Cada cursor de get_conn() mede o próprio trabalho (execute + fetch*) e, ao
+terminar (resultado esgotado, novo execute, close), registra SQL, duração
+e linhas. O app mede cada página renderizada com medir_pagina(). Os
+registros ficam em buffers circulares deste módulo — compartilhados pelas
+sessões do processo, como o cache de consultas — e alimentam o painel
+"Desempenho". Com OFICINA_LOG_METRICAS=arquivo.jsonl (ou configurar_log(),
+que só aceita um nome de arquivo dentro de PASTA_LOG) cada registro também
+vira uma linha JSON no arquivo.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+
+MAX_CONSULTAS = 5000
+MAX_PAGINAS = 1000
+PASTA_LOG = os.environ.get("OFICINA_METRICAS_DIR", "metricas")
+
+_lock = threading.Lock()
+_consultas = deque(maxlen=MAX_CONSULTAS)
+_paginas = deque(maxlen=MAX_PAGINAS)
+_log = None       # arquivo aberto do log JSON-lines
+_log_caminho = None
+_ESPACOS = re.compile(r"\s+")
+
+
+def configurar_log(nome):
+    """Liga o log JSON-lines em PASTA_LOG/nome, ou desliga (None)
+
+    O painel repassa o que o admin digitou: caminhos e '..' são recusados com
+    ValueError para o processo não gravar em qualquer arquivo do servidor.
+    """
+    if not nome:
+        return _abrir_log(None)
+    if nome != os.path.basename(nome) or nome in (".", ".."):
+        raise ValueError(f"Informe só o nome do arquivo, sem pastas: {nome!r}")
+    os.makedirs(PASTA_LOG, exist_ok=True)
+    _abrir_log(os.path.join(PASTA_LOG, nome))
+
+
+def _abrir_log(caminho):
+    global _log, _log_caminho
+    with _lock:
+        if _log: _log.close()
+        _log = open(caminho, "a", encoding="utf-8", buffering=1) if caminho else None
+        _log_caminho = caminho or None
+
+
+def arquivo_log():
+    return _log_caminho
+
+
+def _registrar(buffer, registro):
+    with _lock:
+        buffer.append(registro)
+        if _log:
+            _log.write(json.dumps(registro, ensure_ascii=False) + "\n")
+
+
+class Medicao:
+    """Tempo e linhas acumulados de uma consulta até ela ser concluída"""
+    __slots__ = ("sql", "ms", "linhas", "aberta")
+
+    def __init__(self, sql):
+        self.sql, self.ms, self.linhas, self.aberta = sql, 0.0, 0, True
+
+    def somar(self, t0, linhas=0):
+        self.ms += (time.perf_counter() - t0) * 1e3
+        self.linhas += linhas
+
+    def concluir(self):
+        if self.aberta:
+            self.aberta = False
+            _registrar(_consultas, {"tipo": "consulta", "quando": datetime.now().isoformat(timespec="seconds"),
+                                    "sql": _ESPACOS.sub(" ", self.sql).strip(),
+                                    "ms": round(self.ms, 3), "linhas": self.linhas})
+
+
+@contextmanager
+def medir_pagina(pagina):
+    """Registra o tempo de renderização da página (inclusive quando ela sai com st.stop())"""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _registrar(_paginas, {"tipo": "pagina", "quando": datetime.now().isoformat(timespec="seconds"),
+                              "pagina": pagina, "ms": round((time.perf_counter() - t0) * 1e3, 3)})
+
+
+def _percentil(valores, p):
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    return valores[min(len(valores) - 1, max(0, round(p / 100 * len(valores) + 0.5) - 1))]
+
+
+def _agrupar(registros, chave):
+    grupos = {}
+    for r in registros:
+        grupos.setdefault(r[chave], []).append(r)
+    res = []
+    for k, rs in grupos.items():
+        ms = sorted(r["ms"] for r in rs)
+        res.append({chave: k, "chamadas": len(rs), "total_ms": sum(ms), "p50_ms": _percentil(ms, 50),
+                    "p95_ms": _percentil(ms, 95), "max_ms": ms[-1],
+                    **({"linhas_media": sum(r["linhas"] for r in rs) / len(rs)} if chave == "sql" else {})})
+    return sorted(res, key=lambda r: r["total_ms"], reverse=True)
+
+
+def resumo_paginas():
+    """[{pagina, chamadas, total_ms, p50_ms, p95_ms, max_ms}] por tempo total"""
+    with _lock: registros = list(_paginas)
+    return _agrupar(registros, "pagina")
+
+
+def resumo_consultas():
+    """[{sql, chamadas, total_ms, p50_ms, p95_ms, max_ms, linhas_media}] por tempo total"""
+    with _lock: registros = list(_consultas)
+    return _agrupar(registros, "sql")
+
+
+def consultas_mais_lentas(n=20):
+    with _lock: registros = list(_consultas)
+    return sorted(registros, key=lambda r: r["ms"], reverse=True)[:n]
+
+
+def limpar():
+    with _lock:
+        _consultas.clear(); _paginas.clear()
+
+
+if os.environ.get("OFICINA_LOG_METRICAS"):
+    _abrir_log(os.environ["OFICINA_LOG_METRICAS"])   # configuração do servidor: qualquer caminho
@@ -0,0 +1,525 @@
+"""
+MIGRAÇÕES — versão do schema e passos ordenados
+
+Cada migração é (versão, descrição, passos); um passo é um comando SQL ou
+uma função que recebe o cursor. As pendentes são aplicadas em ordem, cada
+uma na sua transação, e registradas em schema_version. Bancos antigos
+(oficina.db já existente) passam pelos mesmos passos, por isso todos são
+idempotentes.
+
+Os passos em texto valem para SQLite e PostgreSQL (tipos ajustados por
+_ddl); gatilhos e busca textual têm uma versão por backend (_somente). Num
+PostgreSQL novo, rode a CLI uma vez antes de subir as réplicas.
+
+Uso:  python -m oficina.migracoes [--db oficina.db | --db postgresql://...] [--planos]
+"""
+
+import argparse
+import logging
+import re
+import sqlite3
+from datetime import date, datetime
+
+from oficina import consultas, db
+from oficina.pdf import SQL_ITENS_PDF, SQL_ORCAMENTO_PDF
+from oficina.veiculos import chave_placa, normalizar_placa
+
+_log = logging.getLogger(__name__)
+
+
+def _somente(backend, *passos):
+    """Passo que só executa no backend indicado ('sqlite' ou 'postgres')"""
+    def passo(c):
+        if db.backend() == backend:
+            for p in passos: c.execute(p)
+    return passo
+
+
+def _ddl(sql):
+    """Tipos do SQLite → PostgreSQL nos passos comuns aos dois backends"""
+    if db.backend() != "postgres": return sql
+    return (sql.replace("INTEGER PRIMARY KEY AUTOINCREMENT", "SERIAL PRIMARY KEY")
+               .replace(" REAL", " DOUBLE PRECISION"))
+
+
+def _somar(grupo, chave, qtd, total="0"):
+    """Upsert usado nos gatilhos de dashboard_stats (expressões SQL)"""
+    return (f"INSERT INTO dashboard_stats(grupo,chave,qtd,total) VALUES('{grupo}',{chave},{qtd},{total}) "
+            f"ON CONFLICT(grupo,chave) DO UPDATE SET qtd=qtd+excluded.qtd, total=total+excluded.total;")
+
+
+def _so_digitos(col):
+    return f"replace(replace(replace(replace(replace(replace({col},'(',''),')',''),'-',''),' ',''),'+',''),'.','')"
+
+
+# Documento de busca de um cliente: dados do cadastro + placas/modelos dos seus carros
+_DOC_BUSCA_CLIENTE = f"""
+    INSERT INTO clientes_fts(rowid,nome,telefone,logradouro,placas,modelos)
+    SELECT c.id, c.nome,
+           COALESCE(c.telefone,'') || ' ' || {_so_digitos("COALESCE(c.telefone,'')")},
+           c.logradouro,
+           (SELECT group_concat(placa || CASE WHEN instr(placa,'-') THEN ' ' || replace(placa,'-','') ELSE '' END, ' ')
+            FROM carros WHERE cliente_id=c.id),
+           (SELECT group_concat(marca || ' ' || modelo, ' ') FROM carros WHERE cliente_id=c.id)
+    FROM clientes c"""
+
+
+def _reindexar_cliente(expr_id):
+    return (f"DELETE FROM clientes_fts WHERE rowid={expr_id};"
+            f"{_DOC_BUSCA_CLIENTE} WHERE c.id={expr_id};")
+
+
+
+# PostgreSQL: mesmos resumos do dashboard_stats, por funções plpgsql
+_STATS_PG = [
+    """CREATE OR REPLACE FUNCTION stats_somar(g TEXT, k TEXT, q INTEGER, t DOUBLE PRECISION)
+       RETURNS void AS $$
+           INSERT INTO dashboard_stats(grupo,chave,qtd,total) VALUES(g,k,q,t)
+           ON CONFLICT(grupo,chave) DO UPDATE
+           SET qtd=dashboard_stats.qtd+excluded.qtd, total=dashboard_stats.total+excluded.total
+       $$ LANGUAGE sql""",
+    # clientes/carros: o grupo é o argumento do gatilho
+    """CREATE OR REPLACE FUNCTION trg_stats_contar() RETURNS trigger AS $$ BEGIN
+           PERFORM stats_somar(TG_ARGV[0], '', CASE WHEN TG_OP='INSERT' THEN 1 ELSE -1 END, 0);
+           RETURN NULL; END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION trg_stats_servicos() RETURNS trigger AS $$ BEGIN
+           IF TG_OP IN ('UPDATE','DELETE') THEN
+               PERFORM stats_somar('servicos', '', -1, -COALESCE(OLD.total,0));
+               PERFORM stats_somar('mes', substr(OLD.data,1,7), -1, -COALESCE(OLD.total,0));
+           END IF;
+           IF TG_OP IN ('UPDATE','INSERT') THEN
+               PERFORM stats_somar('servicos', '', 1, COALESCE(NEW.total,0));
+               PERFORM stats_somar('mes', substr(NEW.data,1,7), 1, COALESCE(NEW.total,0));
+           END IF;
+           RETURN NULL; END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION trg_stats_status() RETURNS trigger AS $$ BEGIN
+           IF TG_OP IN ('UPDATE','DELETE') THEN
+               PERFORM stats_somar('status', COALESCE(OLD.status,''), -1, 0);
+           END IF;
+           IF TG_OP IN ('UPDATE','INSERT') THEN
+               PERFORM stats_somar('status', COALESCE(NEW.status,''), 1, 0);
+           END IF;
+           RETURN NULL; END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS trg_stats_cli ON clientes",
+    """CREATE TRIGGER trg_stats_cli AFTER INSERT OR DELETE ON clientes
+       FOR EACH ROW EXECUTE PROCEDURE trg_stats_contar('clientes')""",
+    "DROP TRIGGER IF EXISTS trg_stats_car ON carros",
+    """CREATE TRIGGER trg_stats_car AFTER INSERT OR DELETE ON carros
+       FOR EACH ROW EXECUTE PROCEDURE trg_stats_contar('carros')""",
+    "DROP TRIGGER IF EXISTS trg_stats_srv ON servicos_realizados",
+    """CREATE TRIGGER trg_stats_srv AFTER INSERT OR DELETE OR UPDATE OF data,total ON servicos_realizados
+       FOR EACH ROW EXECUTE PROCEDURE trg_stats_servicos()""",
+    "DROP TRIGGER IF EXISTS trg_stats_orc ON orcamentos",
+    """CREATE TRIGGER trg_stats_orc AFTER INSERT OR DELETE OR UPDATE OF status ON orcamentos
+       FOR EACH ROW EXECUTE PROCEDURE trg_stats_status()""",
+]
+
+# Minúsculas sem acento. Acentuadas maiúsculas também vão no translate: num banco com
+# collation C o lower() só converte A-Z (a migração 12 corrige bancos já criados)
+_BUSCA_NORMALIZAR_PG = """CREATE OR REPLACE FUNCTION busca_normalizar(t TEXT) RETURNS TEXT AS $$
+           SELECT translate(lower(COALESCE(t,'')),
+                            'áàâãäéèêëíìîïóòôõöúùûüçÁÀÂÃÄÉÈÊËÍÌÎÏÓÒÔÕÖÚÙÛÜÇ',
+                            'aaaaaeeeeiiiiooooouuuucaaaaaeeeeiiiiooooouuuuc')
+       $$ LANGUAGE sql IMMUTABLE"""
+
+# PostgreSQL: no lugar do FTS5, tsvector (dicionário 'simple', sem acentos) com índice GIN
+_BUSCA_PG = [
+    """CREATE TABLE IF NOT EXISTS clientes_busca (
+        cliente_id INTEGER PRIMARY KEY, placas TEXT, doc TSVECTOR)""",
+    "CREATE INDEX IF NOT EXISTS idx_clientes_busca_doc ON clientes_busca USING GIN(doc)",
+    _BUSCA_NORMALIZAR_PG,
+    """CREATE OR REPLACE VIEW clientes_busca_doc AS
+       SELECT c.id AS cliente_id, p.placas,
+              to_tsvector('simple', busca_normalizar(concat_ws(' ', c.nome,
+                  c.telefone, regexp_replace(COALESCE(c.telefone,''), '[^0-9]', '', 'g'),
+                  c.logradouro, p.placas, p.modelos))) AS doc
+       FROM clientes c LEFT JOIN LATERAL (
+           SELECT string_agg(placa || CASE WHEN position('-' IN placa) > 0
+                                           THEN ' ' || replace(placa,'-','') ELSE '' END, ' ') AS placas,
+                  string_agg(marca || ' ' || modelo, ' ') AS modelos
+           FROM carros WHERE cliente_id=c.id) p ON true""",
+    """CREATE OR REPLACE FUNCTION reindexar_cliente(cid INTEGER) RETURNS void AS $$
+           DELETE FROM clientes_busca WHERE cliente_id=cid;
+           INSERT INTO clientes_busca SELECT * FROM clientes_busca_doc WHERE cliente_id=cid;
+       $$ LANGUAGE sql""",
+    """CREATE OR REPLACE FUNCTION trg_busca_clientes() RETURNS trigger AS $$ BEGIN
+           IF TG_OP IN ('UPDATE','DELETE') THEN PERFORM reindexar_cliente(OLD.id); END IF;
+           IF TG_OP IN ('UPDATE','INSERT') THEN PERFORM reindexar_cliente(NEW.id); END IF;
+           RETURN NULL; END $$ LANGUAGE plpgsql""",
+    """CREATE OR REPLACE FUNCTION trg_busca_carros() RETURNS trigger AS $$ BEGIN
+           IF TG_OP IN ('UPDATE','DELETE') THEN PERFORM reindexar_cliente(OLD.cliente_id); END IF;
+           IF TG_OP IN ('UPDATE','INSERT') THEN PERFORM reindexar_cliente(NEW.cliente_id); END IF;
+           RETURN NULL; END $$ LANGUAGE plpgsql""",
+    "DROP TRIGGER IF EXISTS trg_busca_cli ON clientes",
+    """CREATE TRIGGER trg_busca_cli AFTER INSERT OR UPDATE OR DELETE ON clientes
+       FOR EACH ROW EXECUTE PROCEDURE trg_busca_clientes()""",
+    "DROP TRIGGER IF EXISTS trg_busca_car ON carros",
+    """CREATE TRIGGER trg_busca_car AFTER INSERT OR UPDATE OR DELETE ON carros
+       FOR EACH ROW EXECUTE PROCEDURE trg_busca_carros()""",
+    "DELETE FROM clientes_busca",
+    "INSERT INTO clientes_busca SELECT * FROM clientes_busca_doc",
+]
+
+
+def _menus_normalizados(c):
+    """usuarios.menus_permitidos ("a,b,c") → uma linha por (usuário, menu) em usuario_menus
+
+    A coluna antiga fica no banco, sem uso, para a migração poder ser desfeita.
+    """
+    if "menus_permitidos" not in [d[0] for d in c.execute("SELECT * FROM usuarios LIMIT 0").description]:
+        return
+    pares = [(uid, m) for uid, menus in c.execute("SELECT id,menus_permitidos FROM usuarios").fetchall()
+             for m in dict.fromkeys((menus or "").split(",")) if m]
+    c.executemany("INSERT INTO usuario_menus(usuario_id,menu) VALUES(?,?) ON CONFLICT DO NOTHING", pares)
+
+
+def _jobs_dono(c):
+    """Processo dono de cada tarefa (jobs.INSTANCIA) e quantas vezes ela começou a rodar"""
+    colunas = [d[0] for d in c.execute("SELECT * FROM jobs LIMIT 0").description]
+    if "dono" not in colunas:
+        c.execute("ALTER TABLE jobs ADD COLUMN dono TEXT")
+    if "tentativas" not in colunas:
+        c.execute("ALTER TABLE jobs ADD COLUMN tentativas INTEGER NOT NULL DEFAULT 0")
+
+
+def _placas_canonicas(c):
+    """carros.placa_chave preenchida; carros do mesmo dono com a mesma chave viram um só.
+
+    Fica o cadastro mais recente (km atual, com o maior km do grupo); orçamentos e
+    serviços dos repetidos passam para ele. A mesma chave com donos diferentes não é
+    unida: o carro mais recente fica com a chave e os dos outros donos recebem
+    "chave#id" (ainda achados pela busca por prefixo), listados no log para revisão.
+    """
+    if "placa_chave" not in [d[0] for d in c.execute("SELECT * FROM carros LIMIT 0").description]:
+        c.execute("ALTER TABLE carros ADD COLUMN placa_chave TEXT")
+    grupos = {}
+    for cid, dono, placa, km in c.execute("SELECT id,cliente_id,placa,km FROM carros ORDER BY id").fetchall():
+        grupos.setdefault(chave_placa(placa) or None, {}).setdefault(dono, []).append((cid, placa, km))
+    mover, excluir, chaves, placas = [], [], [], []
+    for chave, por_dono in grupos.items():
+        if chave is None: continue       # sem placa: nada a comparar
+        ultimos = []
+        for carros in por_dono.values():
+            *repetidos, ultimo = carros
+            mover   += [(ultimo[0], r[0]) for r in repetidos]
+            excluir += [(r[0],) for r in repetidos]
+            ultimos.append((ultimo, max((r[2] for r in carros if r[2] is not None), default=ultimo[2])))
+        ultimos.sort(key=lambda u: u[0][0])
+        (cid, placa, _), km = ultimos.pop()
+        chaves.append((chave, km, cid))
+        if (normalizar_placa(placa) or placa) != placa:
+            placas.append((normalizar_placa(placa), cid))
+        for (outro, outra_placa, _), km in ultimos:
+            chaves.append((f"{chave}#{outro}", km, outro))
+            _log.warning("placa %s do carro %s é a mesma do carro %s, de outro dono: "
+                         "placa_chave %s#%s, revise o cadastro", outra_placa, outro, cid, chave, outro)
+    for tabela in ("orcamentos", "servicos_realizados"):
+        c.executemany(f"UPDATE {tabela} SET carro_id=? WHERE carro_id=?", mover)
+    c.executemany("DELETE FROM carros WHERE id=?", excluir)
+    c.executemany("UPDATE carros SET placa_chave=?,km=? WHERE id=?", chaves)
+    c.executemany("UPDATE carros SET placa=? WHERE id=?", placas)   # só as que mudam: reindexa a busca
+
+
+MIGRACOES = [
+    (1, "tabelas base", [
+        """CREATE TABLE IF NOT EXISTS clientes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT, telefone TEXT, logradouro TEXT, numero TEXT)""",
+        """CREATE TABLE IF NOT EXISTS carros (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER, placa TEXT UNIQUE,
+            marca TEXT, modelo TEXT, km INTEGER)""",
+        """CREATE TABLE IF NOT EXISTS catalogo_servicos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            descricao TEXT, valor REAL)""",
+        """CREATE TABLE IF NOT EXISTS orcamentos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            cliente_id INTEGER, carro_id INTEGER,
+            data TEXT, status TEXT, total REAL, observacoes TEXT)""",
+        """CREATE TABLE IF NOT EXISTS itens_orcamento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orcamento_id INTEGER, servico_id INTEGER,
+            descricao TEXT, quantidade INTEGER,
+            valor_unitario REAL, subtotal REAL)""",
+        """CREATE TABLE IF NOT EXISTS servicos_realizados (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            orcamento_id INTEGER, cliente_id INTEGER, carro_id INTEGER,
+            data TEXT, total REAL, observacoes TEXT)""",
+        """CREATE TABLE IF NOT EXISTS itens_servico (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            servico_id INTEGER, descricao TEXT,
+            quantidade INTEGER, valor_unitario REAL, subtotal REAL)""",
+        """CREATE TABLE IF NOT EXISTS usuarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE, password TEXT,
+            nome TEXT, nivel TEXT, menus_permitidos TEXT)""",
+        """CREATE TABLE IF NOT EXISTS configuracoes (
+            chave TEXT PRIMARY KEY,
+            valor TEXT)""",
+    ]),
+    (2, "índices de chaves estrangeiras, status e datas", [
+        "CREATE INDEX IF NOT EXISTS idx_carros_cliente ON carros(cliente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente ON orcamentos(cliente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orcamentos_carro ON orcamentos(carro_id)",
+        "CREATE INDEX IF NOT EXISTS idx_orcamentos_status ON orcamentos(status)",
+        "CREATE INDEX IF NOT EXISTS idx_itens_orcamento_orcamento ON itens_orcamento(orcamento_id)",
+        "CREATE INDEX IF NOT EXISTS idx_servicos_realizados_data ON servicos_realizados(data)",
+        "CREATE INDEX IF NOT EXISTS idx_servicos_realizados_cliente ON servicos_realizados(cliente_id)",
+        "CREATE INDEX IF NOT EXISTS idx_itens_servico_servico ON itens_servico(servico_id)",
+        "ANALYZE",
+    ]),
+    (3, "datas em ISO-8601 (AAAA-MM-DD HH:MM) e índice por data dos orçamentos", [
+        # dd/mm/AAAA HH:MM → AAAA-MM-DD HH:MM
+        """UPDATE orcamentos SET data =
+               substr(data,7,4)||'-'||substr(data,4,2)||'-'||substr(data,1,2)||substr(data,11)
+           WHERE data LIKE '__/__/____%'""",
+        """UPDATE servicos_realizados SET data =
+               substr(data,7,4)||'-'||substr(data,4,2)||'-'||substr(data,1,2)||substr(data,11)
+           WHERE data LIKE '__/__/____%'""",
+        "CREATE INDEX IF NOT EXISTS idx_orcamentos_data ON orcamentos(data)",
+    ]),
+    (4, "resumo do dashboard (dashboard_stats) mantido por gatilhos", [
+        """CREATE TABLE IF NOT EXISTS dashboard_stats (
+            grupo TEXT NOT NULL, chave TEXT NOT NULL DEFAULT '',
+            qtd INTEGER NOT NULL DEFAULT 0, total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (grupo, chave))""",
+        # grupos: clientes | carros | servicos (qtd/total) | mes 'AAAA-MM' (qtd/total) | status (qtd)
+        _somente("sqlite",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_cli_ins AFTER INSERT ON clientes BEGIN
+                {_somar('clientes', "''", 1)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_cli_del AFTER DELETE ON clientes BEGIN
+                {_somar('clientes', "''", -1)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_car_ins AFTER INSERT ON carros BEGIN
+                {_somar('carros', "''", 1)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_car_del AFTER DELETE ON carros BEGIN
+                {_somar('carros', "''", -1)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_srv_ins AFTER INSERT ON servicos_realizados BEGIN
+                {_somar('servicos', "''", 1, "COALESCE(new.total,0)")}
+                {_somar('mes', "substr(new.data,1,7)", 1, "COALESCE(new.total,0)")} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_srv_del AFTER DELETE ON servicos_realizados BEGIN
+                {_somar('servicos', "''", -1, "-COALESCE(old.total,0)")}
+                {_somar('mes', "substr(old.data,1,7)", -1, "-COALESCE(old.total,0)")} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_srv_upd AFTER UPDATE OF data,total ON servicos_realizados BEGIN
+                {_somar('servicos', "''", 0, "COALESCE(new.total,0)-COALESCE(old.total,0)")}
+                {_somar('mes', "substr(old.data,1,7)", -1, "-COALESCE(old.total,0)")}
+                {_somar('mes', "substr(new.data,1,7)", 1, "COALESCE(new.total,0)")} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_orc_ins AFTER INSERT ON orcamentos BEGIN
+                {_somar('status', "COALESCE(new.status,'')", 1)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_orc_del AFTER DELETE ON orcamentos BEGIN
+                {_somar('status', "COALESCE(old.status,'')", -1)} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_stats_orc_upd AFTER UPDATE OF status ON orcamentos BEGIN
+                {_somar('status', "COALESCE(old.status,'')", -1)}
+                {_somar('status', "COALESCE(new.status,'')", 1)} END"""),
+        _somente("postgres", *_STATS_PG),
+        # Carga inicial a partir dos dados existentes (única varredura completa)
+        "DELETE FROM dashboard_stats",
+        """INSERT INTO dashboard_stats(grupo,chave,qtd,total)
+               SELECT 'clientes','',COUNT(*),0 FROM clientes
+               UNION ALL SELECT 'carros','',COUNT(*),0 FROM carros
+               UNION ALL SELECT 'servicos','',COUNT(*),COALESCE(SUM(total),0) FROM servicos_realizados""",
+        """INSERT INTO dashboard_stats(grupo,chave,qtd,total)
+               SELECT 'mes',substr(data,1,7),COUNT(*),COALESCE(SUM(total),0)
+               FROM servicos_realizados GROUP BY substr(data,1,7)""",
+        """INSERT INTO dashboard_stats(grupo,chave,qtd,total)
+               SELECT 'status',COALESCE(status,''),COUNT(*),0 FROM orcamentos GROUP BY COALESCE(status,'')""",
+    ]),
+    (5, "busca textual FTS5 de clientes (nome, telefone, endereço, placas)", [
+        _somente("sqlite",
+            """CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5(
+                nome, telefone, logradouro, placas, modelos,
+                tokenize="unicode61 remove_diacritics 2", prefix='2 3')""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_fts_cli_ins AFTER INSERT ON clientes BEGIN
+                {_reindexar_cliente("new.id")} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_fts_cli_upd AFTER UPDATE ON clientes BEGIN
+                {_reindexar_cliente("old.id")} {_reindexar_cliente("new.id")} END""",
+            """CREATE TRIGGER IF NOT EXISTS trg_fts_cli_del AFTER DELETE ON clientes BEGIN
+                DELETE FROM clientes_fts WHERE rowid=old.id; END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_fts_car_ins AFTER INSERT ON carros BEGIN
+                {_reindexar_cliente("new.cliente_id")} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_fts_car_upd AFTER UPDATE ON carros BEGIN
+                {_reindexar_cliente("old.cliente_id")} {_reindexar_cliente("new.cliente_id")} END""",
+            f"""CREATE TRIGGER IF NOT EXISTS trg_fts_car_del AFTER DELETE ON carros BEGIN
+                {_reindexar_cliente("old.cliente_id")} END""",
+            "DELETE FROM clientes_fts",
+            _DOC_BUSCA_CLIENTE),
+        _somente("postgres", *_BUSCA_PG),
+    ]),
+    (6, "permissões de menu normalizadas (usuario_menus)", [
+        """CREATE TABLE IF NOT EXISTS usuario_menus (
+            usuario_id INTEGER NOT NULL REFERENCES usuarios(id) ON DELETE CASCADE,
+            menu TEXT NOT NULL,
+            PRIMARY KEY (usuario_id, menu))""",
+        _menus_normalizados,
+    ]),
+    (7, "índices compostos da visão do cliente (por cliente → veículo → data)", [
+        # Os novos índices cobrem os antigos de cliente_id sozinho (mesmo prefixo)
+        "CREATE INDEX IF NOT EXISTS idx_servicos_realizados_cliente_carro "
+        "ON servicos_realizados(cliente_id, carro_id, data)",
+        "DROP INDEX IF EXISTS idx_servicos_realizados_cliente",
+        "CREATE INDEX IF NOT EXISTS idx_orcamentos_cliente_status ON orcamentos(cliente_id, status)",
+        "DROP INDEX IF EXISTS idx_orcamentos_cliente",
+        "ANALYZE",
+    ]),
+    (8, "tarefas em segundo plano (jobs)", [
+        """CREATE TABLE IF NOT EXISTS jobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tipo TEXT NOT NULL,
+            parametros TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'PENDENTE',
+            feitos INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            resumo TEXT,
+            arquivo TEXT,
+            nome_arquivo TEXT,
+            mime TEXT,
+            erro TEXT,
+            criado_em TEXT NOT NULL,
+            atualizado_em TEXT NOT NULL,
+            expira_em TEXT)""",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)",
+        "CREATE INDEX IF NOT EXISTS idx_jobs_expira ON jobs(expira_em)",
+    ]),
+    (9, "chave canônica de placa (placa_chave) única, sem carros repetidos", [
+        # A busca textual só depende de dono, placa, marca e modelo: km e placa_chave não reindexam
+        _somente("sqlite",
+            "DROP TRIGGER IF EXISTS trg_fts_car_upd",
+            f"""CREATE TRIGGER trg_fts_car_upd AFTER UPDATE OF cliente_id,placa,marca,modelo ON carros BEGIN
+                {_reindexar_cliente("old.cliente_id")} {_reindexar_cliente("new.cliente_id")} END"""),
+        _somente("postgres",
+            "DROP TRIGGER IF EXISTS trg_busca_car ON carros",
+            """CREATE TRIGGER trg_busca_car AFTER INSERT OR DELETE OR UPDATE OF cliente_id,placa,marca,modelo
+               ON carros FOR EACH ROW EXECUTE PROCEDURE trg_busca_carros()"""),
+        _placas_canonicas,
+        _somente("sqlite", "CREATE UNIQUE INDEX IF NOT EXISTS idx_carros_placa_chave ON carros(placa_chave)"),
+        # text_pattern_ops: o LIKE 'prefixo%' usa o índice em qualquer collation
+        _somente("postgres", "CREATE UNIQUE INDEX IF NOT EXISTS idx_carros_placa_chave "
+                             "ON carros(placa_chave text_pattern_ops)"),
+    ]),
+    (10, "índice de prefixo da descrição do catálogo (seletor de serviços)", [
+        # NOCASE: o LIKE 'prefixo%' do SQLite (que ignora maiúsculas) só usa índice com essa collation
+        _somente("sqlite", "CREATE INDEX IF NOT EXISTS idx_catalogo_descricao "
+                           "ON catalogo_servicos(descricao COLLATE NOCASE)"),
+        _somente("postgres", "CREATE INDEX IF NOT EXISTS idx_catalogo_descricao "
+                             "ON catalogo_servicos(lower(descricao) text_pattern_ops)"),
+    ]),
+    (11, "carros do cliente já na ordem da placa", [
+        "CREATE INDEX IF NOT EXISTS idx_carros_cliente_placa ON carros(cliente_id, placa)",
+        "DROP INDEX IF EXISTS idx_carros_cliente",
+    ]),
+    (12, "busca do PostgreSQL sem acentos também em bancos com collation C", [
+        _somente("postgres", _BUSCA_NORMALIZAR_PG,
+                 "DELETE FROM clientes_busca",
+                 "INSERT INTO clientes_busca SELECT * FROM clientes_busca_doc"),
+    ]),
+    (13, "lista de clientes já na ordem do nome", [
+        "CREATE INDEX IF NOT EXISTS idx_clientes_nome ON clientes(nome)",
+    ]),
+    (14, "dono e tentativas das tarefas (jobs)", [
+        _jobs_dono,
+    ]),
+]
+
+# Consultas quentes, no texto exato que o app executa: o plano não pode varrer
+# tabela (SCAN) nem ordenar num B-tree temporário. Percorrer um índice na
+# ordem do ORDER BY (SCAN ... USING INDEX) só vale com LIMIT, que para cedo. Quando o SQL é montado por
+# filtros, vem de uma função de oficina.consultas que retorna (sql, parâmetros).
+CONSULTAS_INDEXADAS = {
+    "get_clientes (primeira página)": (consultas.SQL_LISTA_CLIENTES, (200,)),
+    "get_carros_por_cliente": (consultas.SQL_CARROS_DO_CLIENTE, (1,)),
+    **{f"pode_excluir_cliente ({t})": (sql, (1,)) for t, sql in consultas.SQL_CONTAR_DO_CLIENTE.items()},
+    "orçamento do PDF": (SQL_ORCAMENTO_PDF + " WHERE o.id=?", (1,)),
+    "itens do PDF": (SQL_ITENS_PDF + " WHERE orcamento_id=?", (1,)),
+    "Histórico por status": (lambda: consultas.pagina_orcamentos(("PENDENTE",), antes_de=1000), (50,)),
+    "resumo dos serviços realizados no período":
+        (lambda: consultas.resumo_servicos_realizados(date(2026, 1, 1), date(2026, 1, 31)), ()),
+    "buscar_servicos (código)": (consultas.SQL_SERVICO_POR_ID, (1,)),
+    "buscar_servicos (descrição)": (consultas.SQL_BUSCA_SERVICOS["sqlite"], ("TROCA%", 20)),
+    "buscar_por_placa": (consultas.SQL_BUSCA_PLACA["sqlite"], ("ABC1*", 20)),
+}
+
+
+def versao_atual(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS schema_version (
+                        versao INTEGER PRIMARY KEY, descricao TEXT, aplicada_em TEXT)""")
+    return conn.execute("SELECT COALESCE(MAX(versao),0) FROM schema_version").fetchone()[0]
+
+
+def migrar(conn=None, ate=None):
+    """Aplica as migrações pendentes (até a versão `ate`, se informada); retorna as versões aplicadas"""
+    proprio = conn is None
+    conn = conn or db.get_conn()
+    aplicadas = []
+    try:
+        for versao, descricao, passos in MIGRACOES:
+            if versao <= versao_atual(conn) or (ate is not None and versao > ate):
+                continue
+            # Trava de escrita: dois processos (ou réplicas) não migram ao mesmo tempo
+            db.iniciar_escrita(conn, "migracoes")
+            try:
+                if versao <= versao_atual(conn):
+                    conn.rollback(); continue
+                c = conn.cursor()
+                for passo in passos:
+                    passo(c) if callable(passo) else c.execute(_ddl(passo))
+                c.execute("INSERT INTO schema_version(versao,descricao,aplicada_em) VALUES(?,?,?)",
+                          (versao, descricao, datetime.now().isoformat(timespec="seconds")))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            aplicadas.append(versao)
+    finally:
+        if proprio: conn.close()
+    return aplicadas
+
+
+def planos_consultas(conn):
+    """{nome: (só usa índice, linhas do EXPLAIN QUERY PLAN)} das consultas quentes"""
+    res = {}
+    for nome, (sql, params) in CONSULTAS_INDEXADAS.items():
+        if callable(sql):
+            sql, filtros = sql()
+            params = (*filtros, *params)
+        try:
+            linhas = [r[-1] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params)]
+        except sqlite3.OperationalError as e:   # coluna/tabela de uma migração ainda não aplicada
+            res[nome] = (False, [str(e)]); continue
+        res[nome] = (plano_indexado(sql, linhas), linhas)
+    return res
+
+
+def plano_indexado(sql, linhas):
+    """Se as linhas do EXPLAIN QUERY PLAN de `sql` seguem a regra de CONSULTAS_INDEXADAS"""
+    limitada = re.search(r"\bLIMIT \?\s*$", sql) is not None
+    return not any("TEMP B-TREE" in l or
+                   (l.startswith("SCAN ") and not (limitada and re.search(r"USING (COVERING )?INDEX", l)))
+                   for l in linhas)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Aplica as migrações do schema")
+    ap.add_argument("--db", default=db.DB, help="arquivo SQLite ou URL postgresql:// (padrão: %(default)s)")
+    ap.add_argument("--planos", action="store_true",
+                    help="mostra o plano das consultas quentes antes e depois (só SQLite)")
+    args = ap.parse_args(argv)
+    db.DB = args.db
+    if args.planos and db.backend() != "sqlite":
+        ap.error("--planos usa EXPLAIN QUERY PLAN do SQLite")
+    conn = db.get_conn()
+    antes = planos_consultas(conn) if args.planos else None
+    print(f"schema na versão {versao_atual(conn)}")
+    aplicadas = migrar(conn)
+    print(f"aplicadas: {aplicadas or 'nenhuma'} — agora na versão {versao_atual(conn)}")
+    if args.planos:
+        depois = planos_consultas(conn)
+        falhas = 0
+        for nome, (ok, linhas) in depois.items():
+            print(f"\n{nome}\n  antes:  {' | '.join(antes[nome][1])}\n  depois: {' | '.join(linhas)}")
+            if not ok: falhas += 1; print("  ⚠️ ainda varre a tabela ou ordena fora do índice")
+        conn.close()
+        raise SystemExit(1 if falhas else 0)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+PDF DO ORÇAMENTO — renderização ReportLab a partir das linhas já consultadas
+
+O ReportLab só é importado na primeira renderização: abrir o app (e cada
+rerun que não gera PDF) não paga esse custo.
+"""
+
+import io
+
+from oficina.formatos import fmt_km, fmt_data
+from oficina.pix import gerar_qrcode_pix
+
+# Colunas na ordem esperada por renderizar_pdf_orcamento (orc[0] .. orc[12])
+SQL_ORCAMENTO_PDF = """SELECT o.id,c.nome,c.telefone,c.logradouro,c.numero,
+                              ca.placa,ca.marca,ca.modelo,ca.km,
+                              o.data,o.status,o.total,o.observacoes
+                       FROM orcamentos o
+                       JOIN clientes c ON o.cliente_id=c.id
+                       JOIN carros ca  ON o.carro_id=ca.id"""
+SQL_ITENS_PDF = "SELECT descricao,quantidade,valor_unitario,subtotal FROM itens_orcamento"
+
+
+def renderizar_pdf_orcamento(orc, itens, chave_pix):
+    """Monta o PDF e devolve os bytes; não acessa o banco"""
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib import colors
+    from reportlab.lib.units import inch
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.enums import TA_CENTER
+
+    buf = io.BytesIO()
+    doc = SimpleDocTemplate(buf, pagesize=A4)
+    styles = getSampleStyleSheet()
+    st_t = ParagraphStyle('T',parent=styles['Heading1'],fontSize=18,
+                          textColor=colors.HexColor('#1a1a1a'),spaceAfter=20,alignment=TA_CENTER)
+    elems = [Paragraph(f"ORÇAMENTO Nº {orc[0]:04d}", st_t), Spacer(1,10)]
+    info = [['Data:',fmt_data(orc[9]),'Status:',orc[10]],
+            ['Cliente:',orc[1],'',''],
+            ['Telefone:',orc[2] or '—','',''],
+            ['Endereço:',f"{orc[3] or ''} {orc[4] or ''}".strip(),'',''],
+            ['Veículo:',f"{orc[6]} {orc[7]}",'Placa:',orc[5]],
+            ['KM:',fmt_km(orc[8]),'','']]
+    t = Table(info, colWidths=[1.5*inch,2.5*inch,1*inch,1.5*inch])
+    t.setStyle(TableStyle([('FONTNAME',(0,0),(-1,-1),'Helvetica'),
+                            ('FONTSIZE',(0,0),(-1,-1),10),
+                            ('GRID',(0,0),(-1,-1),.5,colors.grey)]))
+    elems += [t, Spacer(1,14)]
+    rows = [['Descrição','Qtd','Valor Unit.','Subtotal']]
+    for i in itens:
+        rows.append([i[0],str(i[1]),f"R$ {i[2]:.2f}",f"R$ {i[3]:.2f}"])
+    st2 = Table(rows, colWidths=[3.5*inch,.7*inch,1.2*inch,1.2*inch])
+    st2.setStyle(TableStyle([('BACKGROUND',(0,0),(-1,0),colors.HexColor('#2c3e50')),
+                              ('TEXTCOLOR',(0,0),(-1,0),colors.white),
+                              ('ALIGN',(0,0),(-1,-1),'CENTER'),
+                              ('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),
+                              ('GRID',(0,0),(-1,-1),1,colors.black)]))
+    elems += [st2, Spacer(1,10)]
+    tot = Table([['','','TOTAL:',f"R$ {orc[11]:.2f}"]],
+                colWidths=[3.5*inch,.7*inch,1.2*inch,1.2*inch])
+    tot.setStyle(TableStyle([('FONTNAME',(0,0),(-1,-1),'Helvetica-Bold'),
+                              ('FONTSIZE',(0,0),(-1,-1),13),
+                              ('ALIGN',(2,0),(-1,-1),'RIGHT')]))
+    elems.append(tot)
+    elems.append(Spacer(1, 20))
+    
+    # ─── QR CODE PIX ───
+    qr_img_buf = gerar_qrcode_pix(chave_pix, orc[11])
+    
+    pix_txt = Paragraph(f"<b>Pagamento via PIX</b><br/>Chave: {chave_pix}<br/>Valor: R$ {orc[11]:.2f}",
+                        styles['Normal'])
+    elems.append(pix_txt)
+    elems.append(Spacer(1, 10))
+    
+    qr_img = RLImage(qr_img_buf, width=1.5*inch, height=1.5*inch)
+    elems.append(qr_img)
+    
+    doc.build(elems)
+    return buf.getvalue()
@@ -0,0 +1,92 @@
+"""
+PIX — BRCode (EMV) e QR Code com CRC16 por tabela e memoização
+"""
+
+import io
+from functools import lru_cache
+
+# CRC16-CCITT (polinômio 0x1021): tabela de 256 entradas calculada uma única vez
+_CRC16_TABELA = []
+for _b in range(256):
+    _crc = _b << 8
+    for _ in range(8):
+        _crc = ((_crc << 1) ^ 0x1021) if _crc & 0x8000 else (_crc << 1)
+    _CRC16_TABELA.append(_crc & 0xFFFF)
+_CRC16_TABELA = tuple(_CRC16_TABELA)
+del _b, _crc
+
+
+def crc16_ccitt(data):
+    crc = 0xFFFF
+    tabela = _CRC16_TABELA
+    for byte in data.encode('utf-8'):
+        crc = ((crc << 8) & 0xFFFF) ^ tabela[(crc >> 8) ^ byte]
+    return f"{crc:04X}"
+
+
+def _limpar_chave(chave_pix):
+    # Remover espaços e caracteres de formatação
+    chave_limpa = chave_pix.replace(" ", "").replace("-", "").replace("(", "").replace(")", "").replace("+", "")
+    # Para telefone, adicionar +55 se não tiver
+    if chave_limpa.isdigit() and len(chave_limpa) >= 10:
+        if not chave_limpa.startswith("55"):
+            chave_limpa = "55" + chave_limpa
+        chave_limpa = "+" + chave_limpa
+    return chave_limpa
+
+
+@lru_cache(maxsize=1024)
+def payload_pix(chave_pix, valor, nome_beneficiario="Oficina"):
+    """Retorna só o texto PIX "copia e cola" (BRCode EMV), sem gerar imagem"""
+    chave_limpa = _limpar_chave(chave_pix)
+
+    # ID 00: Payload Format Indicator
+    pfi = "000201"
+    # ID 26: Merchant Account Information
+    gui = "0014br.gov.bcb.pix"
+    chave_field = f"01{len(chave_limpa):02d}{chave_limpa}"
+    mai_content = gui + chave_field
+    mai = f"26{len(mai_content):02d}{mai_content}"
+    # ID 52: Merchant Category Code
+    mcc = "52040000"
+    # ID 53: Transaction Currency (986 = BRL)
+    currency = "5303986"
+    # ID 54: Transaction Amount
+    valor_str = f"{valor:.2f}"
+    amount = f"54{len(valor_str):02d}{valor_str}"
+    # ID 58: Country Code
+    country = "5802BR"
+    # ID 59: Merchant Name
+    nome_clean = nome_beneficiario[:25].upper()
+    merchant = f"59{len(nome_clean):02d}{nome_clean}"
+    # ID 60: Merchant City
+    city = "6009SAO PAULO"
+    # ID 62: Additional Data Field
+    ref = "***"
+    adf_content = f"05{len(ref):02d}{ref}"
+    adf = f"62{len(adf_content):02d}{adf_content}"
+
+    payload_sem_crc = pfi + mai + mcc + currency + amount + country + merchant + city + adf + "6304"
+    return payload_sem_crc + crc16_ccitt(payload_sem_crc)
+
+
+@lru_cache(maxsize=256)
+def _qrcode_png(payload):
+    import qrcode   # importado só quando um QR Code é gerado de fato
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_M,
+        box_size=10,
+        border=2
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(fill_color="black", back_color="white")
+    buf = io.BytesIO()
+    img.save(buf, format='PNG')
+    return buf.getvalue()
+
+
+def gerar_qrcode_pix(chave_pix, valor, nome_beneficiario="Oficina"):
+    """Gera QR Code PIX no formato EMV (padrão brasileiro válido)"""
+    return io.BytesIO(_qrcode_png(payload_pix(chave_pix, valor, nome_beneficiario)))
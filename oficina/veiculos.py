@@ -0,0 +1,87 @@
+"""
+VEÍCULOS — marcas/modelos conhecidos e normalização de placas
+
+Listas usadas pelo formulário de carros; a normalização é usada pela
+importação em lote para gravar marca, modelo e placa como o formulário.
+chave_placa() é a chave única de carros.placa_chave: a mesma placa em
+qualquer grafia, antiga ou Mercosul, dá a mesma chave.
+"""
+
+import re
+import unicodedata
+
+MODELOS_POR_MARCA = {
+    "CHEVROLET":  ["AGILE","ASTRA","BLAZER","CELTA","COBALT","CRUZE","EQUINOX","KADETT","MERIVA",
+                   "MONTANA","ONIX","ONIX PLUS","PRISMA","S10","SPIN","TRACKER","TRAILBLAZER","VECTRA","ZAFIRA"],
+    "FIAT":       ["ARGO","BRAVO","CRONOS","DOBLO","DUCATO","FIORINO","GRAND SIENA","IDEA","LINEA",
+                   "MAREA","MOBI","PALIO","PALIO WEEKEND","PUNTO","SIENA","STRADA","TORO","UNO"],
+    "FORD":       ["BRONCO","COURIER","ECOSPORT","EDGE","ESCORT","F-150","F-250","FIESTA","FLEX",
+                   "FOCUS","FUSION","KA","KA+","MAVERICK","MUSTANG","RANGER","TERRITORY"],
+    "HONDA":      ["ACCORD","CITY","CIVIC","CR-V","FIT","HR-V","WR-V"],
+    "HYUNDAI":    ["AZERA","CRETA","ELANTRA","HB20","HB20S","HB20X","IX35","SANTA FE","TUCSON","VELOSTER"],
+    "JEEP":       ["COMMANDER","COMPASS","GLADIATOR","GRAND CHEROKEE","RENEGADE","WRANGLER"],
+    "KIA":        ["CADENZA","CARNIVAL","CERATO","NIRO","OPTIMA","PICANTO","SOUL","SPORTAGE","STINGER","STONIC"],
+    "MERCEDES":   ["A 200","C 180","C 200","C 300","CLA 200","E 200","GLA 200","GLC 250","SPRINTER"],
+    "MITSUBISHI": ["ASX","ECLIPSE CROSS","L200","LANCER","OUTLANDER","PAJERO","PAJERO SPORT"],
+    "NISSAN":     ["FRONTIER","KICKS","LEAF","LIVINA","MARCH","SENTRA","TIIDA","VERSA","X-TRAIL"],
+    "PEUGEOT":    ["2008","207","208","3008","308","408","5008","BOXER","EXPERT","PARTNER"],
+    "RENAULT":    ["CAPTUR","CLIO","DUSTER","FLUENCE","KARDIAN","KWID","LOGAN","OROCH","SANDERO","STEPWAY"],
+    "TOYOTA":     ["CAMRY","COROLLA","COROLLA CROSS","ETIOS","HILUX","LAND CRUISER","PRIUS","RAV4","SW4","YARIS"],
+    "VW":         ["AMAROK","ARTEON","BORA","CROSSFOX","FOX","FUSCA","GOL","GOLF","JETTA","KOMBI",
+                   "NIVUS","PASSAT","POLO","SAVEIRO","T-CROSS","TAOS","TIGUAN","TOUAREG","UP","VIRTUS","VOYAGE"],
+    "BMW":        ["116i","118i","120i","125i","218i","220i","320i","328i","330i","520i","X1","X3","X5","X6"],
+    "AUDI":       ["A1","A3","A4","A5","A6","A7","Q2","Q3","Q5","Q7","TT"],
+    "OUTRA":      [],
+}
+
+
+# Grafias comuns nas planilhas → chave de MODELOS_POR_MARCA
+APELIDOS_MARCA = {
+    "VOLKSWAGEN": "VW", "VOLKS": "VW", "GM": "CHEVROLET", "CHEVROLET GM": "CHEVROLET",
+    "MERCEDES BENZ": "MERCEDES", "MERCEDES-BENZ": "MERCEDES", "MB": "MERCEDES",
+}
+
+# Placa antiga (ABC1234 / ABC-1234) ou Mercosul (ABC1D23)
+PLACA_RE = re.compile(r"^[A-Z]{3}[0-9][A-Z0-9][0-9]{2}$")
+
+
+def _chave(texto):
+    """Maiúsculas sem acentos, espaços, hífens e pontos — só para comparar grafias"""
+    t = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode()
+    return re.sub(r"[\s\-.]+", "", t.upper())
+
+
+_MARCAS = {_chave(m): m for m in MODELOS_POR_MARCA} | {_chave(a): m for a, m in APELIDOS_MARCA.items()}
+_MODELOS = {m: {_chave(x): x.upper() for x in mods} for m, mods in MODELOS_POR_MARCA.items()}
+
+
+def normalizar_placa(placa):
+    """'abc-1234 ' → 'ABC1234'; None se não for placa antiga nem Mercosul"""
+    p = re.sub(r"[\s\-]+", "", str(placa or "")).upper()
+    return p if PLACA_RE.match(p) else None
+
+
+_MERCOSUL = str.maketrans("0123456789", "ABCDEFGHIJ")
+
+
+def chave_placa(texto):
+    """Chave canônica de uma placa (ou do começo dela): só letras e dígitos, no formato Mercosul.
+
+    'abc-1234', 'ABC1234' e 'ABC1C34' dão todas 'ABC1C34' — na conversão para o
+    Mercosul o 2º dígito vira a letra de mesma posição (0→A ... 9→J).
+    """
+    p = re.sub(r"[^A-Z0-9]+", "", str(texto or "").upper())
+    if len(p) >= 5 and p[:3].isalpha() and p[3:5].isdigit():
+        p = p[:4] + p[4].translate(_MERCOSUL) + p[5:]
+    return p
+
+
+def normalizar_marca_modelo(marca, modelo):
+    """(marca canônica, modelo em maiúsculas na grafia da lista); marca None se desconhecida.
+
+    Modelos fora da lista são aceitos como digitados, como no "Outro (digitar)" do formulário.
+    """
+    m = _MARCAS.get(_chave(marca or ""))
+    mod = " ".join(str(modelo or "").split()).upper()
+    if m is None: return None, mod
+    return m, _MODELOS[m].get(_chave(mod), mod)
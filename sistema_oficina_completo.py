@@ -3,118 +3,77 @@ SISTEMA DE OFICINA - VERSÃO WEB COMPLETA
 """
 
 import streamlit as st
-import sqlite3
 import pandas as pd
 from datetime import datetime, date
 import io
+import functools
 import hashlib
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.enums import TA_CENTER
 import os
-import qrcode
+import re
+from oficina.db import (CHAVE_PIX_PADRAO, DB, backend, erros_integridade, get_conn, get_config,
+                        transacao, filtros_periodo_status)
+from oficina.migracoes import migrar
+from oficina.cache_pdf import CachePDF, versao_conteudo
+from oficina.cache_consultas import cache_consulta, invalidar, estatisticas as estatisticas_consultas
+from oficina import consultas, jobs, metricas
+from oficina.formatos import fmt_moeda, fmt_data, agora_iso, intervalo_iso
+from oficina.formatos_series import fmt_moeda_series, fmt_km_series, fmt_data_series
+from oficina.pdf import SQL_ORCAMENTO_PDF, SQL_ITENS_PDF, renderizar_pdf_orcamento
+from oficina.exportar_pdfs import contar_orcamentos
+from oficina.veiculos import MODELOS_POR_MARCA, chave_placa, normalizar_placa
+from oficina.importar import COLUNAS as COLUNAS_IMPORTACAO, importar, erros_csv
+from oficina.exportar_dados import FORMATOS as FORMATOS_EXPORTACAO
 
 st.set_page_config(page_title="Sistema Oficina", page_icon="🔧",
                    layout="wide", initial_sidebar_state="expanded")
 
-DB        = "oficina.db"
 LOGO_PATH = "logo.png"
-
-MODELOS_POR_MARCA = {
-    "CHEVROLET":  ["AGILE","ASTRA","BLAZER","CELTA","COBALT","CRUZE","EQUINOX","KADETT","MERIVA",
-                   "MONTANA","ONIX","ONIX PLUS","PRISMA","S10","SPIN","TRACKER","TRAILBLAZER","VECTRA","ZAFIRA"],
-    "FIAT":       ["ARGO","BRAVO","CRONOS","DOBLO","DUCATO","FIORINO","GRAND SIENA","IDEA","LINEA",
-                   "MAREA","MOBI","PALIO","PALIO WEEKEND","PUNTO","SIENA","STRADA","TORO","UNO"],
-    "FORD":       ["BRONCO","COURIER","ECOSPORT","EDGE","ESCORT","F-150","F-250","FIESTA","FLEX",
-                   "FOCUS","FUSION","KA","KA+","MAVERICK","MUSTANG","RANGER","TERRITORY"],
-    "HONDA":      ["ACCORD","CITY","CIVIC","CR-V","FIT","HR-V","WR-V"],
-    "HYUNDAI":    ["AZERA","CRETA","ELANTRA","HB20","HB20S","HB20X","IX35","SANTA FE","TUCSON","VELOSTER"],
-    "JEEP":       ["COMMANDER","COMPASS","GLADIATOR","GRAND CHEROKEE","RENEGADE","WRANGLER"],
-    "KIA":        ["CADENZA","CARNIVAL","CERATO","NIRO","OPTIMA","PICANTO","SOUL","SPORTAGE","STINGER","STONIC"],
-    "MERCEDES":   ["A 200","C 180","C 200","C 300","CLA 200","E 200","GLA 200","GLC 250","SPRINTER"],
-    "MITSUBISHI": ["ASX","ECLIPSE CROSS","L200","LANCER","OUTLANDER","PAJERO","PAJERO SPORT"],
-    "NISSAN":     ["FRONTIER","KICKS","LEAF","LIVINA","MARCH","SENTRA","TIIDA","VERSA","X-TRAIL"],
-    "PEUGEOT":    ["2008","207","208","3008","308","408","5008","BOXER","EXPERT","PARTNER"],
-    "RENAULT":    ["CAPTUR","CLIO","DUSTER","FLUENCE","KARDIAN","KWID","LOGAN","OROCH","SANDERO","STEPWAY"],
-    "TOYOTA":     ["CAMRY","COROLLA","COROLLA CROSS","ETIOS","HILUX","LAND CRUISER","PRIUS","RAV4","SW4","YARIS"],
-    "VW":         ["AMAROK","ARTEON","BORA","CROSSFOX","FOX","FUSCA","GOL","GOLF","JETTA","KOMBI",
-                   "NIVUS","PASSAT","POLO","SAVEIRO","T-CROSS","TAOS","TIGUAN","TOUAREG","UP","VIRTUS","VOYAGE"],
-    "BMW":        ["116i","118i","120i","125i","218i","220i","320i","328i","330i","520i","X1","X3","X5","X6"],
-    "AUDI":       ["A1","A3","A4","A5","A6","A7","Q2","Q3","Q5","Q7","TT"],
-    "OUTRA":      [],
-}
+PDF_CACHE_DIR = "cache_pdf"   # None = cache de PDFs apenas em memória
 
 TODOS_MENUS = ["🏠 Dashboard","👥 Clientes e Carros","💰 Orçamentos",
                "📜 Histórico","✅ Serviços Realizados","📚 Catálogo",
-               "🔑 Alterar Senha","👤 Usuários","⚙️ Configurações"]
+               "🔑 Alterar Senha","👤 Usuários","📈 Desempenho","⚙️ Configurações"]
+MENUS_ADMIN = ["📈 Desempenho"]   # aparecem para todo admin e para mais ninguém
 
 # ═══════════════════════════ BANCO ═══════════════════════════
 
-def init_db():
-    conn = sqlite3.connect(DB)
+@st.cache_resource(show_spinner=False)
+def init_db(destino):
+    """Migrações, admin, PIX padrão e fila de jobs: uma vez por processo e banco, não a cada rerun"""
+    conn = get_conn()
+    migrar(conn)
     c = conn.cursor()
-    c.executescript("""
-        CREATE TABLE IF NOT EXISTS clientes (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT, telefone TEXT, logradouro TEXT, numero TEXT);
-        CREATE TABLE IF NOT EXISTS carros (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cliente_id INTEGER, placa TEXT UNIQUE,
-            marca TEXT, modelo TEXT, km INTEGER);
-        CREATE TABLE IF NOT EXISTS catalogo_servicos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            descricao TEXT, valor REAL);
-        CREATE TABLE IF NOT EXISTS orcamentos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            cliente_id INTEGER, carro_id INTEGER,
-            data TEXT, status TEXT, total REAL, observacoes TEXT);
-        CREATE TABLE IF NOT EXISTS itens_orcamento (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            orcamento_id INTEGER, servico_id INTEGER,
-            descricao TEXT, quantidade INTEGER,
-            valor_unitario REAL, subtotal REAL);
-        CREATE TABLE IF NOT EXISTS servicos_realizados (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            orcamento_id INTEGER, cliente_id INTEGER, carro_id INTEGER,
-            data TEXT, total REAL, observacoes TEXT);
-        CREATE TABLE IF NOT EXISTS itens_servico (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            servico_id INTEGER, descricao TEXT,
-            quantidade INTEGER, valor_unitario REAL, subtotal REAL);
-        CREATE TABLE IF NOT EXISTS usuarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE, password TEXT,
-            nome TEXT, nivel TEXT, menus_permitidos TEXT);
-        CREATE TABLE IF NOT EXISTS configuracoes (
-            chave TEXT PRIMARY KEY,
-            valor TEXT);
-    """)
     c.execute("SELECT id FROM usuarios WHERE username='admin'")
     if not c.fetchone():
-        c.execute("""INSERT INTO usuarios(username,password,nome,nivel,menus_permitidos)
-                     VALUES('admin',?,  'Administrador','admin',?)""",
-                  (hashlib.sha256("admin123".encode()).hexdigest(), ",".join(TODOS_MENUS)))
+        uid = c.execute("""INSERT INTO usuarios(username,password,nome,nivel)
+                           VALUES('admin',?,'Administrador','admin') RETURNING id""",
+                        (hashlib.sha256("admin123".encode()).hexdigest(),)).fetchone()[0]
+        c.executemany("INSERT INTO usuario_menus(usuario_id,menu) VALUES(?,?)",
+                      [(uid, m) for m in TODOS_MENUS if m not in MENUS_ADMIN])
     # Config padrão PIX
     c.execute("SELECT valor FROM configuracoes WHERE chave='chave_pix'")
     if not c.fetchone():
         c.execute("INSERT INTO configuracoes(chave,valor) VALUES('chave_pix','19995056708')")
     conn.commit(); conn.close()
+    jobs.retomar()   # assume as tarefas de processos parados e liga o sinal de vida deste
 
-def get_conn(): return sqlite3.connect(DB)
+@st.cache_resource
+def get_cache_pdf():
+    """Cache de PDFs compartilhado por todas as sessões do servidor"""
+    return CachePDF(max_itens=256, diretorio=PDF_CACHE_DIR)
 
-def get_config(chave, padrao=""):
+def invalidar_pdfs(coluna, valor):
+    """Descarta os PDFs dos orçamentos ligados a um cliente/carro alterado"""
     conn = get_conn(); c = conn.cursor()
-    c.execute("SELECT valor FROM configuracoes WHERE chave=?", (chave,))
-    r = c.fetchone(); conn.close()
-    return r[0] if r else padrao
+    oids = [r[0] for r in c.execute(f"SELECT id FROM orcamentos WHERE {coluna}=?", (valor,))]
+    conn.close()
+    if oids: get_cache_pdf().invalidar(oids)
 
 def set_config(chave, valor):
-    conn = get_conn(); c = conn.cursor()
-    c.execute("INSERT OR REPLACE INTO configuracoes(chave,valor) VALUES(?,?)", (chave,valor))
-    conn.commit(); conn.close()
+    with transacao() as c:
+        c.execute("""INSERT INTO configuracoes(chave,valor) VALUES(?,?)
+                     ON CONFLICT(chave) DO UPDATE SET valor=excluded.valor""", (chave,valor))
+    if chave == 'chave_pix': get_cache_pdf().invalidar()
 
 # ═══════════════════════════ AUTENTICAÇÃO ═══════════════════════════
 
@@ -122,17 +81,18 @@ def hash_pw(p): return hashlib.sha256(p.encode()).hexdigest()
 
 def verificar_login(username, password):
     conn = get_conn(); c = conn.cursor()
-    c.execute("SELECT id,nome,nivel,menus_permitidos FROM usuarios WHERE username=? AND password=?",
+    c.execute("SELECT id,nome,nivel FROM usuarios WHERE username=? AND password=?",
               (username, hash_pw(password)))
     r = c.fetchone(); conn.close(); return r
 
 def alterar_senha(user_id, atual, nova):
-    conn = get_conn(); c = conn.cursor()
-    c.execute("SELECT id FROM usuarios WHERE id=? AND password=?", (user_id, hash_pw(atual)))
-    if not c.fetchone():
-        conn.close(); return False, "Senha atual incorreta!"
-    c.execute("UPDATE usuarios SET password=? WHERE id=?", (hash_pw(nova), user_id))
-    conn.commit(); conn.close(); return True, "Senha alterada com sucesso!"
+    with transacao() as c:
+        c.execute("SELECT id FROM usuarios WHERE id=? AND password=?", (user_id, hash_pw(atual)))
+        if not c.fetchone():
+            return False, "Senha atual incorreta!"
+        c.execute("UPDATE usuarios SET password=? WHERE id=?", (hash_pw(nova), user_id))
+    invalidar("usuarios")
+    return True, "Senha alterada com sucesso!"
 
 def tela_login():
     _, col, _ = st.columns([1,2,1])
@@ -148,8 +108,7 @@ def tela_login():
                     r = verificar_login(username, password)
                     if r:
                         st.session_state.update(logged_in=True, user_id=r[0],
-                            user_nome=r[1], user_nivel=r[2],
-                            menus_permitidos=(r[3] or "").split(","))
+                            user_nome=r[1], user_nivel=r[2])
                         st.rerun()
                     else: st.error("❌ Usuário ou senha incorretos!")
                 else: st.warning("⚠️ Preencha todos os campos!")
@@ -184,121 +143,139 @@ def load_css():
 
 # ═══════════════════════════ HELPERS ═══════════════════════════
 
-def fmt_moeda(v):
-    return f"R$ {v:,.2f}".replace(",","X").replace(".",",").replace("X",".")
-
-def fmt_km(v):
-    try: return f"{int(v):,} km".replace(",",".")
-    except: return str(v)
+TAMANHO_PAGINA = 50
+
+def cursor_pagina(prefixo, filtros):
+    """Cursor (último id da página anterior) da página atual; volta à 1ª se os filtros mudarem"""
+    if st.session_state.get(f"{prefixo}_filtros") != filtros:
+        st.session_state[f"{prefixo}_filtros"] = filtros
+        st.session_state[f"{prefixo}_pilha"] = [None]
+    return st.session_state[f"{prefixo}_pilha"][-1]
+
+def controles_pagina(prefixo, df, total):
+    """Botões Anterior/Próxima sobre a pilha de cursores (paginação por chave)"""
+    pilha   = st.session_state[f"{prefixo}_pilha"]
+    pagina  = len(pilha)
+    paginas = max(1, -(-total // TAMANHO_PAGINA))
+    c1, c2, c3 = st.columns([1,2,1])
+    c1.button("⬅️ Anterior", key=f"{prefixo}_ant", disabled=pagina == 1,
+              on_click=pilha.pop, use_container_width=True)
+    c2.caption(f"Página {pagina} de {paginas} — {total} registro(s)")
+    c3.button("Próxima ➡️", key=f"{prefixo}_prox", disabled=pagina >= paginas or not len(df),
+              on_click=pilha.append, args=(int(df['id'].iloc[-1]) if len(df) else None,),
+              use_container_width=True)
+
+LIMITE_BUSCA = 20     # opções materializadas por seletor de busca
+LISTA_CLIENTES = 200  # linhas da lista de clientes (e do seletor de exclusão)
+
+def seletor_busca(rotulo, chave, opcoes_de, placeholder="", vazio=""):
+    """Campo de busca + selectbox só com o que o banco encontrou; retorna o valor escolhido ou None.
+
+    `opcoes_de(termo)` faz a consulta (com LIMIT) e devolve {rótulo: valor}.
+    """
+    termo  = st.text_input(rotulo, placeholder=placeholder, key=f"{chave}_busca").strip()
+    opcoes = opcoes_de(termo)
+    if not opcoes:
+        st.caption("🔍 Nada encontrado" if termo else vazio); return None
+    return opcoes[st.selectbox(rotulo, list(opcoes), key=f"{chave}_sel", label_visibility="collapsed")]
+
+def opcoes_clientes(termo):
+    df = buscar_clientes(termo, LIMITE_BUSCA)
+    return dict(zip(df['id'].astype(str) + " - " + df['nome'], df['id']))
+
+def opcoes_servicos(termo):
+    df = buscar_servicos(termo, LIMITE_BUSCA)
+    rotulos = df['id'].astype(str) + " — " + df['descricao'] + "  (" + fmt_moeda_series(df['valor']) + ")"
+    return dict(zip(rotulos, zip(df['id'], df['descricao'], df['valor'])))
+
+INTERVALO_JOB = 1   # segundos entre consultas ao job enquanto ele roda
+
+def acompanhar_job(jid, chave, rotulo="⬇️ Baixar", detalhe=True):
+    """Progresso de um job e, quando pronto, o download; só o fragmento se atualiza enquanto roda"""
+    job = jobs.consultar(jid)
+    ativo = bool(job) and job['status'] in jobs.ATIVOS
+    st.fragment(_painel_job, run_every=INTERVALO_JOB if ativo else None)(jid, chave, rotulo, detalhe, ativo)
+
+def _painel_job(jid, chave, rotulo, detalhe, ativo):
+    job = jobs.consultar(jid)
+    if ativo and (job is None or job['status'] not in jobs.ATIVOS):
+        st.rerun()   # terminou ou sumiu: rerun completo para parar a atualização automática
+    if job is None or (job['status'] == 'CONCLUIDO' and not os.path.exists(job['arquivo'])):
+        st.caption("⌛ Resultado expirado, gere de novo"); return
+    if job['status'] in jobs.ATIVOS:
+        if job['status'] == 'PENDENTE': st.caption("⏳ Na fila...")
+        elif job['total']: st.progress(min(job['feitos'] / job['total'], 1.0),
+                                       text=f"{job['feitos']}/{job['total']}")
+        else: st.caption(f"⏳ {job['feitos']} processado(s)...")
+    elif job['status'] == 'ERRO':
+        st.error(f"❌ Falhou: {job['erro']}")
+    else:
+        with open(job['arquivo'], "rb") as f:
+            st.download_button(f"{rotulo} ({job['resumo']})" if detalhe else rotulo, f,
+                               file_name=job['nome_arquivo'], mime=job['mime'], key=chave,
+                               use_container_width=detalhe)
+
+def painel_exportacao(prefixo, conjunto, **filtros):
+    """Formato + botão: exporta o conjunto filtrado num job em segundo plano e oferece o download"""
+    chave = f"{prefixo}_job"
+    col1, col2 = st.columns([1,3])
+    formato = col1.radio("Formato", list(FORMATOS_EXPORTACAO), horizontal=True, key=f"{prefixo}_formato")
+    pedido  = (formato, tuple(filtros.items()))
+    if col2.button("📤 Gerar arquivo", key=f"{prefixo}_gerar", use_container_width=True):
+        anterior = st.session_state.get(chave)
+        if anterior: jobs.descartar(anterior[0])
+        st.session_state[chave] = (jobs.enviar("exportar_dados", conjunto=conjunto, formato=formato,
+                                               **filtros), pedido)
+    job = st.session_state.get(chave)
+    # Só acompanha o job se ainda corresponde ao formato/filtros na tela
+    if job and job[1] == pedido:
+        acompanhar_job(job[0], f"{prefixo}_baixar")
 
-def agora_br(): return datetime.now().strftime("%d/%m/%Y %H:%M")
+# ═══════════════════════════ DADOS — CLIENTES ═══════════════════════════
 
-def gerar_qrcode_pix(chave_pix, valor, nome_beneficiario="Oficina"):
-    """Gera QR Code PIX no formato EMV (padrão brasileiro válido)"""
-    
-    # Limpar chave (remover espaços e caracteres especiais de formatação)
-    chave_limpa = chave_pix.replace(" ", "").replace("-", "").replace("(", "").replace(")", "").replace("+", "")
-    
-    # Para telefone, adicionar +55 se não tiver
-    if chave_limpa.isdigit() and len(chave_limpa) >= 10:
-        # É um número de telefone
-        if not chave_limpa.startswith("55"):
-            chave_limpa = "55" + chave_limpa
-        chave_limpa = "+" + chave_limpa
-    
-    # Construir payload PIX no formato EMV (BRCode)
-    # ID 00: Payload Format Indicator
-    pfi = "000201"
-    
-    # ID 26: Merchant Account Information
-    gui = "0014br.gov.bcb.pix"
-    chave_field = f"01{len(chave_limpa):02d}{chave_limpa}"
-    mai_content = gui + chave_field
-    mai = f"26{len(mai_content):02d}{mai_content}"
-    
-    # ID 52: Merchant Category Code
-    mcc = "52040000"
-    
-    # ID 53: Transaction Currency (986 = BRL)
-    currency = "5303986"
-    
-    # ID 54: Transaction Amount
-    valor_str = f"{valor:.2f}"
-    amount = f"54{len(valor_str):02d}{valor_str}"
-    
-    # ID 58: Country Code
-    country = "5802BR"
-    
-    # ID 59: Merchant Name
-    nome_clean = nome_beneficiario[:25].upper()
-    merchant = f"59{len(nome_clean):02d}{nome_clean}"
-    
-    # ID 60: Merchant City
-    city = "6009SAO PAULO"
-    
-    # ID 62: Additional Data Field
-    ref = "***"
-    adf_content = f"05{len(ref):02d}{ref}"
-    adf = f"62{len(adf_content):02d}{adf_content}"
-    
-    # Montar payload sem CRC
-    payload_sem_crc = pfi + mai + mcc + currency + amount + country + merchant + city + adf + "6304"
-    
-    # Calcular CRC16-CCITT
-    def crc16_ccitt(data):
-        crc = 0xFFFF
-        for byte in data.encode('utf-8'):
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc = crc << 1
-                crc &= 0xFFFF
-        return f"{crc:04X}"
-    
-    # Payload final com CRC
-    crc = crc16_ccitt(payload_sem_crc)
-    payload_completo = payload_sem_crc + crc
-    
-    # Gerar QR Code
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_M,
-        box_size=10,
-        border=2
-    )
-    qr.add_data(payload_completo)
-    qr.make(fit=True)
-    
-    img = qr.make_image(fill_color="black", back_color="white")
-    buf = io.BytesIO()
-    img.save(buf, format='PNG')
-    buf.seek(0)
-    return buf
+@cache_consulta("clientes")
+def get_clientes(limite=None):
+    conn = get_conn()
+    if limite: df = pd.read_sql_query(consultas.SQL_LISTA_CLIENTES, conn, params=(limite,))
+    else: df = pd.read_sql_query("SELECT * FROM clientes ORDER BY nome", conn)
+    conn.close(); return df
 
-# ═══════════════════════════ DADOS — CLIENTES ═══════════════════════════
+SQL_BUSCA_CLIENTES = {
+    "sqlite": """SELECT c.id,c.nome,c.telefone,c.logradouro,c.numero,f.placas
+                 FROM clientes_fts f JOIN clientes c ON c.id=f.rowid
+                 WHERE clientes_fts MATCH ? ORDER BY f.rank LIMIT ?""",
+    "postgres": """SELECT c.id,c.nome,c.telefone,c.logradouro,c.numero,b.placas
+                   FROM clientes_busca b JOIN clientes c ON c.id=b.cliente_id
+                   CROSS JOIN to_tsquery('simple', busca_normalizar(?)) q
+                   WHERE b.doc @@ q ORDER BY ts_rank(b.doc, q) DESC LIMIT ?""",
+}
 
-def get_clientes():
+@cache_consulta("clientes", "carros")
+def buscar_clientes(termo, limit=50):
+    """Busca por prefixo (FTS5 / tsvector) em nome, telefone, endereço, placas e modelos, por relevância"""
+    tokens = re.findall(r"\w+", termo or "")
+    if not tokens: return pd.DataFrame(columns=["id","nome","telefone","logradouro","numero","placas"])
+    if backend() == "postgres": consulta = " & ".join(f"{t}:*" for t in tokens)
+    else:                       consulta = " ".join(f'"{t}"*' for t in tokens)
     conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM clientes ORDER BY nome", conn)
+    df = pd.read_sql_query(SQL_BUSCA_CLIENTES[backend()], conn, params=(consulta, limit))
     conn.close(); return df
 
 def salvar_cliente(nome, telefone, logradouro, numero, cid=None):
-    conn = get_conn(); c = conn.cursor()
-    if cid:
-        c.execute("UPDATE clientes SET nome=?,telefone=?,logradouro=?,numero=? WHERE id=?",
-                  (nome, telefone, logradouro, numero, cid))
-    else:
-        c.execute("INSERT INTO clientes(nome,telefone,logradouro,numero) VALUES(?,?,?,?)",
-                  (nome, telefone, logradouro, numero))
-    conn.commit(); conn.close()
+    with transacao() as c:
+        if cid:
+            c.execute("UPDATE clientes SET nome=?,telefone=?,logradouro=?,numero=? WHERE id=?",
+                      (nome, telefone, logradouro, numero, cid))
+        else:
+            c.execute("INSERT INTO clientes(nome,telefone,logradouro,numero) VALUES(?,?,?,?)",
+                      (nome, telefone, logradouro, numero))
+    invalidar("clientes")
+    if cid: invalidar_pdfs("cliente_id", cid)
 
 def pode_excluir_cliente(cid):
     conn = get_conn(); c = conn.cursor()
-    carros = c.execute("SELECT COUNT(*) FROM carros WHERE cliente_id=?", (cid,)).fetchone()[0]
-    orc    = c.execute("SELECT COUNT(*) FROM orcamentos WHERE cliente_id=?", (cid,)).fetchone()[0]
-    serv   = c.execute("SELECT COUNT(*) FROM servicos_realizados WHERE cliente_id=?", (cid,)).fetchone()[0]
+    carros, orc, serv = (c.execute(consultas.SQL_CONTAR_DO_CLIENTE[t], (cid,)).fetchone()[0]
+                         for t in ("carros", "orcamentos", "servicos_realizados"))
     conn.close()
     if carros: return False, f"possui {carros} veículo(s) cadastrado(s)"
     if orc:    return False, f"possui {orc} orçamento(s) cadastrado(s)"
@@ -306,70 +283,215 @@ def pode_excluir_cliente(cid):
     return True, ""
 
 def excluir_cliente(cid):
-    conn = get_conn(); c = conn.cursor()
-    c.execute("DELETE FROM clientes WHERE id=?", (cid,))
-    conn.commit(); conn.close()
+    with transacao() as c:
+        c.execute("DELETE FROM clientes WHERE id=?", (cid,))
+    invalidar("clientes")
+
+STATUS_ABERTOS = ("PENDENTE", "APROVADO")
+
+@cache_consulta("carros", "orcamentos", "servicos_realizados")
+def get_visao_cliente(cid):
+    """Um veículo por linha com visitas, última visita, faturamento e orçamentos em aberto.
+
+    Agrega serviços e orçamentos do cliente por carro_id (índices por cliente → veículo)
+    numa consulta só; entram também carros já transferidos que têm histórico com ele.
+    """
+    conn = get_conn()
+    df = pd.read_sql_query(f"""
+        WITH s AS (SELECT carro_id, COUNT(*) AS visitas, MAX(data) AS ultima_visita,
+                          SUM(total) AS faturamento
+                   FROM servicos_realizados WHERE cliente_id=? GROUP BY carro_id),
+             o AS (SELECT carro_id, COUNT(*) AS abertos, SUM(total) AS valor_aberto
+                   FROM orcamentos WHERE cliente_id=? AND status IN ({",".join("?" * len(STATUS_ABERTOS))})
+                   GROUP BY carro_id)
+        SELECT ca.id, ca.placa, ca.marca, ca.modelo, ca.km, ca.cliente_id,
+               COALESCE(s.visitas,0) AS visitas, s.ultima_visita, COALESCE(s.faturamento,0) AS faturamento,
+               COALESCE(o.abertos,0) AS abertos, COALESCE(o.valor_aberto,0) AS valor_aberto
+        FROM carros ca LEFT JOIN s ON s.carro_id=ca.id LEFT JOIN o ON o.carro_id=ca.id
+        WHERE ca.cliente_id=? OR ca.id IN (SELECT carro_id FROM s UNION SELECT carro_id FROM o)
+        ORDER BY s.ultima_visita DESC NULLS LAST, ca.placa""",
+        conn, params=(cid, cid, *STATUS_ABERTOS, cid))
+    conn.close(); return df
+
+@cache_consulta("servicos_realizados")
+def get_historico_cliente(cid, visitas_por_veiculo=20):
+    """Itens das últimas visitas de cada veículo do cliente (mais recentes primeiro)"""
+    conn = get_conn()
+    df = pd.read_sql_query("""
+        WITH v AS (SELECT id, orcamento_id, carro_id, data, total,
+                          ROW_NUMBER() OVER (PARTITION BY carro_id ORDER BY data DESC, id DESC) AS n
+                   FROM servicos_realizados WHERE cliente_id=?)
+        SELECT v.carro_id, v.id AS servico_id, v.orcamento_id, v.data, v.total,
+               i.descricao, i.quantidade, i.valor_unitario, i.subtotal
+        FROM v LEFT JOIN itens_servico i ON i.servico_id=v.id
+        WHERE v.n <= ?
+        ORDER BY v.carro_id, v.data DESC, v.id DESC, i.id""", conn, params=(cid, visitas_por_veiculo))
+    conn.close(); return df
 
 # ═══════════════════════════ DADOS — CARROS ═══════════════════════════
 
+@cache_consulta("carros")
 def get_carros_por_cliente(cid):
     conn = get_conn()
-    df = pd.read_sql_query("SELECT * FROM carros WHERE cliente_id=? ORDER BY placa", conn, params=(cid,))
+    df = pd.read_sql_query(consultas.SQL_CARROS_DO_CLIENTE, conn, params=(cid,))
     conn.close(); return df
 
 def salvar_carro(cliente_id, placa, marca, modelo, km, carro_id=None):
-    conn = get_conn(); c = conn.cursor()
-    if carro_id:
-        c.execute("UPDATE carros SET placa=?,marca=?,modelo=?,km=? WHERE id=?",
-                  (placa.upper(), marca, modelo, int(km), carro_id))
-    else:
-        c.execute("INSERT INTO carros(cliente_id,placa,marca,modelo,km) VALUES(?,?,?,?,?)",
-                  (cliente_id, placa.upper(), marca, modelo, int(km)))
-    conn.commit(); conn.close()
+    """Grava a placa normalizada (ABC1234 / ABC1D23) e a chave única; retorna a placa gravada"""
+    p = normalizar_placa(placa)
+    if not p: raise ValueError(f"Placa inválida: '{placa}'")
+    with transacao() as c:
+        if carro_id:
+            c.execute("UPDATE carros SET placa=?,placa_chave=?,marca=?,modelo=?,km=? WHERE id=?",
+                      (p, chave_placa(p), marca, modelo, int(km), carro_id))
+        else:
+            c.execute("INSERT INTO carros(cliente_id,placa,placa_chave,marca,modelo,km) VALUES(?,?,?,?,?,?)",
+                      (cliente_id, p, chave_placa(p), marca, modelo, int(km)))
+    invalidar("carros")
+    if carro_id: invalidar_pdfs("carro_id", carro_id)
+    return p
+
+@cache_consulta("carros", "clientes")
+def buscar_por_placa(prefixo, limite=20):
+    """Carros (com o dono) cuja placa começa com `prefixo`, em qualquer grafia ou formato"""
+    chave = chave_placa(prefixo)
+    conn = get_conn()
+    df = pd.read_sql_query(consultas.SQL_BUSCA_PLACA[backend()], conn,
+                           params=(chave + consultas.CORINGA_PLACA[backend()] if chave else "", limite))
+    conn.close(); return df
 
 # ═══════════════════════════ DADOS — SERVIÇOS ═══════════════════════════
 
+@cache_consulta("catalogo_servicos")
 def get_servicos():
     conn = get_conn()
     df = pd.read_sql_query("SELECT * FROM catalogo_servicos ORDER BY descricao", conn)
     conn.close(); return df
 
+@cache_consulta("catalogo_servicos")
+def tem_servicos():
+    """Se o catálogo tem ao menos um item, sem ler nenhum"""
+    conn = get_conn()
+    r = conn.execute("SELECT EXISTS(SELECT 1 FROM catalogo_servicos)").fetchone()[0]
+    conn.close(); return bool(r)
+
+@cache_consulta("catalogo_servicos")
+def buscar_servicos(termo, limite=50):
+    """Itens do catálogo pelo código ou pelo começo da descrição; sem termo, os primeiros em ordem alfabética"""
+    termo = (termo or "").strip().upper()   # o catálogo é gravado em maiúsculas (inclusive acentos)
+    prefixo = re.sub(r"([\\%_])", r"\\\1", termo) + "%"
+    conn = get_conn()
+    df = pd.read_sql_query(consultas.SQL_BUSCA_SERVICOS[backend()], conn, params=(prefixo, limite))
+    # isascii: '²' passa em isdigit() mas não em int(); 18 dígitos ainda cabem num BIGINT
+    if termo.isascii() and termo.isdigit() and len(termo) <= 18:
+        # Código exato primeiro; duas consultas indexadas em vez de um OR que ordena tudo
+        por_id = pd.read_sql_query(consultas.SQL_SERVICO_POR_ID, conn, params=(int(termo),))
+        if len(por_id):
+            resto = df[~df['id'].isin(por_id['id'])]
+            df = pd.concat([por_id, resto], ignore_index=True).head(limite) if len(resto) else por_id
+    conn.close(); return df
+
 def salvar_servico(descricao, valor, sid=None):
-    conn = get_conn(); c = conn.cursor()
-    if sid:
-        c.execute("UPDATE catalogo_servicos SET descricao=?,valor=? WHERE id=?",
-                  (descricao.upper(), valor, sid))
-    else:
-        c.execute("INSERT INTO catalogo_servicos(descricao,valor) VALUES(?,?)",
-                  (descricao.upper(), valor))
-    conn.commit(); conn.close()
+    with transacao() as c:
+        if sid:
+            c.execute("UPDATE catalogo_servicos SET descricao=?,valor=? WHERE id=?",
+                      (descricao.upper(), valor, sid))
+        else:
+            c.execute("INSERT INTO catalogo_servicos(descricao,valor) VALUES(?,?)",
+                      (descricao.upper(), valor))
+    invalidar("catalogo_servicos")
 
 def excluir_servico(sid):
-    conn = get_conn(); c = conn.cursor()
-    c.execute("DELETE FROM catalogo_servicos WHERE id=?", (sid,))
-    conn.commit(); conn.close()
+    with transacao() as c:
+        c.execute("DELETE FROM catalogo_servicos WHERE id=?", (sid,))
+    invalidar("catalogo_servicos")
+
+def diff_catalogo(original, editado):
+    """(novos, alterados, excluidos, erros) entre o catálogo lido e o devolvido pelo st.data_editor"""
+    editado = editado.assign(descricao=editado['descricao'].fillna('').astype(str).str.strip().str.upper(),
+                             valor=pd.to_numeric(editado['valor'], errors='coerce').round(2))
+    invalidas = editado[(editado['descricao'] == '') | ~(editado['valor'] > 0)]
+    erros = [f"Linha {i + 1}: descrição e valor maior que zero são obrigatórios" for i in invalidas.index]
+    ids = editado['id'].dropna().astype('int64')
+    excluidos = [(int(i),) for i in original.loc[~original['id'].isin(ids), 'id']]
+    novos = list(editado.loc[editado['id'].isna(), ['descricao','valor']].itertuples(index=False, name=None))
+    m = editado.dropna(subset=['id']).astype({'id': 'int64'}).merge(original, on='id', suffixes=('', '_orig'))
+    # Mesma normalização dos dois lados: só conta como alterada a linha que o usuário mexeu
+    m = m[(m['descricao'] != m['descricao_orig'].fillna('').str.strip().str.upper())
+          | (m['valor'] != m['valor_orig'].round(2))]
+    alterados = list(m[['descricao','valor','id']].itertuples(index=False, name=None))
+    return novos, alterados, excluidos, erros
+
+def salvar_catalogo(novos, alterados, excluidos):
+    """Aplica o diff do editor em grade numa única transação"""
+    with transacao() as c:
+        if excluidos: c.executemany("DELETE FROM catalogo_servicos WHERE id=?", excluidos)
+        if alterados: c.executemany("UPDATE catalogo_servicos SET descricao=?,valor=? WHERE id=?", alterados)
+        if novos: c.executemany("INSERT INTO catalogo_servicos(descricao,valor) VALUES(?,?)", novos)
+    invalidar("catalogo_servicos")
+
+def reajustar_catalogo(percentual):
+    """Reajusta todos os preços do catálogo em `percentual` % com um único UPDATE; retorna as linhas"""
+    with transacao() as c:
+        # Arredonda em centavos: valor*(100+p) é o preço novo ×100, e o ,5 dele (85,56 - 12,5% =
+        # 7486,5) sai exato no float. Em reais, 74,865 seria 74,8649… no SQLite e 74,865 no
+        # NUMERIC do PostgreSQL, que só tem ROUND para NUMERIC (o double arredondaria para o par)
+        n = c.execute("UPDATE catalogo_servicos SET valor=ROUND(CAST(valor*(100+?) AS NUMERIC)) / 100.0",
+                      (percentual,)).rowcount
+    invalidar("catalogo_servicos")
+    return n
+
+# Mudanças de status permitidas para um orçamento já salvo
+TRANSICOES_STATUS = {"PENDENTE": ("APROVADO", "RECUSADO"), "APROVADO": ("FINALIZADO",),
+                     "RECUSADO": ("PENDENTE",), "FINALIZADO": ()}
+
+def _copiar_para_servicos(c, oid, data):
+    """Aprovação: cria o serviço realizado e copia os itens no banco (INSERT … SELECT), uma vez por orçamento"""
+    r = c.execute("""INSERT INTO servicos_realizados(orcamento_id,cliente_id,carro_id,data,total,observacoes)
+                     SELECT id,cliente_id,carro_id,?,total,observacoes FROM orcamentos o
+                     WHERE id=? AND NOT EXISTS (SELECT 1 FROM servicos_realizados WHERE orcamento_id=o.id)
+                     RETURNING id""", (data, oid)).fetchone()
+    if r:
+        c.execute("""INSERT INTO itens_servico(servico_id,descricao,quantidade,valor_unitario,subtotal)
+                     SELECT ?,descricao,quantidade,valor_unitario,subtotal
+                     FROM itens_orcamento WHERE orcamento_id=? ORDER BY id""", (r[0], oid))
 
 def salvar_orcamento(cliente_id, carro_id, status, observacoes, itens):
-    conn = get_conn(); c = conn.cursor()
-    data  = agora_br()
+    data  = agora_iso()
     total = sum(i['subtotal'] for i in itens)
-    c.execute("INSERT INTO orcamentos(cliente_id,carro_id,data,status,total,observacoes) VALUES(?,?,?,?,?,?)",
-              (cliente_id, carro_id, data, status, total, observacoes))
-    oid = c.lastrowid
-    for i in itens:
-        c.execute("""INSERT INTO itens_orcamento(orcamento_id,servico_id,descricao,
-                     quantidade,valor_unitario,subtotal) VALUES(?,?,?,?,?,?)""",
-                  (oid, i['servico_id'], i['descricao'], i['quantidade'],
-                   i['valor_unitario'], i['subtotal']))
-    if status == 'APROVADO':
-        c.execute("INSERT INTO servicos_realizados(orcamento_id,cliente_id,carro_id,data,total,observacoes) VALUES(?,?,?,?,?,?)",
-                  (oid, cliente_id, carro_id, data, total, observacoes))
-        sid2 = c.lastrowid
-        for i in itens:
-            c.execute("INSERT INTO itens_servico(servico_id,descricao,quantidade,valor_unitario,subtotal) VALUES(?,?,?,?,?)",
-                      (sid2, i['descricao'], i['quantidade'], i['valor_unitario'], i['subtotal']))
-    conn.commit(); conn.close(); return oid
-
+    with transacao() as c:
+        oid = c.execute("""INSERT INTO orcamentos(cliente_id,carro_id,data,status,total,observacoes)
+                           VALUES(?,?,?,?,?,?) RETURNING id""",
+                        (cliente_id, carro_id, data, status, total, observacoes)).fetchone()[0]
+        c.executemany("""INSERT INTO itens_orcamento(orcamento_id,servico_id,descricao,
+                         quantidade,valor_unitario,subtotal) VALUES(?,?,?,?,?,?)""",
+                      [(oid, i['servico_id'], i['descricao'], i['quantidade'],
+                        i['valor_unitario'], i['subtotal']) for i in itens])
+        if status == 'APROVADO':
+            _copiar_para_servicos(c, oid, data)
+    invalidar("orcamentos", "servicos_realizados")
+    return oid
+
+def alterar_status_orcamento(oid, novo):
+    """Muda o status conforme TRANSICOES_STATUS; aprovar gera o serviço realizado na mesma transação"""
+    with transacao() as c:
+        r = c.execute("SELECT status FROM orcamentos WHERE id=?", (oid,)).fetchone()
+        if not r: return False, f"Orçamento #{oid} não encontrado"
+        if novo not in TRANSICOES_STATUS.get(r[0], ()):
+            return False, f"Não é possível passar de {r[0]} para {novo}"
+        # WHERE status=atual: se outra sessão mudou antes, nada é alterado
+        if not c.execute("UPDATE orcamentos SET status=? WHERE id=? AND status=?", (novo, oid, r[0])).rowcount:
+            return False, f"O orçamento #{oid} foi alterado por outro usuário; tente de novo"
+        if novo == 'APROVADO':
+            _copiar_para_servicos(c, oid, agora_iso())
+    invalidar("orcamentos", "servicos_realizados")
+    return True, f"Orçamento #{oid}: {r[0]} → {novo}"
+
+def mudar_status(oid, novo):
+    """Callback dos botões de status do Histórico"""
+    st.session_state.msg_status = alterar_status_orcamento(oid, novo)
+
+@cache_consulta("orcamentos", "clientes", "carros")
 def get_orcamentos():
     conn = get_conn()
     df = pd.read_sql_query("""
@@ -380,6 +502,7 @@ def get_orcamentos():
         ORDER BY o.id DESC""", conn)
     conn.close(); return df
 
+@cache_consulta("servicos_realizados", "clientes", "carros")
 def get_servicos_realizados(data_ini=None, data_fim=None):
     conn = get_conn()
     q = """SELECT s.id,c.nome,ca.placa,s.data,s.total
@@ -388,129 +511,198 @@ def get_servicos_realizados(data_ini=None, data_fim=None):
            JOIN carros ca  ON s.carro_id=ca.id"""
     params = []
     if data_ini and data_fim:
-        q += " WHERE s.data >= ? AND s.data <= ?"
-        params = [data_ini, data_fim + " 23:59"]
+        # Datas em ISO: intervalo [ini, fim+1 dia) usa o índice de servicos_realizados.data
+        q += " WHERE s.data >= ? AND s.data < ?"
+        params = list(intervalo_iso(data_ini, data_fim))
     q += " ORDER BY s.id DESC"
     df = pd.read_sql_query(q, conn, params=params)
     conn.close(); return df
 
-def gerar_pdf_orcamento(oid):
+@cache_consulta("orcamentos", "clientes", "carros")
+def get_orcamentos_pagina(status=None, data_ini=None, data_fim=None, antes_de=None, limite=50):
+    """Uma página do Histórico: WHERE o.id < antes_de ORDER BY o.id DESC LIMIT limite"""
+    q, params = consultas.pagina_orcamentos(status, data_ini, data_fim, antes_de)
+    conn = get_conn()
+    df = pd.read_sql_query(q, conn, params=params + [limite])
+    conn.close(); return df
+
+@cache_consulta("orcamentos")
+def resumo_orcamentos(status=None, data_ini=None, data_fim=None):
+    """{status: (quantidade, soma dos totais)} calculado no banco"""
+    where, params = filtros_periodo_status("o", data_ini, data_fim, status)
+    q = "SELECT o.status,COUNT(*),COALESCE(SUM(o.total),0) FROM orcamentos o"
+    if where: q += " WHERE " + " AND ".join(where)
+    conn = get_conn()
+    r = {st_: (n, tot) for st_, n, tot in conn.execute(q + " GROUP BY o.status", params)}
+    conn.close(); return r
+
+@cache_consulta("servicos_realizados", "clientes", "carros")
+def get_servicos_realizados_pagina(data_ini=None, data_fim=None, antes_de=None, limite=50):
+    q, params = consultas.pagina_servicos_realizados(data_ini, data_fim, antes_de)
+    conn = get_conn()
+    df = pd.read_sql_query(q, conn, params=params + [limite])
+    conn.close(); return df
+
+@cache_consulta("servicos_realizados")
+def resumo_servicos_realizados(data_ini=None, data_fim=None):
+    """(quantidade, soma dos totais) do período"""
+    q, params = consultas.resumo_servicos_realizados(data_ini, data_fim)
+    conn = get_conn()
+    r = conn.execute(q, params).fetchone()
+    conn.close(); return r
+
+@cache_consulta("clientes", "carros", "orcamentos", "servicos_realizados")
+def get_dashboard_stats():
+    """Indicadores do Dashboard lidos do resumo mantido por gatilhos (migração 4)"""
+    conn = get_conn()
+    linhas = conn.execute("SELECT grupo,chave,qtd,total FROM dashboard_stats").fetchall()
+    conn.close()
+    stats = {'clientes':0, 'carros':0, 'servicos':0, 'faturamento':0.0, 'status':{}, 'meses':{}}
+    for grupo, chave, qtd, total in linhas:
+        if grupo == 'status':
+            if qtd: stats['status'][chave] = qtd
+        elif grupo == 'mes':
+            if qtd: stats['meses'][chave] = total
+        elif grupo == 'servicos':
+            stats['servicos'], stats['faturamento'] = qtd, total
+        else:
+            stats[grupo] = qtd
+    return stats
+
+@cache_consulta("servicos_realizados", "clientes", "carros")
+def get_ultimos_servicos(n=5):
+    conn = get_conn()
+    df = pd.read_sql_query("""SELECT s.id,c.nome,ca.placa,s.data,s.total
+                              FROM servicos_realizados s
+                              JOIN clientes c ON s.cliente_id=c.id
+                              JOIN carros ca  ON s.carro_id=ca.id
+                              ORDER BY s.id DESC LIMIT ?""", conn, params=(n,))
+    conn.close(); return df
+
+def gerar_pdf_orcamento(oid, cache=None):
     conn = get_conn(); c = conn.cursor()
-    c.execute("""SELECT o.id,c.nome,c.telefone,c.logradouro,c.numero,
-                        ca.placa,ca.marca,ca.modelo,ca.km,
-                        o.data,o.status,o.total,o.observacoes
-                 FROM orcamentos o
-                 JOIN clientes c ON o.cliente_id=c.id
-                 JOIN carros ca  ON o.carro_id=ca.id
-                 WHERE o.id=?""", (oid,))
+    c.execute(SQL_ORCAMENTO_PDF + " WHERE o.id=?", (oid,))
     orc = c.fetchone()
-    c.execute("SELECT descricao,quantidade,valor_unitario,subtotal FROM itens_orcamento WHERE orcamento_id=?", (oid,))
+    c.execute(SQL_ITENS_PDF + " WHERE orcamento_id=?", (oid,))
     itens = c.fetchall(); conn.close()
-    buf = io.BytesIO()
-    doc = SimpleDocTemplate(buf, pagesize=A4)
-    styles = getSampleStyleSheet()
-    st_t = ParagraphStyle('T',parent=styles['Heading1'],fontSize=18,
-                          textColor=colors.HexColor('#1a1a1a'),spaceAfter=20,alignment=TA_CENTER)
-    elems = [Paragraph(f"ORÇAMENTO Nº {orc[0]:04d}", st_t), Spacer(1,10)]
-    info = [['Data:',orc[9],'Status:',orc[10]],
-            ['Cliente:',orc[1],'',''],
-            ['Telefone:',orc[2] or '—','',''],
-            ['Endereço:',f"{orc[3] or ''} {orc[4] or ''}".strip(),'',''],
-            ['Veículo:',f"{orc[6]} {orc[7]}",'Placa:',orc[5]],
-            ['KM:',fmt_km(orc[8]),'','']]
-    t = Table(info, colWidths=[1.5*inch,2.5*inch,1*inch,1.5*inch])
-    t.setStyle(TableStyle([('FONTNAME',(0,0),(-1,-1),'Helvetica'),
-                            ('FONTSIZE',(0,0),(-1,-1),10),
-                            ('GRID',(0,0),(-1,-1),.5,colors.grey)]))
-    elems += [t, Spacer(1,14)]
-    rows = [['Descrição','Qtd','Valor Unit.','Subtotal']]
-    for i in itens:
-        rows.append([i[0],str(i[1]),f"R$ {i[2]:.2f}",f"R$ {i[3]:.2f}"])
-    st2 = Table(rows, colWidths=[3.5*inch,.7*inch,1.2*inch,1.2*inch])
-    st2.setStyle(TableStyle([('BACKGROUND',(0,0),(-1,0),colors.HexColor('#2c3e50')),
-                              ('TEXTCOLOR',(0,0),(-1,0),colors.white),
-                              ('ALIGN',(0,0),(-1,-1),'CENTER'),
-                              ('FONTNAME',(0,0),(-1,0),'Helvetica-Bold'),
-                              ('GRID',(0,0),(-1,-1),1,colors.black)]))
-    elems += [st2, Spacer(1,10)]
-    tot = Table([['','','TOTAL:',f"R$ {orc[11]:.2f}"]],
-                colWidths=[3.5*inch,.7*inch,1.2*inch,1.2*inch])
-    tot.setStyle(TableStyle([('FONTNAME',(0,0),(-1,-1),'Helvetica-Bold'),
-                              ('FONTSIZE',(0,0),(-1,-1),13),
-                              ('ALIGN',(2,0),(-1,-1),'RIGHT')]))
-    elems.append(tot)
-    elems.append(Spacer(1, 20))
-    
-    # ─── QR CODE PIX ───
-    chave_pix = get_config('chave_pix', '19995056708')
-    qr_img_buf = gerar_qrcode_pix(chave_pix, orc[11])
-    
-    pix_txt = Paragraph(f"<b>Pagamento via PIX</b><br/>Chave: {chave_pix}<br/>Valor: R$ {orc[11]:.2f}",
-                        styles['Normal'])
-    elems.append(pix_txt)
-    elems.append(Spacer(1, 10))
-    
-    qr_img = RLImage(qr_img_buf, width=1.5*inch, height=1.5*inch)
-    elems.append(qr_img)
-    
-    doc.build(elems); buf.seek(0); return buf
+    chave_pix = get_config('chave_pix', CHAVE_PIX_PADRAO)
+    # Repetições do mesmo documento viram cópia de bytes
+    if cache is None: cache = get_cache_pdf()
+    versao = versao_conteudo(orc, itens, chave_pix)
+    pdf = cache.obter(oid, versao)
+    if pdf is not None: return io.BytesIO(pdf)
+    pdf = renderizar_pdf_orcamento(orc, itens, chave_pix)
+    cache.guardar(oid, versao, pdf)
+    return io.BytesIO(pdf)
+
+def job_pdf_orcamento(destino, progresso, oid, cache):
+    with open(destino, "wb") as f: f.write(gerar_pdf_orcamento(oid, cache).getvalue())
+    return f"Orcamento_{oid:04d}.pdf", "application/pdf", "1 PDF"
+
+def preparar_pdf(oid):
+    """Callback do Histórico: gera o PDF num job; se ficar pronto em instantes, o rerun já traz o download"""
+    jid = jobs.enviar("pdf_orcamento", oid=int(oid))
+    jobs.aguardar(jid, 0.5)
+    st.session_state.pdf_job = (oid, jid)
 
 # ═══════════════════════════ DADOS — USUÁRIOS ═══════════════════════════
 
+@cache_consulta("usuarios")
 def get_usuarios():
     conn = get_conn()
-    df = pd.read_sql_query("SELECT id,username,nome,nivel,menus_permitidos FROM usuarios ORDER BY nome", conn)
+    df = pd.read_sql_query("SELECT id,username,nome,nivel FROM usuarios ORDER BY nome", conn)
     conn.close(); return df
 
-def salvar_usuario(username, nome, nivel, menus, uid=None, senha=None):
-    conn = get_conn(); c = conn.cursor()
-    menus_str = ",".join(menus)
+@cache_consulta("usuario_menus")
+def menus_do_usuario(uid):
+    """Menus liberados (consulta pela chave primária de usuario_menus, refeita só após mudanças)"""
+    conn = get_conn()
+    r = frozenset(m for m, in conn.execute("SELECT menu FROM usuario_menus WHERE usuario_id=?", (uid,)))
+    conn.close(); return r
+
+@cache_consulta("usuarios", "usuario_menus")
+def get_matriz_permissoes():
+    """Usuários × menus (bool), para o editor em grade"""
+    conn = get_conn()
+    pares = pd.read_sql_query("SELECT usuario_id,menu FROM usuario_menus", conn)
+    conn.close()
+    menus = [m for m in TODOS_MENUS if m not in MENUS_ADMIN]
+    df = get_usuarios()[['id','username','nome']]
+    marcados = set(zip(pares['usuario_id'], pares['menu']))
+    for m in menus:
+        df[m] = [(uid, m) in marcados for uid in df['id']]
+    return df
+
+def diff_permissoes(original, editado):
+    """(incluir, remover): pares (usuario_id, menu) só das células alteradas"""
+    menus = [m for m in TODOS_MENUS if m not in MENUS_ADMIN]
+    o = original.set_index('id')[menus]
+    e = editado.set_index('id')[menus].reindex(o.index).fillna(False).astype(bool)
+    mudou = (o != e).stack()
+    mudou = mudou[mudou]
+    incluir = [(int(uid), m) for uid, m in mudou.index if e.at[uid, m]]
+    remover = [(int(uid), m) for uid, m in mudou.index if not e.at[uid, m]]
+    return incluir, remover
+
+def salvar_permissoes(incluir, remover):
+    """Grava só as células alteradas da matriz, numa transação"""
+    with transacao() as c:
+        if remover: c.executemany("DELETE FROM usuario_menus WHERE usuario_id=? AND menu=?", remover)
+        if incluir: c.executemany("INSERT INTO usuario_menus(usuario_id,menu) VALUES(?,?)", incluir)
+    invalidar("usuario_menus")
+
+def salvar_usuario(username, nome, nivel, menus=None, uid=None, senha=None):
+    """Cria ou altera o usuário; `menus` (lista) substitui as permissões, None as mantém"""
     try:
-        if uid:
-            # Editando usuário existente
-            if senha:
-                c.execute("UPDATE usuarios SET username=?,nome=?,nivel=?,menus_permitidos=?,password=? WHERE id=?",
-                          (username, nome, nivel, menus_str, hash_pw(senha), uid))
+        with transacao() as c:
+            if uid:
+                # Editando usuário existente
+                if senha:
+                    c.execute("UPDATE usuarios SET username=?,nome=?,nivel=?,password=? WHERE id=?",
+                              (username, nome, nivel, hash_pw(senha), uid))
+                else:
+                    c.execute("UPDATE usuarios SET username=?,nome=?,nivel=? WHERE id=?",
+                              (username, nome, nivel, uid))
             else:
-                c.execute("UPDATE usuarios SET username=?,nome=?,nivel=?,menus_permitidos=? WHERE id=?",
-                          (username, nome, nivel, menus_str, uid))
-        else:
-            # Criando novo usuário
-            if not senha:
-                conn.close()
-                return False, "Informe a senha para novo usuário!"
-            
-            # Verificar se username já existe
-            c.execute("SELECT id FROM usuarios WHERE username=?", (username,))
-            if c.fetchone():
-                conn.close()
-                return False, f"Login '{username}' já existe! Escolha outro."
-            
-            # Inserir novo usuário
-            c.execute("INSERT INTO usuarios(username,nome,nivel,menus_permitidos,password) VALUES(?,?,?,?,?)",
-                      (username, nome, nivel, menus_str, hash_pw(senha)))
-        
-        conn.commit()
-        conn.close()
+                # Criando novo usuário
+                if not senha:
+                    return False, "Informe a senha para novo usuário!"
+                
+                # Verificar se username já existe
+                c.execute("SELECT id FROM usuarios WHERE username=?", (username,))
+                if c.fetchone():
+                    return False, f"Login '{username}' já existe! Escolha outro."
+                
+                # Inserir novo usuário
+                uid = c.execute("INSERT INTO usuarios(username,nome,nivel,password) VALUES(?,?,?,?) RETURNING id",
+                                (username, nome, nivel, hash_pw(senha))).fetchone()[0]
+            if menus is not None:
+                c.execute("DELETE FROM usuario_menus WHERE usuario_id=?", (uid,))
+                c.executemany("INSERT INTO usuario_menus(usuario_id,menu) VALUES(?,?)",
+                              [(uid, m) for m in dict.fromkeys(menus)])
+        invalidar("usuarios", "usuario_menus")
         return True, "Usuário salvo com sucesso!"
         
-    except sqlite3.IntegrityError as e:
-        conn.close()
+    except erros_integridade() as e:
         return False, f"Erro: Login já existe ou dados inválidos. ({str(e)})"
     except Exception as e:
-        conn.close()
         return False, f"Erro ao salvar usuário: {str(e)}"
 
 def excluir_usuario(uid):
-    conn = get_conn(); c = conn.cursor()
-    c.execute("DELETE FROM usuarios WHERE id=?", (uid,))
-    conn.commit(); conn.close()
+    with transacao() as c:
+        c.execute("DELETE FROM usuario_menus WHERE usuario_id=?", (uid,))
+        c.execute("DELETE FROM usuarios WHERE id=?", (uid,))
+    invalidar("usuarios", "usuario_menus")
 
 # ═══════════════════════════ INICIALIZAÇÃO ═══════════════════════════
 
-init_db()
+# Os jobs rodam fora da sessão: o cache de PDFs vai junto, sem chamar st.* na thread do job
+jobs.registrar("pdf_orcamento", functools.partial(job_pdf_orcamento, cache=get_cache_pdf()))
+init_db(DB)
 for k, v in [("logged_in",False),("pagina","🏠 Dashboard"),
-             ("itens_orcamento",[]),("menus_permitidos",TODOS_MENUS)]:
+             ("itens_orcamento",[]),
+             ("pdf_job",None),("lote_job",None),("resultado_importacao",None),
+             ("msg_status",None),("msg_catalogo",None),("msg_permissoes",None)]:
     if k not in st.session_state: st.session_state[k] = v
 
 if not st.session_state.logged_in:
@@ -520,7 +712,10 @@ load_css()
 
 # ═══════════════════════════ SIDEBAR ═══════════════════════════
 
-menus_user = [m for m in TODOS_MENUS if m in st.session_state.menus_permitidos]
+admin = st.session_state.user_nivel == "admin"
+# Lido a cada rerun (em cache até a próxima mudança): permissões alteradas valem sem novo login
+permitidos = menus_do_usuario(st.session_state.user_id)
+menus_user = [m for m in TODOS_MENUS if (admin if m in MENUS_ADMIN else m in permitidos)]
 
 with st.sidebar:
     if os.path.exists(LOGO_PATH): st.image(LOGO_PATH, use_container_width=True)
@@ -530,6 +725,8 @@ with st.sidebar:
     if st.button("🚪 Sair", use_container_width=True):
         st.session_state.logged_in = False; st.rerun()
     st.markdown("---")
+    if not menus_user:
+        st.warning("⚠️ Nenhum menu liberado para este usuário. Fale com o administrador."); st.stop()
     if st.session_state.pagina not in menus_user:
         st.session_state.pagina = menus_user[0]
     st.session_state.pagina = st.radio("📋 Menu", menus_user)
@@ -538,493 +735,731 @@ with st.sidebar:
 
 pag = st.session_state.pagina
 
-# ═══════════════════════════ DASHBOARD ═══════════════════════════
+# Tempo de cada página vai para o painel 📈 Desempenho (também quando ela sai por st.stop())
+with metricas.medir_pagina(pag):
+
+    # ═══════════════════════════ DASHBOARD ═══════════════════════════
+
+    if pag == "🏠 Dashboard":
+        st.title("🏠 Dashboard")
+        stats = get_dashboard_stats()
+        fat_mes = stats['meses'].get(date.today().strftime("%Y-%m"), 0.0)
+        c1,c2,c3,c4 = st.columns(4)
+        c1.metric("👥 Clientes", stats['clientes'])
+        c2.metric("🚗 Veículos", stats['carros'])
+        c3.metric("✅ Serviços Realizados", stats['servicos'])
+        c4.metric("💰 Faturamento Total", fmt_moeda(stats['faturamento']),
+                  delta=f"{fmt_moeda(fat_mes)} no mês", delta_color="off")
+        st.markdown("---")
+        l, r = st.columns(2)
+        with l:
+            st.subheader("📊 Orçamentos por Status")
+            if stats['status']: st.bar_chart(pd.Series(stats['status'], name="count"))
+            else: st.info("Nenhum orçamento ainda")
+        with r:
+            st.subheader("📈 Últimos Serviços")
+            df_s = get_ultimos_servicos(5)
+            if len(df_s):
+                df_s['data'] = fmt_data_series(df_s['data'])
+                st.dataframe(df_s[['nome','placa','data','total']],
+                             use_container_width=True, hide_index=True)
+            else: st.info("Nenhum serviço realizado")
+        if stats['meses']:
+            st.subheader("💵 Faturamento por Mês")
+            meses = sorted(stats['meses'])[-12:]
+            st.bar_chart(pd.Series({f"{m[5:7]}/{m[:4]}": stats['meses'][m] for m in meses}, name="total"))
+
+    # ═══════════════════════════ CLIENTES E CARROS ═══════════════════════════
+
+    elif pag == "👥 Clientes e Carros":
+        st.title("👥 Clientes e Veículos")
+        tab1, tab2, tab3 = st.tabs(["📋 Clientes", "🚗 Carros", "🔎 Visão do Cliente"])
+
+        with tab1:
+            st.subheader("Cadastro de Clientes")
+            with st.form("form_cliente"):
+                nome = st.text_input("Nome do Cliente *")
+                col1, col2 = st.columns(2)
+                with col1: telefone   = st.text_input("Telefone", placeholder="(00) 00000-0000")
+                with col2: logradouro = st.text_input("Endereço")
+                numero = st.text_input("Número")
+                if st.form_submit_button("💾 Salvar Cliente", use_container_width=True):
+                    if nome:
+                        salvar_cliente(nome.upper(), telefone, logradouro.upper(), numero)
+                        st.success(f"✅ Cliente '{nome.upper()}' salvo!"); st.rerun()
+                    else: st.error("⚠️ Nome é obrigatório!")
 
-if pag == "🏠 Dashboard":
-    st.title("🏠 Dashboard")
-    conn = get_conn(); c = conn.cursor()
-    tot_cli  = c.execute("SELECT COUNT(*) FROM clientes").fetchone()[0]
-    tot_car  = c.execute("SELECT COUNT(*) FROM carros").fetchone()[0]
-    tot_serv = c.execute("SELECT COUNT(*) FROM servicos_realizados").fetchone()[0]
-    fat_mes  = c.execute("SELECT COALESCE(SUM(total),0) FROM servicos_realizados").fetchone()[0]
-    conn.close()
-    c1,c2,c3,c4 = st.columns(4)
-    c1.metric("👥 Clientes", tot_cli)
-    c2.metric("🚗 Veículos", tot_car)
-    c3.metric("✅ Serviços Realizados", tot_serv)
-    c4.metric("💰 Faturamento Total", fmt_moeda(fat_mes))
-    st.markdown("---")
-    l, r = st.columns(2)
-    with l:
-        st.subheader("📊 Orçamentos por Status")
-        df_o = get_orcamentos()
-        if len(df_o): st.bar_chart(df_o['status'].value_counts())
-        else: st.info("Nenhum orçamento ainda")
-    with r:
-        st.subheader("📈 Últimos Serviços")
-        df_s = get_servicos_realizados()
-        if len(df_s):
-            st.dataframe(df_s.head(5)[['nome','placa','data','total']],
-                         use_container_width=True, hide_index=True)
-        else: st.info("Nenhum serviço realizado")
+            st.markdown("---")
+            st.subheader("📋 Clientes Cadastrados")
+            n_clientes = get_dashboard_stats()['clientes']
+            if n_clientes:
+                busca = st.text_input("🔍 Buscar cliente", placeholder="Nome, telefone, endereço ou placa...")
+                df_cli = buscar_clientes(busca, LISTA_CLIENTES) if busca else get_clientes(LISTA_CLIENTES)
+                if not busca and n_clientes > LISTA_CLIENTES:
+                    st.caption(f"Os {LISTA_CLIENTES} primeiros de {n_clientes} em ordem alfabética; use a busca")
+                if not len(df_cli):
+                    st.info("🔍 Nenhum cliente encontrado")
+                else:
+                    # Montar exibição: unir logradouro + numero como "Endereço", remover colunas separadas
+                    df_show = df_cli.copy()
+                    df_show['Endereço'] = (df_show['logradouro'].fillna('') + ' '
+                                           + df_show['numero'].fillna('').astype(str)).str.strip()
+                    df_show = df_show[['id','nome','telefone','Endereço']]
+                    df_show.columns = ['ID','Nome','Telefone','Endereço']
+                    st.dataframe(df_show, use_container_width=True, hide_index=True)
+
+                    st.markdown("---")
+                    st.subheader("🗑️ Excluir Cliente")
+                    del_opts = dict(zip(df_show['ID'].astype(str) + " — " + df_show['Nome'], df_show['ID']))
+                    sel_del  = st.selectbox("Selecione o cliente para excluir", list(del_opts.keys()))
+                    cid_del  = del_opts[sel_del]
+                    pode, motivo = pode_excluir_cliente(cid_del)
+                    if not pode:
+                        st.warning(f"⚠️ Não é possível excluir: cliente {motivo}.")
+                    else:
+                        if st.button("🗑️ Confirmar Exclusão", type="primary"):
+                            excluir_cliente(cid_del)
+                            st.success("✅ Cliente excluído com sucesso!"); st.rerun()
+            else:
+                st.info("📭 Nenhum cliente cadastrado")
 
-# ═══════════════════════════ CLIENTES E CARROS ═══════════════════════════
+        with tab2:
+            st.subheader("Cadastro de Veículos")
+            if not get_dashboard_stats()['clientes']: st.warning("⚠️ Cadastre um cliente primeiro!"); st.stop()
+            cli_id = seletor_busca("Cliente *", "car_cli", opcoes_clientes,
+                                   placeholder="Nome, telefone ou placa...", vazio="Busque o dono do veículo")
 
-elif pag == "👥 Clientes e Carros":
-    st.title("👥 Clientes e Veículos")
-    tab1, tab2 = st.tabs(["📋 Clientes", "🚗 Carros"])
+            st.markdown("---")
 
-    with tab1:
-        st.subheader("Cadastro de Clientes")
-        with st.form("form_cliente"):
-            nome = st.text_input("Nome do Cliente *")
+            # ── Marca e Modelo FORA do form: reagem instantaneamente ──
             col1, col2 = st.columns(2)
-            with col1: telefone   = st.text_input("Telefone", placeholder="(00) 00000-0000")
-            with col2: logradouro = st.text_input("Endereço")
-            numero = st.text_input("Número")
-            if st.form_submit_button("💾 Salvar Cliente", use_container_width=True):
-                if nome:
-                    salvar_cliente(nome.upper(), telefone, logradouro.upper(), numero)
-                    st.success(f"✅ Cliente '{nome.upper()}' salvo!"); st.rerun()
-                else: st.error("⚠️ Nome é obrigatório!")
-
-        st.markdown("---")
-        st.subheader("📋 Clientes Cadastrados")
-        df_cli = get_clientes()
-        if len(df_cli):
-            busca = st.text_input("🔍 Buscar cliente", placeholder="Digite o nome...")
-            if busca:
-                df_cli = df_cli[df_cli['nome'].str.contains(busca.upper(), na=False)]
-            # Montar exibição: unir logradouro + numero como "Endereço", remover colunas separadas
-            df_show = df_cli.copy()
-            df_show['Endereço'] = df_show.apply(
-                lambda r: f"{r['logradouro'] or ''} {r['numero'] or ''}".strip(), axis=1)
-            df_show = df_show[['id','nome','telefone','Endereço']]
-            df_show.columns = ['ID','Nome','Telefone','Endereço']
-            st.dataframe(df_show, use_container_width=True, hide_index=True)
+            with col1:
+                marca = st.selectbox(
+                    "Marca *",
+                    [""] + sorted(MODELOS_POR_MARCA.keys()),
+                    key="sel_marca"
+                )
+            with col2:
+                mods = MODELOS_POR_MARCA.get(marca, []) if marca else []
+                if not marca:
+                    # Nenhuma marca selecionada ainda
+                    st.selectbox("Modelo *", ["— selecione a marca primeiro —"],
+                                 disabled=True, key="sel_modelo_vazio")
+                    modelo = ""
+                elif marca == "OUTRA" or not mods:
+                    # Marca sem lista → campo livre
+                    modelo = st.text_input("Modelo *", placeholder="Digite o modelo",
+                                           key="modelo_livre")
+                else:
+                    opcoes_mod = mods + ["✏️ Outro (digitar)"]
+                    sel_mod = st.selectbox("Modelo *", [""] + opcoes_mod, key="sel_modelo")
+                    if sel_mod == "✏️ Outro (digitar)":
+                        modelo = st.text_input("Digite o modelo:", key="modelo_outro")
+                    else:
+                        modelo = sel_mod
+
+            # ── Placa, KM e botão salvar dentro do form ──
+            with st.form("form_carro"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    placa = st.text_input("Placa *", placeholder="ABC1D23")
+                with col2:
+                    km = st.number_input("Quilometragem", min_value=0, step=1000)
+
+                if st.form_submit_button("💾 Salvar Veículo", use_container_width=True):
+                    if cli_id is None:
+                        st.error("⚠️ Selecione o cliente!")
+                    elif placa and marca and modelo:
+                        try:
+                            p = salvar_carro(cli_id, placa, marca, modelo.upper(), km)
+                            st.success(f"✅ Veículo {p} salvo!"); st.rerun()
+                        except ValueError as e:
+                            st.error(f"⚠️ {e} (use ABC1234 ou ABC1D23)")
+                        except erros_integridade():
+                            st.error("❌ Placa já cadastrada!")
+                    else:
+                        st.error("⚠️ Preencha placa, marca e modelo!")
 
             st.markdown("---")
-            st.subheader("🗑️ Excluir Cliente")
-            del_opts = {f"{r['ID']} — {r['Nome']}": r['ID'] for _, r in df_show.iterrows()}
-            sel_del  = st.selectbox("Selecione o cliente para excluir", list(del_opts.keys()))
-            cid_del  = del_opts[sel_del]
-            pode, motivo = pode_excluir_cliente(cid_del)
-            if not pode:
-                st.warning(f"⚠️ Não é possível excluir: cliente {motivo}.")
+            st.subheader("🚗 Veículos Cadastrados")
+            df_car = get_carros_por_cliente(cli_id) if cli_id is not None else None
+            if df_car is None: st.info("🔍 Busque o cliente para ver os veículos dele")
+            elif len(df_car):
+                df_c = df_car.copy()
+                df_c['km'] = fmt_km_series(df_c['km'])
+                df_c = df_c[['id','placa','marca','modelo','km']]
+                df_c.columns = ['ID','Placa','Marca','Modelo','KM']
+                st.dataframe(df_c, use_container_width=True, hide_index=True)
+            else: st.info("📭 Nenhum veículo cadastrado para este cliente")
+
+        with tab3:
+            st.subheader("🔎 Visão do Cliente")
+            col1, col2 = st.columns([1,2])
+            placa_v = col1.text_input("Placa", placeholder="ABC1D23 ou ABC-1234", key="placa_visao")
+            busca_v = col2.text_input("Cliente", placeholder="Nome, telefone, endereço ou placa...",
+                                      key="busca_visao")
+            # Check-in pela placa: uma busca por faixa no índice de placa_chave
+            if placa_v:
+                df_bv = buscar_por_placa(placa_v)
+                v_opts = dict(zip(df_bv['placa'] + " — " + df_bv['marca'].fillna('') + " "
+                                  + df_bv['modelo'].fillna('') + " — " + df_bv['nome'], df_bv['cliente_id']))
+            elif busca_v:
+                df_bv = buscar_clientes(busca_v, 20)
+                v_opts = dict(zip(df_bv['id'].astype(str) + " — " + df_bv['nome'], df_bv['id']))
+            if not (placa_v or busca_v):
+                st.info("🔍 Busque pela placa ou pelo cliente para ver veículos, gastos e histórico")
+            elif not v_opts: st.info("🔍 Nada encontrado")
             else:
-                if st.button("🗑️ Confirmar Exclusão", type="primary"):
-                    excluir_cliente(cid_del)
-                    st.success("✅ Cliente excluído com sucesso!"); st.rerun()
-        else:
-            st.info("📭 Nenhum cliente cadastrado")
-
-    with tab2:
-        st.subheader("Cadastro de Veículos")
-        df_cli2 = get_clientes()
-        if not len(df_cli2): st.warning("⚠️ Cadastre um cliente primeiro!"); st.stop()
-
-        cli_opts = {f"{r['id']} - {r['nome']}": r['id'] for _, r in df_cli2.iterrows()}
-        cli_sel  = st.selectbox("Cliente *", list(cli_opts.keys()))
-        cli_id   = cli_opts[cli_sel]
-
-        st.markdown("---")
+                cid_v  = v_opts[st.selectbox("Selecione", list(v_opts.keys()), key="sel_visao")]
+                df_v   = get_visao_cliente(cid_v)
+                proprios = df_v[df_v['cliente_id'] == cid_v]
+                ultima = df_v['ultima_visita'].dropna()
+
+                col1, col2, col3, col4 = st.columns(4)
+                col1.metric("🚗 Veículos", len(proprios))
+                col2.metric("📅 Última visita", fmt_data(ultima.max()) if len(ultima) else "—",
+                            delta=f"{int(df_v['visitas'].sum())} visita(s)", delta_color="off")
+                col3.metric("💰 Faturamento total", fmt_moeda(df_v['faturamento'].sum()))
+                col4.metric("⏳ Orçamentos em aberto", int(df_v['abertos'].sum()),
+                            delta=fmt_moeda(df_v['valor_aberto'].sum()), delta_color="off")
+
+                if not len(df_v): st.info("📭 Nenhum veículo cadastrado para este cliente")
+                else:
+                    df_show = df_v.copy()
+                    df_show['km'] = fmt_km_series(df_show['km'])
+                    df_show['ultima_visita'] = fmt_data_series(df_show['ultima_visita'])
+                    df_show['faturamento']  = fmt_moeda_series(df_show['faturamento'])
+                    df_show['valor_aberto'] = fmt_moeda_series(df_show['valor_aberto'])
+                    df_show = df_show[['placa','marca','modelo','km','visitas','ultima_visita',
+                                       'faturamento','abertos','valor_aberto']]
+                    df_show.columns = ['Placa','Marca','Modelo','KM','Visitas','Última Visita',
+                                       'Faturamento','Orç. Abertos','Valor em Aberto']
+                    st.dataframe(df_show, use_container_width=True, hide_index=True)
+
+                    st.markdown("---")
+                    st.subheader("🧾 Histórico por placa")
+                    df_h = get_historico_cliente(cid_v)
+                    por_carro = dict(tuple(df_h.groupby('carro_id', sort=False)))
+                    for car in df_v.itertuples():
+                        if not car.visitas: continue
+                        titulo = f"🚗 {car.placa} — {car.marca or ''} {car.modelo or ''}"
+                        if car.cliente_id != cid_v: titulo += " (transferido)"
+                        with st.expander(f"{titulo}  ·  {car.visitas} visita(s)"):
+                            df_i = por_carro.get(car.id, df_h.head(0)).copy()
+                            if car.visitas > df_i['servico_id'].nunique():
+                                st.caption(f"Últimas {df_i['servico_id'].nunique()} de {car.visitas} visitas")
+                            df_i['data'] = fmt_data_series(df_i['data'])
+                            for col in ('valor_unitario','subtotal'):
+                                df_i[col] = fmt_moeda_series(df_i[col])
+                            df_i = df_i[['data','servico_id','descricao','quantidade','valor_unitario','subtotal']]
+                            df_i.columns = ['Data','Serviço Nº','Item','Qtd','Valor Unit.','Subtotal']
+                            st.dataframe(df_i, use_container_width=True, hide_index=True)
+
+    # ═══════════════════════════ ORÇAMENTOS ═══════════════════════════
+
+    elif pag == "💰 Orçamentos":
+        st.title("💰 Novo Orçamento")
+        if not get_dashboard_stats()['clientes']: st.warning("⚠️ Cadastre clientes primeiro!"); st.stop()
+        if not tem_servicos(): st.warning("⚠️ Cadastre serviços no catálogo!"); st.stop()
 
-        # ── Marca e Modelo FORA do form: reagem instantaneamente ──
         col1, col2 = st.columns(2)
         with col1:
-            marca = st.selectbox(
-                "Marca *",
-                [""] + sorted(MODELOS_POR_MARCA.keys()),
-                key="sel_marca"
-            )
+            cli_id = seletor_busca("1️⃣ Cliente *", "orc_cli", opcoes_clientes,
+                                   placeholder="Nome, telefone ou placa...", vazio="Busque o cliente")
+        if cli_id is None: st.stop()
         with col2:
-            mods = MODELOS_POR_MARCA.get(marca, []) if marca else []
-            if not marca:
-                # Nenhuma marca selecionada ainda
-                st.selectbox("Modelo *", ["— selecione a marca primeiro —"],
-                             disabled=True, key="sel_modelo_vazio")
-                modelo = ""
-            elif marca == "OUTRA" or not mods:
-                # Marca sem lista → campo livre
-                modelo = st.text_input("Modelo *", placeholder="Digite o modelo",
-                                       key="modelo_livre")
-            else:
-                opcoes_mod = mods + ["✏️ Outro (digitar)"]
-                sel_mod = st.selectbox("Modelo *", [""] + opcoes_mod, key="sel_modelo")
-                if sel_mod == "✏️ Outro (digitar)":
-                    modelo = st.text_input("Digite o modelo:", key="modelo_outro")
-                else:
-                    modelo = sel_mod
+            df_c = get_carros_por_cliente(cli_id)
+            if not len(df_c): st.error("⚠️ Cliente sem veículos cadastrados!"); st.stop()
+            car_opts = dict(zip(df_c['placa'] + " — " + df_c['marca'].fillna('') + " "
+                                + df_c['modelo'].fillna(''), df_c['id']))
+            car_sel  = st.selectbox("2️⃣ Veículo *", list(car_opts.keys()))
+            car_id   = car_opts[car_sel]
 
-        # ── Placa, KM e botão salvar dentro do form ──
-        with st.form("form_carro"):
+        st.markdown("---")
+        st.subheader("3️⃣ Adicionar Serviços")
+        col1, col2, col3, col4 = st.columns([3,1,1,1])
+        with col1:
+            servico = seletor_busca("Serviço", "orc_srv", opcoes_servicos,
+                                    placeholder="Código ou começo da descrição...")
+            sid, desc, val = servico or (None, "", 0.0)
+        with col2: qtd   = st.number_input("Qtd", min_value=1, value=1)
+        with col3: vunit = st.number_input("Valor", value=float(val), step=10.0)
+        with col4:
+            st.write(""); st.write("")
+            if st.button("➕ Adicionar", use_container_width=True, disabled=servico is None):
+                st.session_state.itens_orcamento.append(
+                    {'servico_id':sid,'descricao':desc,'quantidade':qtd,
+                     'valor_unitario':vunit,'subtotal':qtd*vunit})
+                st.rerun()
+
+        if st.session_state.itens_orcamento:
+            st.subheader("📋 Itens do Orçamento")
+            df_it = pd.DataFrame(st.session_state.itens_orcamento)
+            df_it['vu_fmt'] = fmt_moeda_series(df_it['valor_unitario'])
+            df_it['st_fmt'] = fmt_moeda_series(df_it['subtotal'])
+            st.dataframe(df_it[['descricao','quantidade','vu_fmt','st_fmt']],
+                         use_container_width=True, hide_index=True,
+                         column_config={'descricao':'Descrição','quantidade':'Qtd',
+                                        'vu_fmt':'Valor Unit.','st_fmt':'Subtotal'})
+            total = sum(i['subtotal'] for i in st.session_state.itens_orcamento)
+            st.metric("💰 TOTAL", fmt_moeda(total))
+            col1, col2 = st.columns([3,1])
+            with col1: obs    = st.text_area("Observações")
+            # Recusar e finalizar só pelo histórico, seguindo TRANSICOES_STATUS
+            with col2: status = st.selectbox("Status", list(STATUS_ABERTOS))
             col1, col2 = st.columns(2)
             with col1:
-                placa = st.text_input("Placa *", placeholder="ABC1D23")
+                if st.button("💾 Salvar Orçamento", use_container_width=True, type="primary"):
+                    oid = salvar_orcamento(cli_id, car_id, status, obs, st.session_state.itens_orcamento)
+                    st.success(f"✅ Orçamento #{oid} salvo!")
+                    st.session_state.itens_orcamento = []; st.rerun()
             with col2:
-                km = st.number_input("Quilometragem", min_value=0, step=1000)
+                if st.button("🗑️ Limpar Tudo", use_container_width=True):
+                    st.session_state.itens_orcamento = []; st.rerun()
+        else: st.info("➕ Adicione serviços ao orçamento")
 
-            if st.form_submit_button("💾 Salvar Veículo", use_container_width=True):
-                if placa and marca and modelo:
-                    try:
-                        salvar_carro(cli_id, placa, marca, modelo.upper(), km)
-                        st.success(f"✅ Veículo {placa.upper()} salvo!"); st.rerun()
-                    except Exception:
-                        st.error("❌ Placa já cadastrada!")
-                else:
-                    st.error("⚠️ Preencha placa, marca e modelo!")
+    # ═══════════════════════════ HISTÓRICO ═══════════════════════════
 
+    elif pag == "📜 Histórico":
+        st.title("📜 Histórico de Orçamentos")
+        status_exist = sorted(get_dashboard_stats()['status'])
+        if not status_exist: st.info("📭 Nenhum orçamento cadastrado"); st.stop()
+        col1, col2 = st.columns([3,2])
+        with col1:
+            filtro = st.multiselect("Filtrar por Status", status_exist, default=status_exist)
+        with col2:
+            periodo = st.date_input("Período (opcional)", value=(), format="DD/MM/YYYY")
+        h_ini, h_fim = (periodo + (periodo[0],))[:2] if periodo else (None, None)
+        if not filtro: st.info("Selecione ao menos um status"); st.stop()
+        resumo = resumo_orcamentos(tuple(filtro), h_ini, h_fim)
+        total_f = sum(n for n, _ in resumo.values())
+        antes_de = cursor_pagina("hist", (tuple(filtro), h_ini, h_fim))
+        df_f = get_orcamentos_pagina(tuple(filtro), h_ini, h_fim, antes_de, TAMANHO_PAGINA)
+        if st.session_state.msg_status:
+            ok, msg = st.session_state.msg_status
+            (st.success if ok else st.error)(("✅ " if ok else "⚠️ ") + msg)
+            st.session_state.msg_status = None
+        rotulos_status = {"APROVADO": "✅ Aprovar", "RECUSADO": "❌ Recusar",
+                          "FINALIZADO": "🏁 Finalizar", "PENDENTE": "↩️ Reabrir"}
+        for row in df_f.to_dict('records'):
+            cols = st.columns([1,3,2,2,2,2,2,2])
+            cols[0].write(f"**#{row['id']}**")
+            cols[1].write(row['nome']); cols[2].write(row['placa'])
+            cols[3].write(fmt_data(row['data'])); cols[4].write(row['status'])
+            cols[5].write(fmt_moeda(row['total']))
+            with cols[6]:
+                for novo in TRANSICOES_STATUS.get(row['status'], ()):
+                    st.button(rotulos_status[novo], key=f"st_{row['id']}_{novo}",
+                              on_click=mudar_status, args=(row['id'], novo))
+            with cols[7]:
+                # PDF só é gerado quando o botão da linha é usado (callback), não a cada rerun
+                job_pdf = st.session_state.pdf_job
+                if job_pdf and job_pdf[0] == row['id']:
+                    acompanhar_job(job_pdf[1], f"dl_{row['id']}", detalhe=False)
+                else:
+                    st.button("📄 PDF", key=f"prep_{row['id']}",
+                              on_click=preparar_pdf, args=(row['id'],))
+        controles_pagina("hist", df_f, total_f)
         st.markdown("---")
-        st.subheader("🚗 Veículos Cadastrados")
-        df_car = get_carros_por_cliente(cli_id)
-        if len(df_car):
-            df_c = df_car.copy()
-            df_c['km'] = df_c['km'].apply(fmt_km)
-            df_c = df_c[['id','placa','marca','modelo','km']]
-            df_c.columns = ['ID','Placa','Marca','Modelo','KM']
-            st.dataframe(df_c, use_container_width=True, hide_index=True)
-        else: st.info("📭 Nenhum veículo cadastrado para este cliente")
-
-# ═══════════════════════════ ORÇAMENTOS ═══════════════════════════
-
-elif pag == "💰 Orçamentos":
-    st.title("💰 Novo Orçamento")
-    df_cli = get_clientes(); df_srv = get_servicos()
-    if not len(df_cli): st.warning("⚠️ Cadastre clientes primeiro!"); st.stop()
-    if not len(df_srv): st.warning("⚠️ Cadastre serviços no catálogo!"); st.stop()
-
-    col1, col2 = st.columns(2)
-    with col1:
-        cli_opts = {f"{r['id']} - {r['nome']}": r['id'] for _, r in df_cli.iterrows()}
-        cli_sel  = st.selectbox("1️⃣ Cliente *", list(cli_opts.keys()))
-        cli_id   = cli_opts[cli_sel]
-    with col2:
-        df_c = get_carros_por_cliente(cli_id)
-        if not len(df_c): st.error("⚠️ Cliente sem veículos cadastrados!"); st.stop()
-        car_opts = {f"{r['placa']} — {r['marca']} {r['modelo']}": r['id'] for _, r in df_c.iterrows()}
-        car_sel  = st.selectbox("2️⃣ Veículo *", list(car_opts.keys()))
-        car_id   = car_opts[car_sel]
+        c1,c2,c3 = st.columns(3)
+        c1.metric("Pendentes", resumo.get('PENDENTE', (0, 0))[0])
+        c2.metric("Aprovados",  resumo.get('APROVADO', (0, 0))[0])
+        c3.metric("Total Geral", fmt_moeda(sum(t for _, t in resumo.values())))
 
-    st.markdown("---")
-    st.subheader("3️⃣ Adicionar Serviços")
-    col1, col2, col3, col4 = st.columns([3,1,1,1])
-    with col1:
-        srv_opts = {f"{r['id']} — {r['descricao']}  ({fmt_moeda(r['valor'])})":
-                    (r['id'], r['descricao'], r['valor']) for _, r in df_srv.iterrows()}
-        srv_sel = st.selectbox("Serviço", list(srv_opts.keys()))
-        sid, desc, val = srv_opts[srv_sel]
-    with col2: qtd   = st.number_input("Qtd", min_value=1, value=1)
-    with col3: vunit = st.number_input("Valor", value=float(val), step=10.0)
-    with col4:
-        st.write(""); st.write("")
-        if st.button("➕ Adicionar", use_container_width=True):
-            st.session_state.itens_orcamento.append(
-                {'servico_id':sid,'descricao':desc,'quantidade':qtd,
-                 'valor_unitario':vunit,'subtotal':qtd*vunit})
-            st.rerun()
-
-    if st.session_state.itens_orcamento:
-        st.subheader("📋 Itens do Orçamento")
-        df_it = pd.DataFrame(st.session_state.itens_orcamento)
-        df_it['vu_fmt'] = df_it['valor_unitario'].apply(fmt_moeda)
-        df_it['st_fmt'] = df_it['subtotal'].apply(fmt_moeda)
-        st.dataframe(df_it[['descricao','quantidade','vu_fmt','st_fmt']],
-                     use_container_width=True, hide_index=True,
-                     column_config={'descricao':'Descrição','quantidade':'Qtd',
-                                    'vu_fmt':'Valor Unit.','st_fmt':'Subtotal'})
-        total = sum(i['subtotal'] for i in st.session_state.itens_orcamento)
-        st.metric("💰 TOTAL", fmt_moeda(total))
-        col1, col2 = st.columns([3,1])
-        with col1: obs    = st.text_area("Observações")
-        with col2: status = st.selectbox("Status",["PENDENTE","APROVADO","RECUSADO","FINALIZADO"])
-        col1, col2 = st.columns(2)
+        st.markdown("---")
+        with st.expander("📦 Exportar PDFs em lote (ZIP)"):
+            col1, col2 = st.columns(2)
+            with col1:
+                l_ini = st.date_input("De", value=date.today().replace(day=1), format="DD/MM/YYYY", key="lote_ini")
+            with col2:
+                l_fim = st.date_input("Até", value=date.today(), format="DD/MM/YYYY", key="lote_fim")
+            l_status = st.multiselect("Status", status_exist, default=filtro, key="lote_status")
+            if st.button("📦 Gerar ZIP", use_container_width=True):
+                # Lista vazia seria "sem filtro" em filtros_periodo_status: exportaria tudo
+                if not l_status:
+                    st.warning("⚠️ Selecione ao menos um status")
+                elif not contar_orcamentos(l_ini, l_fim, l_status):
+                    st.info("📭 Nenhum orçamento no período/status selecionado")
+                else:
+                    if st.session_state.lote_job: jobs.descartar(st.session_state.lote_job)
+                    st.session_state.lote_job = jobs.enviar("zip_pdfs", data_ini=l_ini, data_fim=l_fim,
+                                                            status=l_status)
+            if st.session_state.lote_job:
+                acompanhar_job(st.session_state.lote_job, "lote_baixar", "⬇️ Baixar ZIP")
+        with st.expander("📤 Exportar orçamentos com itens (CSV / Parquet)"):
+            st.caption("Uma linha por item, com os filtros de status e período acima.")
+            painel_exportacao("exp_orc", "orcamentos", data_ini=h_ini, data_fim=h_fim, status=tuple(filtro))
+
+    # ═══════════════════════════ SERVIÇOS REALIZADOS ═══════════════════════════
+
+    elif pag == "✅ Serviços Realizados":
+        st.title("✅ Serviços Realizados")
+        col1, col2, col3 = st.columns(3)
         with col1:
-            if st.button("💾 Salvar Orçamento", use_container_width=True, type="primary"):
-                oid = salvar_orcamento(cli_id, car_id, status, obs, st.session_state.itens_orcamento)
-                st.success(f"✅ Orçamento #{oid} salvo!")
-                st.session_state.itens_orcamento = []; st.rerun()
+            d_ini = st.date_input("Data Inicial", value=date.today().replace(day=1), format="DD/MM/YYYY")
         with col2:
-            if st.button("🗑️ Limpar Tudo", use_container_width=True):
-                st.session_state.itens_orcamento = []; st.rerun()
-    else: st.info("➕ Adicione serviços ao orçamento")
-
-# ═══════════════════════════ HISTÓRICO ═══════════════════════════
-
-elif pag == "📜 Histórico":
-    st.title("📜 Histórico de Orçamentos")
-    df_o = get_orcamentos()
-    if not len(df_o): st.info("📭 Nenhum orçamento cadastrado"); st.stop()
-    filtro = st.multiselect("Filtrar por Status", df_o['status'].unique().tolist(),
-                            default=df_o['status'].unique().tolist())
-    df_f = df_o[df_o['status'].isin(filtro)]
-    for _, row in df_f.iterrows():
-        cols = st.columns([1,3,2,2,2,2,2])
-        cols[0].write(f"**#{row['id']}**")
-        cols[1].write(row['nome']); cols[2].write(row['placa'])
-        cols[3].write(row['data']); cols[4].write(row['status'])
-        cols[5].write(fmt_moeda(row['total']))
-        with cols[6]:
-            pdf = gerar_pdf_orcamento(row['id'])
-            st.download_button("📄 PDF", pdf,
-                               file_name=f"Orcamento_{row['id']:04d}.pdf",
-                               mime="application/pdf", key=f"dl_{row['id']}")
-    st.markdown("---")
-    c1,c2,c3 = st.columns(3)
-    c1.metric("Pendentes", len(df_f[df_f['status']=='PENDENTE']))
-    c2.metric("Aprovados",  len(df_f[df_f['status']=='APROVADO']))
-    c3.metric("Total Geral", fmt_moeda(df_f['total'].sum()))
-
-# ═══════════════════════════ SERVIÇOS REALIZADOS ═══════════════════════════
-
-elif pag == "✅ Serviços Realizados":
-    st.title("✅ Serviços Realizados")
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        d_ini = st.date_input("Data Inicial", value=date.today().replace(day=1), format="DD/MM/YYYY")
-    with col2:
-        d_fim = st.date_input("Data Final",   value=date.today(),                format="DD/MM/YYYY")
-    with col3:
-        st.write(""); st.write("")
-        st.button("🔍 Filtrar", use_container_width=True)
-
-    ini_str = d_ini.strftime("%d/%m/%Y")
-    fim_str = d_fim.strftime("%d/%m/%Y")
-    df_s = get_servicos_realizados(ini_str, fim_str)
-
-    if len(df_s):
-        st.metric("💰 Total do Período", fmt_moeda(df_s['total'].sum()),
-                  delta=f"{len(df_s)} serviço(s)")
-        st.markdown("---")
-        df_show = df_s.copy()
-        df_show['total'] = df_show['total'].apply(fmt_moeda)
-        df_show.columns = ['Nº','Cliente','Placa','Data','Total']
-        st.dataframe(df_show, use_container_width=True, hide_index=True)
-    else: st.info("📭 Nenhum serviço no período selecionado")
+            d_fim = st.date_input("Data Final",   value=date.today(),                format="DD/MM/YYYY")
+        with col3:
+            st.write(""); st.write("")
+            st.button("🔍 Filtrar", use_container_width=True)
+
+        qtd_s, tot_s = resumo_servicos_realizados(d_ini, d_fim)
+
+        if qtd_s:
+            st.metric("💰 Total do Período", fmt_moeda(tot_s),
+                      delta=f"{qtd_s} serviço(s)")
+            st.markdown("---")
+            antes_de = cursor_pagina("serv", (d_ini, d_fim))
+            df_s = get_servicos_realizados_pagina(d_ini, d_fim, antes_de, TAMANHO_PAGINA)
+            df_show = df_s.copy()
+            df_show['total'] = fmt_moeda_series(df_show['total'])
+            df_show['data']  = fmt_data_series(df_show['data'])
+            df_show.columns = ['Nº','Cliente','Placa','Data','Total']
+            st.dataframe(df_show, use_container_width=True, hide_index=True)
+            controles_pagina("serv", df_s, qtd_s)
+            with st.expander("📤 Exportar serviços do período com itens (CSV / Parquet)"):
+                painel_exportacao("exp_serv", "servicos", data_ini=d_ini, data_fim=d_fim)
+        else: st.info("📭 Nenhum serviço no período selecionado")
 
-# ═══════════════════════════ CATÁLOGO ═══════════════════════════
+    # ═══════════════════════════ CATÁLOGO ═══════════════════════════
 
-elif pag == "📚 Catálogo":
-    st.title("📚 Catálogo de Serviços")
+    elif pag == "📚 Catálogo":
+        st.title("📚 Catálogo de Serviços")
     
-    tab1, tab2 = st.tabs(["➕ Novo Serviço", "📋 Gerenciar Serviços"])
+        tab1, tab2 = st.tabs(["➕ Novo Serviço", "📋 Gerenciar Serviços"])
     
-    with tab1:
-        st.subheader("Cadastrar Novo Serviço")
-        with st.form("form_srv_novo"):
-            desc  = st.text_input("Descrição *")
-            valor = st.number_input("Valor (R$) *", min_value=0.0, step=10.0, format="%.2f")
-            if st.form_submit_button("💾 Salvar Novo Serviço", use_container_width=True):
-                if desc and valor > 0:
-                    salvar_servico(desc, valor)
-                    st.success("✅ Serviço salvo!")
-                    st.rerun()
-                else:
-                    st.warning("⚠️ Preencha todos os campos!")
+        with tab1:
+            st.subheader("Cadastrar Novo Serviço")
+            with st.form("form_srv_novo"):
+                desc  = st.text_input("Descrição *")
+                valor = st.number_input("Valor (R$) *", min_value=0.0, step=10.0, format="%.2f")
+                if st.form_submit_button("💾 Salvar Novo Serviço", use_container_width=True):
+                    if desc and valor > 0:
+                        salvar_servico(desc, valor)
+                        st.success("✅ Serviço salvo!")
+                        st.rerun()
+                    else:
+                        st.warning("⚠️ Preencha todos os campos!")
     
-    with tab2:
-        st.subheader("Serviços Cadastrados")
-        df_srv = get_servicos()
+        with tab2:
+            st.subheader("Serviços Cadastrados")
+            df_srv = get_servicos()
         
-        if len(df_srv):
-            # Exibir com opções de editar/excluir
-            for _, row in df_srv.iterrows():
-                with st.expander(f"🔧 {row['descricao']}  — {fmt_moeda(row['valor'])}"):
-                    with st.form(f"edit_srv_{row['id']}"):
-                        nova_desc = st.text_input("Descrição", value=row['descricao'], key=f"desc_{row['id']}")
-                        novo_valor = st.number_input("Valor (R$)", value=float(row['valor']),
-                                                     min_value=0.0, step=10.0, format="%.2f",
-                                                     key=f"val_{row['id']}")
-                        
-                        col1, col2 = st.columns(2)
-                        with col1:
-                            if st.form_submit_button("💾 Salvar Alterações", use_container_width=True):
-                                salvar_servico(nova_desc, novo_valor, row['id'])
-                                st.success("✅ Serviço atualizado!")
-                                st.rerun()
-                        with col2:
-                            if st.form_submit_button("🗑️ Excluir Serviço", use_container_width=True):
-                                excluir_servico(row['id'])
-                                st.success("✅ Serviço excluído!")
-                                st.rerun()
-        else:
-            st.info("📭 Nenhum serviço cadastrado")
+            if st.session_state.msg_catalogo:
+                st.success(st.session_state.msg_catalogo); st.session_state.msg_catalogo = None
+            if len(df_srv):
+                st.caption("Edite direto na tabela; linhas novas no fim, exclusão pela seleção da linha. "
+                           "Nada é gravado até clicar em salvar.")
+                df_srv = df_srv[['id','descricao','valor']]
+                with st.form("form_catalogo_grade"):
+                    editado = st.data_editor(
+                        df_srv, num_rows="dynamic", use_container_width=True, hide_index=True,
+                        disabled=['id'], key="grade_catalogo",
+                        column_config={'id': st.column_config.NumberColumn('ID', format="%d"),
+                                       'descricao': st.column_config.TextColumn('Descrição', required=True),
+                                       'valor': st.column_config.NumberColumn('Valor (R$)', min_value=0.01,
+                                                                              step=0.01, format="%.2f", required=True)})
+                    if st.form_submit_button("💾 Salvar Alterações", use_container_width=True):
+                        novos, alterados, excluidos, erros = diff_catalogo(df_srv, editado)
+                        if erros:
+                            for e in erros: st.error(f"⚠️ {e}")
+                        elif not (novos or alterados or excluidos):
+                            st.info("Nenhuma alteração")
+                        else:
+                            salvar_catalogo(novos, alterados, excluidos)
+                            st.session_state.msg_catalogo = (f"✅ {len(novos)} incluído(s), {len(alterados)} "
+                                                             f"alterado(s), {len(excluidos)} excluído(s)")
+                            st.rerun()
+
+                st.markdown("---")
+                st.subheader("📈 Reajuste de Preços")
+                with st.form("form_reajuste"):
+                    pct = st.number_input("Percentual para todo o catálogo (negativo reduz)",
+                                          min_value=-90.0, max_value=500.0, value=0.0, step=1.0, format="%.1f")
+                    if st.form_submit_button("Aplicar Reajuste", use_container_width=True):
+                        if pct:
+                            n = reajustar_catalogo(pct)
+                            st.session_state.msg_catalogo = f"✅ {n} preço(s) reajustado(s) em {pct:+.1f}%"
+                            st.rerun()
+                        else: st.warning("⚠️ Informe um percentual diferente de zero")
+            else:
+                st.info("📭 Nenhum serviço cadastrado")
 
-# ═══════════════════════════ ALTERAR SENHA ═══════════════════════════
+    # ═══════════════════════════ ALTERAR SENHA ═══════════════════════════
 
-elif pag == "🔑 Alterar Senha":
-    st.title("🔑 Alterar Senha")
-    _, col, _ = st.columns([1,2,1])
-    with col:
-        st.info(f"👤 Usuário logado: **{st.session_state.user_nome}**")
-        st.markdown("---")
-        with st.form("form_senha"):
-            atual    = st.text_input("🔒 Senha Atual",          type="password")
-            nova     = st.text_input("🔑 Nova Senha",           type="password")
-            confirma = st.text_input("✅ Confirmar Nova Senha",  type="password")
-            if st.form_submit_button("💾 Salvar Nova Senha", use_container_width=True):
-                if not (atual and nova and confirma): st.error("⚠️ Preencha todos os campos!")
-                elif len(nova) < 6:                  st.error("⚠️ Mínimo 6 caracteres!")
-                elif nova != confirma:               st.error("⚠️ Confirmação não coincide!")
-                elif nova == atual:                  st.warning("⚠️ Nova senha igual à atual!")
-                else:
-                    ok, msg = alterar_senha(st.session_state.user_id, atual, nova)
-                    if ok: st.success(f"✅ {msg}"); st.balloons()
-                    else:  st.error(f"❌ {msg}")
-        st.markdown("---")
-        st.markdown("**💡 Dicas:** mínimo 6 caracteres, misture letras, números e símbolos.")
+    elif pag == "🔑 Alterar Senha":
+        st.title("🔑 Alterar Senha")
+        _, col, _ = st.columns([1,2,1])
+        with col:
+            st.info(f"👤 Usuário logado: **{st.session_state.user_nome}**")
+            st.markdown("---")
+            with st.form("form_senha"):
+                atual    = st.text_input("🔒 Senha Atual",          type="password")
+                nova     = st.text_input("🔑 Nova Senha",           type="password")
+                confirma = st.text_input("✅ Confirmar Nova Senha",  type="password")
+                if st.form_submit_button("💾 Salvar Nova Senha", use_container_width=True):
+                    if not (atual and nova and confirma): st.error("⚠️ Preencha todos os campos!")
+                    elif len(nova) < 6:                  st.error("⚠️ Mínimo 6 caracteres!")
+                    elif nova != confirma:               st.error("⚠️ Confirmação não coincide!")
+                    elif nova == atual:                  st.warning("⚠️ Nova senha igual à atual!")
+                    else:
+                        ok, msg = alterar_senha(st.session_state.user_id, atual, nova)
+                        if ok: st.success(f"✅ {msg}"); st.balloons()
+                        else:  st.error(f"❌ {msg}")
+            st.markdown("---")
+            st.markdown("**💡 Dicas:** mínimo 6 caracteres, misture letras, números e símbolos.")
 
-# ═══════════════════════════ GERENCIAR USUÁRIOS ═══════════════════════════
+    # ═══════════════════════════ GERENCIAR USUÁRIOS ═══════════════════════════
 
-elif pag == "👤 Usuários":
-    st.title("👤 Gerenciar Usuários")
-    if st.session_state.user_nivel != "admin":
-        st.error("🚫 Acesso restrito ao administrador."); st.stop()
+    elif pag == "👤 Usuários":
+        st.title("👤 Gerenciar Usuários")
+        if st.session_state.user_nivel != "admin":
+            st.error("🚫 Acesso restrito ao administrador."); st.stop()
 
-    tab1, tab2 = st.tabs(["➕ Novo / Editar Usuário", "📋 Usuários Cadastrados"])
+        tab1, tab2 = st.tabs(["➕ Novo / Editar Usuário", "📋 Usuários Cadastrados"])
 
-    with tab1:
-        st.subheader("Cadastrar Novo Usuário")
+        with tab1:
+            st.subheader("Cadastrar Novo Usuário")
         
-        # Usar key única para forçar reset do form após salvar
-        if 'form_user_key' not in st.session_state:
-            st.session_state.form_user_key = 0
+            # Usar key única para forçar reset do form após salvar
+            if 'form_user_key' not in st.session_state:
+                st.session_state.form_user_key = 0
         
-        with st.form(f"form_usuario_{st.session_state.form_user_key}"):
-            col1, col2 = st.columns(2)
-            with col1:
-                u_username = st.text_input("Login (usuário) *")
-                u_nome     = st.text_input("Nome Completo *")
-            with col2:
-                u_nivel = st.selectbox("Nível de Acesso", ["operador","admin"])
-                u_senha = st.text_input("Senha *", type="password")
-
-            st.markdown("**🔐 Menus permitidos para este usuário:**")
-            col_a, col_b = st.columns(2)
-            menus_sel = []
-            for idx, menu in enumerate(TODOS_MENUS):
-                col = col_a if idx % 2 == 0 else col_b
-                default = True if menu in ["🏠 Dashboard","🔑 Alterar Senha"] else True
-                if col.checkbox(menu, value=default, key=f"ck_{menu}_{st.session_state.form_user_key}"):
-                    menus_sel.append(menu)
-
-            if st.form_submit_button("💾 Salvar Usuário", use_container_width=True):
-                if not u_username:
-                    st.error("⚠️ Digite um login para o usuário!")
-                elif not u_nome:
-                    st.error("⚠️ Digite o nome completo do usuário!")
-                elif not u_senha:
-                    st.error("⚠️ Digite uma senha para o usuário!")
-                elif len(u_senha) < 4:
-                    st.error("⚠️ A senha deve ter pelo menos 4 caracteres!")
-                else:
-                    # Tudo preenchido, tentar salvar
-                    ok, msg = salvar_usuario(u_username, u_nome, u_nivel, menus_sel, senha=u_senha)
-                    if ok:
-                        st.success(f"✅ {msg}")
-                        st.balloons()
-                        st.session_state.form_user_key += 1  # Incrementa para resetar form
-                        st.rerun()
+            with st.form(f"form_usuario_{st.session_state.form_user_key}"):
+                col1, col2 = st.columns(2)
+                with col1:
+                    u_username = st.text_input("Login (usuário) *")
+                    u_nome     = st.text_input("Nome Completo *")
+                with col2:
+                    u_nivel = st.selectbox("Nível de Acesso", ["operador","admin"])
+                    u_senha = st.text_input("Senha *", type="password")
+
+                st.markdown("**🔐 Menus permitidos para este usuário:**")
+                col_a, col_b = st.columns(2)
+                menus_sel = []
+                for idx, menu in enumerate(m for m in TODOS_MENUS if m not in MENUS_ADMIN):
+                    col = col_a if idx % 2 == 0 else col_b
+                    default = True if menu in ["🏠 Dashboard","🔑 Alterar Senha"] else True
+                    if col.checkbox(menu, value=default, key=f"ck_{menu}_{st.session_state.form_user_key}"):
+                        menus_sel.append(menu)
+
+                if st.form_submit_button("💾 Salvar Usuário", use_container_width=True):
+                    if not u_username:
+                        st.error("⚠️ Digite um login para o usuário!")
+                    elif not u_nome:
+                        st.error("⚠️ Digite o nome completo do usuário!")
+                    elif not u_senha:
+                        st.error("⚠️ Digite uma senha para o usuário!")
+                    elif len(u_senha) < 4:
+                        st.error("⚠️ A senha deve ter pelo menos 4 caracteres!")
                     else:
-                        st.error(f"❌ {msg}")
-                        st.warning("💡 Se o problema persistir, verifique se o login já existe.")
-
-    with tab2:
-        st.subheader("Usuários Cadastrados")
-        df_u = get_usuarios()
-        if len(df_u):
-            st.dataframe(df_u[['id','username','nome','nivel']],
+                        # Tudo preenchido, tentar salvar
+                        ok, msg = salvar_usuario(u_username, u_nome, u_nivel, menus_sel, senha=u_senha)
+                        if ok:
+                            st.success(f"✅ {msg}")
+                            st.balloons()
+                            st.session_state.form_user_key += 1  # Incrementa para resetar form
+                            st.rerun()
+                        else:
+                            st.error(f"❌ {msg}")
+                            st.warning("💡 Se o problema persistir, verifique se o login já existe.")
+
+        with tab2:
+            st.subheader("Usuários Cadastrados")
+            df_u = get_usuarios()
+            if len(df_u):
+                st.dataframe(df_u[['id','username','nome','nivel']],
+                             use_container_width=True, hide_index=True,
+                             column_config={'id':'ID','username':'Login',
+                                            'nome':'Nome','nivel':'Nível'})
+                st.markdown("---")
+                st.subheader("🔐 Permissões por Usuário")
+                if st.session_state.msg_permissoes:
+                    st.success(st.session_state.msg_permissoes); st.session_state.msg_permissoes = None
+                matriz = get_matriz_permissoes()
+                with st.form("form_permissoes"):
+                    editada = st.data_editor(
+                        matriz, use_container_width=True, hide_index=True, key="grade_permissoes",
+                        disabled=['id','username','nome'],
+                        column_config={'id': None, 'username': 'Login', 'nome': 'Nome',
+                                       **{m: st.column_config.CheckboxColumn(m) for m in matriz.columns[3:]}})
+                    if st.form_submit_button("💾 Salvar Permissões", use_container_width=True):
+                        incluir, remover = diff_permissoes(matriz, editada)
+                        if incluir or remover:
+                            salvar_permissoes(incluir, remover)
+                            st.session_state.msg_permissoes = (f"✅ Permissões salvas: {len(incluir)} liberada(s), "
+                                                               f"{len(remover)} removida(s)")
+                            st.rerun()
+                        else: st.info("Nenhuma alteração")
+
+                st.markdown("---")
+                st.subheader("🗑️ Excluir Usuário")
+                df_del   = df_u[df_u['username'] != 'admin']
+                del_opts = dict(zip(df_del['id'].astype(str) + " — " + df_del['nome']
+                                    + "  (" + df_del['username'] + ")", df_del['id']))
+                if del_opts:
+                    del_sel = st.selectbox("Selecione o usuário", list(del_opts.keys()))
+                    del_id  = del_opts[del_sel]
+                    if st.button("🗑️ Excluir Usuário Selecionado", type="primary"):
+                        excluir_usuario(del_id); st.success("✅ Excluído!"); st.rerun()
+                else:
+                    st.info("Nenhum usuário disponível para exclusão (admin não pode ser excluído)")
+            else:
+                st.info("📭 Nenhum usuário cadastrado")
+
+    # ═══════════════════════════ DESEMPENHO ═══════════════════════════
+
+    elif pag == "📈 Desempenho":
+        st.title("📈 Desempenho")
+        if not admin:
+            st.error("🚫 Acesso restrito ao administrador."); st.stop()
+        st.caption("Medições deste processo desde que ele subiu (ou desde a última limpeza), "
+                   f"até {metricas.MAX_PAGINAS} páginas e {metricas.MAX_CONSULTAS} consultas recentes.")
+
+        st.subheader("🖥️ Páginas")
+        paginas = metricas.resumo_paginas()
+        if paginas:
+            st.dataframe(pd.DataFrame(paginas), use_container_width=True, hide_index=True,
+                         column_config={'pagina':'Página','chamadas':'Renderizações',
+                                        'total_ms':st.column_config.NumberColumn('Total (ms)', format="%.0f"),
+                                        'p50_ms':st.column_config.NumberColumn('p50 (ms)', format="%.1f"),
+                                        'p95_ms':st.column_config.NumberColumn('p95 (ms)', format="%.1f"),
+                                        'max_ms':st.column_config.NumberColumn('Máx (ms)', format="%.1f")})
+        else: st.info("Nenhuma página medida ainda")
+
+        st.subheader("🗃️ Consultas por tempo total")
+        resumo_sql = metricas.resumo_consultas()
+        if resumo_sql:
+            st.dataframe(pd.DataFrame(resumo_sql[:50]), use_container_width=True, hide_index=True,
+                         column_config={'sql':st.column_config.TextColumn('SQL', width="large"),
+                                        'chamadas':'Chamadas',
+                                        'total_ms':st.column_config.NumberColumn('Total (ms)', format="%.1f"),
+                                        'p50_ms':st.column_config.NumberColumn('p50 (ms)', format="%.2f"),
+                                        'p95_ms':st.column_config.NumberColumn('p95 (ms)', format="%.2f"),
+                                        'max_ms':st.column_config.NumberColumn('Máx (ms)', format="%.2f"),
+                                        'linhas_media':st.column_config.NumberColumn('Linhas (média)', format="%.0f")})
+            st.subheader("🐢 Consultas mais lentas")
+            st.dataframe(pd.DataFrame(metricas.consultas_mais_lentas(20))[['quando','ms','linhas','sql']],
                          use_container_width=True, hide_index=True,
-                         column_config={'id':'ID','username':'Login',
-                                        'nome':'Nome','nivel':'Nível'})
-            st.markdown("---")
-            st.subheader("🔐 Permissões por Usuário")
-            for _, row in df_u.iterrows():
-                with st.expander(f"👤 {row['nome']}  ({row['username']})"):
-                    menus_atuais = (row['menus_permitidos'] or "").split(",")
-                    col_a, col_b = st.columns(2)
-                    novos = []
-                    for idx, menu in enumerate(TODOS_MENUS):
-                        col = col_a if idx % 2 == 0 else col_b
-                        if col.checkbox(menu, value=(menu in menus_atuais),
-                                        key=f"perm_{row['id']}_{idx}"):
-                            novos.append(menu)
-                    if st.button(f"💾 Salvar Permissões", key=f"sv_{row['id']}"):
-                        salvar_usuario(row['username'], row['nome'], row['nivel'],
-                                       novos, uid=row['id'])
-                        st.success("✅ Permissões salvas!"); st.rerun()
+                         column_config={'quando':'Quando','linhas':'Linhas',
+                                        'ms':st.column_config.NumberColumn('ms', format="%.2f"),
+                                        'sql':st.column_config.TextColumn('SQL', width="large")})
+        else: st.info("Nenhuma consulta medida ainda")
 
-            st.markdown("---")
-            st.subheader("🗑️ Excluir Usuário")
-            del_opts = {f"{r['id']} — {r['nome']}  ({r['username']})": r['id']
-                        for _, r in df_u.iterrows() if r['username'] != 'admin'}
-            if del_opts:
-                del_sel = st.selectbox("Selecione o usuário", list(del_opts.keys()))
-                del_id  = del_opts[del_sel]
-                if st.button("🗑️ Excluir Usuário Selecionado", type="primary"):
-                    excluir_usuario(del_id); st.success("✅ Excluído!"); st.rerun()
-            else:
-                st.info("Nenhum usuário disponível para exclusão (admin não pode ser excluído)")
-        else:
-            st.info("📭 Nenhum usuário cadastrado")
+        st.markdown("---")
+        col1, col2 = st.columns(2)
+        with col1:
+            with st.form("form_log_metricas"):
+                atual = metricas.arquivo_log()
+                nome = st.text_input("📝 Log JSON-lines (arquivo)",
+                                     value=os.path.basename(atual) if atual else "",
+                                     placeholder="ex.: metricas.jsonl — vazio desliga",
+                                     help=f"Gravado na pasta {os.path.abspath(metricas.PASTA_LOG)}")
+                if st.form_submit_button("💾 Aplicar", use_container_width=True):
+                    try:
+                        metricas.configurar_log(nome.strip() or None)
+                        st.success("✅ Log " + (f"gravando em {metricas.arquivo_log()}" if nome.strip() else "desligado"))
+                    except ValueError as e:
+                        st.error(f"❌ {e}")
+                    except OSError as e:
+                        st.error(f"❌ Não foi possível abrir o arquivo: {e}")
+        with col2:
+            if st.button("🧹 Limpar medições", use_container_width=True):
+                metricas.limpar(); st.rerun()
 
-# ═══════════════════════════ CONFIGURAÇÕES ═══════════════════════════
+    # ═══════════════════════════ CONFIGURAÇÕES ═══════════════════════════
 
-elif pag == "⚙️ Configurações":
-    st.title("⚙️ Configurações do Sistema")
+    elif pag == "⚙️ Configurações":
+        st.title("⚙️ Configurações do Sistema")
     
-    if st.session_state.user_nivel != "admin":
-        st.error("🚫 Acesso restrito ao administrador.")
-        st.stop()
+        if st.session_state.user_nivel != "admin":
+            st.error("🚫 Acesso restrito ao administrador.")
+            st.stop()
     
-    st.subheader("💳 Configurações de Pagamento PIX")
+        st.subheader("💳 Configurações de Pagamento PIX")
     
-    chave_atual = get_config('chave_pix', '19995056708')
+        chave_atual = get_config('chave_pix', CHAVE_PIX_PADRAO)
     
-    with st.form("form_pix"):
-        st.info("📱 Esta chave PIX será exibida no QR Code dos orçamentos em PDF")
+        with st.form("form_pix"):
+            st.info("📱 Esta chave PIX será exibida no QR Code dos orçamentos em PDF")
         
-        st.markdown("""
-        **📌 Formatos aceitos de Chave PIX:**
-        - **Telefone:** Digite só os números (ex: `19995056708` ou `5519995056708`)
-        - **E-mail:** Digite completo (ex: `oficina@email.com`)
-        - **CPF/CNPJ:** Digite só os números (ex: `12345678900`)
-        - **Chave Aleatória:** Cole a chave completa
+            st.markdown("""
+            **📌 Formatos aceitos de Chave PIX:**
+            - **Telefone:** Digite só os números (ex: `19995056708` ou `5519995056708`)
+            - **E-mail:** Digite completo (ex: `oficina@email.com`)
+            - **CPF/CNPJ:** Digite só os números (ex: `12345678900`)
+            - **Chave Aleatória:** Cole a chave completa
         
-        ⚠️ **IMPORTANTE para Telefone:** 
-        - Se seu telefone tem DDD 19 e número 99505-6708
-        - Digite: `19995056708` (sem espaços, parênteses ou traços)
-        - O sistema adiciona automaticamente o +55 no QR Code
-        """)
+            ⚠️ **IMPORTANTE para Telefone:** 
+            - Se seu telefone tem DDD 19 e número 99505-6708
+            - Digite: `19995056708` (sem espaços, parênteses ou traços)
+            - O sistema adiciona automaticamente o +55 no QR Code
+            """)
         
-        nova_chave = st.text_input(
-            "Chave PIX",
-            value=chave_atual,
-            placeholder="Ex: 19995056708 (telefone) ou email@dominio.com"
-        )
+            nova_chave = st.text_input(
+                "Chave PIX",
+                value=chave_atual,
+                placeholder="Ex: 19995056708 (telefone) ou email@dominio.com"
+            )
         
-        col1, col2 = st.columns([3, 1])
-        with col1:
-            st.caption("💡 O QR Code será gerado automaticamente no padrão correto para cada tipo de chave")
-        with col2:
-            if st.form_submit_button("💾 Salvar Configuração", use_container_width=True):
-                if nova_chave and len(nova_chave) >= 8:
-                    set_config('chave_pix', nova_chave)
-                    st.success("✅ Chave PIX atualizada com sucesso!")
-                    st.balloons()
-                    st.rerun()
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.caption("💡 O QR Code será gerado automaticamente no padrão correto para cada tipo de chave")
+            with col2:
+                if st.form_submit_button("💾 Salvar Configuração", use_container_width=True):
+                    if nova_chave and len(nova_chave) >= 8:
+                        set_config('chave_pix', nova_chave)
+                        st.success("✅ Chave PIX atualizada com sucesso!")
+                        st.balloons()
+                        st.rerun()
+                    else:
+                        st.error("⚠️ Informe uma chave PIX válida (mínimo 8 caracteres)!")
+    
+        st.markdown("---")
+        st.subheader("📥 Importar Cadastros (CSV / Excel)")
+        with st.form("form_importar"):
+            rotulos_imp = {"clientes": "👥 Clientes", "carros": "🚗 Carros", "servicos": "📚 Catálogo de serviços"}
+            tipo_imp = st.selectbox("Importar", list(rotulos_imp), format_func=rotulos_imp.get)
+            arq_imp  = st.file_uploader("Arquivo", type=["csv", "xlsx"])
+            st.caption("Colunas — " + " | ".join(f"**{rotulos_imp[t]}:** {c}" for t, c in COLUNAS_IMPORTACAO.items())
+                       + ". Carros precisam dos clientes já importados.")
+            if st.form_submit_button("📥 Importar", use_container_width=True):
+                if not arq_imp: st.error("⚠️ Selecione um arquivo!")
                 else:
-                    st.error("⚠️ Informe uma chave PIX válida (mínimo 8 caracteres)!")
+                    aviso = st.empty()
+                    res = importar(tipo_imp, arq_imp,
+                                   progresso=lambda l, g: aviso.caption(f"⏳ {l} linha(s) lidas, {g} gravadas..."))
+                    aviso.empty()
+                    st.session_state.resultado_importacao = res
+        res = st.session_state.resultado_importacao
+        if res:
+            st.success(f"✅ {res['gravadas']} de {res['lidas']} linha(s) importadas")
+            if res['erros']:
+                st.warning(f"⚠️ {len(res['erros'])} linha(s) recusadas")
+                st.dataframe(pd.DataFrame(res['erros'][:1000], columns=['Linha', 'Erro']),
+                             use_container_width=True, hide_index=True)
+                st.download_button("⬇️ Baixar relatório de erros", erros_csv(res['erros']),
+                                   file_name="erros_importacao.csv", mime="text/csv")
     
-    st.markdown("---")
-    st.subheader("ℹ️ Informações do Sistema")
+        st.markdown("---")
+        st.subheader("ℹ️ Informações do Sistema")
     
-    col1, col2 = st.columns(2)
-    with col1:
-        st.metric("📦 Versão", "2.0")
-        st.metric("🗄️ Banco de Dados", "SQLite")
-    with col2:
-        st.metric("👥 Total de Usuários", len(get_usuarios()))
-        st.metric("🔧 Serviços Cadastrados", len(get_servicos()))
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("📦 Versão", "2.0")
+            st.metric("🗄️ Banco de Dados", "PostgreSQL" if backend() == "postgres" else "SQLite")
+        with col2:
+            st.metric("👥 Total de Usuários", len(get_usuarios()))
+            st.metric("🔧 Serviços Cadastrados", len(get_servicos()))
+        est = get_cache_pdf().estatisticas()
+        st.caption(f"📄 Cache de PDFs: {est['hits']} acertos / {est['misses']} faltas "
+                   f"({est['taxa_acerto']:.0%}) — {est['itens']} em memória")
+        est_q = estatisticas_consultas()
+        if est_q:
+            st.caption("🗃️ Cache de consultas (acertos / faltas):")
+            st.dataframe(pd.DataFrame([{'Consulta': k, 'Acertos': v['hits'], 'Faltas': v['misses'],
+                                        'Taxa': f"{v['taxa_acerto']:.0%}"} for k, v in sorted(est_q.items())]),
+                         use_container_width=True, hide_index=True)
     
-    st.markdown("---")
-    st.caption("💡 Outras configurações podem ser adicionadas aqui conforme necessário")
+        st.markdown("---")
+        st.caption("💡 Outras configurações podem ser adicionadas aqui conforme necessário")
@@ -0,0 +1,94 @@
+"""
+Fixtures comuns: cada teste usa um banco novo em db.DB, sem conexões nem cache de outro teste
+
+PostgreSQL (pytest-postgresql, de requirements-dev.txt): por padrão sobe um
+servidor descartável com o pg_ctl do PATH (ou --postgresql-exec), que o
+PostgreSQL recusa rodar como root. Para usar um servidor já no ar, como
+`docker run -p 5432:5432 -e POSTGRES_PASSWORD=teste postgres`:
+
+    python -m pytest --postgresql-host=localhost --postgresql-password=teste
+
+Sem servidor disponível, os testes de PostgreSQL são pulados.
+"""
+
+import os
+import shutil
+import uuid
+
+import pytest
+
+from oficina import cache_consultas, db
+
+try:
+    from pytest_postgresql import factories
+except ImportError:
+    factories = None
+
+
+def pytest_configure(config):
+    if factories and not config.getoption("postgresql_exec", None) and shutil.which("pg_ctl"):
+        config.option.postgresql_exec = shutil.which("pg_ctl")
+
+
+def _usar(url):
+    db.fechar_conexoes()
+    db.DB = url
+    cache_consultas.invalidar_tudo()
+
+
+@pytest.fixture
+def banco_sqlite(tmp_path, monkeypatch):
+    """Arquivo SQLite vazio como banco atual; retorna o caminho"""
+    monkeypatch.setattr(db, "DB", db.DB)   # restaurado ao fim do teste
+    _usar(str(tmp_path / "oficina.db"))
+    yield db.DB
+    db.fechar_conexoes()
+
+
+@pytest.fixture(scope="session")
+def servidor_postgres(request):
+    """URL de administração (banco de manutenção) do servidor PostgreSQL de teste"""
+    if factories is None:
+        pytest.skip("pytest-postgresql não instalado (requirements-dev.txt)")
+    if request.config.getoption("postgresql_host"):
+        pg = request.getfixturevalue("postgresql_noproc")
+    else:
+        if not os.path.exists(request.config.getoption("postgresql_exec") or
+                              request.config.getini("postgresql_exec")):
+            pytest.skip("pg_ctl não encontrado: instale o PostgreSQL ou use --postgresql-host")
+        if os.geteuid() == 0:
+            pytest.skip("o PostgreSQL não roda como root: use --postgresql-host com um servidor no ar")
+        pg = request.getfixturevalue("postgresql_proc")
+    senha = f":{pg.password}" if pg.password else ""
+    return f"postgresql://{pg.user}{senha}@{pg.host}:{pg.port}", getattr(pg, "maintenance_dbname", "postgres")
+
+
+@pytest.fixture
+def banco_postgres(servidor_postgres, monkeypatch):
+    """Banco PostgreSQL vazio, criado para o teste e apagado ao fim; retorna a URL"""
+    import psycopg2
+    servidor, manutencao = servidor_postgres
+    nome = f"oficina_teste_{uuid.uuid4().hex[:12]}"
+    admin = psycopg2.connect(f"{servidor}/{manutencao}")
+    admin.autocommit = True
+    admin.cursor().execute(f"CREATE DATABASE {nome}")
+    monkeypatch.setattr(db, "DB", db.DB)
+    _usar(f"{servidor}/{nome}")
+    yield db.DB
+    db.fechar_conexoes()
+    # FORCE: a thread de LISTEN da réplica ainda pode estar conectada
+    admin.cursor().execute(f"DROP DATABASE {nome} WITH (FORCE)")
+    admin.close()
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def banco(request):
+    """O mesmo teste nos dois backends"""
+    return request.getfixturevalue(f"banco_{request.param}")
+
+
+@pytest.fixture(scope="session")
+def app():
+    """Funções de dados do sistema_oficina_completo.py, sem a interface"""
+    from benchmarks.suite import carregar_app
+    return carregar_app()
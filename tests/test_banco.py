@@ -0,0 +1,220 @@
+"""
+Schema e tabelas mantidas por gatilhos, nos dois backends (SQLite e PostgreSQL)
+"""
+
+from oficina import db
+from oficina.migracoes import MIGRACOES, migrar, versao_atual
+
+
+def _contar(sql, params=()):
+    conn = db.get_conn()
+    try: return conn.execute(sql, params).fetchall()
+    finally: conn.close()
+
+
+def _stats():
+    return {(g, k): (q, round(t, 2)) for g, k, q, t in
+            _contar("SELECT grupo,chave,qtd,total FROM dashboard_stats WHERE qtd<>0 OR total<>0")}
+
+
+def _stats_recalculadas():
+    """dashboard_stats como a carga inicial da migração 4 calcularia hoje"""
+    r = {("clientes", ""): (_contar("SELECT COUNT(*) FROM clientes")[0][0], 0),
+         ("carros", ""): (_contar("SELECT COUNT(*) FROM carros")[0][0], 0)}
+    n, total = _contar("SELECT COUNT(*),COALESCE(SUM(total),0) FROM servicos_realizados")[0]
+    r[("servicos", "")] = (n, round(total, 2))
+    for mes, n, total in _contar("SELECT substr(data,1,7),COUNT(*),SUM(total) FROM servicos_realizados "
+                                 "GROUP BY substr(data,1,7)"):
+        r[("mes", mes)] = (n, round(total, 2))
+    for status, n in _contar("SELECT status,COUNT(*) FROM orcamentos GROUP BY status"):
+        r[("status", status)] = (n, 0)
+    return {k: v for k, v in r.items() if v != (0, 0)}
+
+
+def test_migrar_do_zero_e_de_novo(banco):
+    assert migrar() == [v for v, _, _ in MIGRACOES]
+    assert migrar() == []
+    conn = db.get_conn()
+    assert versao_atual(conn) == MIGRACOES[-1][0]
+    conn.close()
+
+
+def test_dashboard_stats_acompanha_as_escritas(banco, app):
+    migrar()
+    app.salvar_cliente("ANA", "(11) 91234-5678", "RUA A", "1")
+    app.salvar_cliente("BRUNO", "", "RUA B", "2")
+    app.salvar_carro(1, "abc-1234", "FIAT", "UNO", 1000)
+    app.salvar_carro(2, "DEF5G67", "VW", "GOL", 2000)
+    itens = [{'servico_id': None, 'descricao': 'TROCA', 'quantidade': 2, 'valor_unitario': 50.0, 'subtotal': 100.0}]
+    o1 = app.salvar_orcamento(1, 1, "PENDENTE", "", itens)
+    o2 = app.salvar_orcamento(2, 2, "APROVADO", "", itens)
+    app.alterar_status_orcamento(o1, "APROVADO")
+    app.alterar_status_orcamento(o2, "FINALIZADO")
+    with db.transacao() as c:
+        c.execute("UPDATE servicos_realizados SET data=?, total=? WHERE orcamento_id=?",
+                  ("2025-12-31 10:00", 80.0, o2))
+    assert _stats() == _stats_recalculadas()
+    assert _stats()[("servicos", "")] == (2, 180.0)
+    with db.transacao() as c:
+        c.execute("DELETE FROM servicos_realizados WHERE orcamento_id=?", (o1,))
+        c.execute("DELETE FROM orcamentos WHERE id=?", (o1,))
+        c.execute("DELETE FROM carros WHERE cliente_id=2")
+    app.excluir_cliente(2)
+    assert _stats() == _stats_recalculadas()
+
+
+def test_aprovar_copia_itens_uma_vez(banco, app):
+    migrar()
+    app.salvar_cliente("ANA", "", "", "")
+    app.salvar_carro(1, "ABC1234", "FIAT", "UNO", 0)
+    itens = [{'servico_id': None, 'descricao': d, 'quantidade': 1, 'valor_unitario': v, 'subtotal': v}
+             for d, v in (("A", 10.0), ("B", 20.0))]
+    oid = app.salvar_orcamento(1, 1, "PENDENTE", "obs", itens)
+    assert app.alterar_status_orcamento(oid, "APROVADO")[0]
+    assert not app.alterar_status_orcamento(oid, "APROVADO")[0]
+    assert _contar("SELECT s.total,s.observacoes,COUNT(i.id) FROM servicos_realizados s "
+                   "JOIN itens_servico i ON i.servico_id=s.id GROUP BY s.id,s.total,s.observacoes") \
+        == [(30.0, "obs", 2)]
+
+
+def test_busca_de_clientes_acompanha_carros(banco, app):
+    migrar()
+    app.salvar_cliente("JOSÉ DA SILVA", "(19) 99505-6708", "AV BRASIL", "10")
+    app.salvar_carro(1, "ABC-1234", "FIAT", "PALIO", 0)
+    busca = app.buscar_clientes.__wrapped__
+    assert busca("jose sil")["id"].tolist() == [1]
+    assert busca("1999505")["id"].tolist() == [1]
+    assert busca("abc1")["id"].tolist() == [1]
+    assert busca("palio")["id"].tolist() == [1]
+    with db.transacao() as c:
+        c.execute("UPDATE carros SET placa=?, modelo=? WHERE id=1", ("XYZ9876", "UNO"))
+    assert busca("palio").empty
+    assert busca("xyz")["id"].tolist() == [1]
+    app.salvar_cliente("JOÃO", "", "", "", cid=1)
+    assert busca("jose").empty and busca("joao")["id"].tolist() == [1]
+
+
+def test_migracao_9_une_placas_repetidas(banco):
+    migrar(ate=8)
+    with db.transacao() as c:
+        c.execute("INSERT INTO clientes(nome) VALUES('A')")
+        c.executemany("INSERT INTO carros(cliente_id,placa,km) VALUES(1,?,?)",
+                      [("ABC-1234", 5000), ("abc1234 ", 100), ("ABC1C34", 3000), ("DEF1234", 1)])
+        c.execute("INSERT INTO orcamentos(cliente_id,carro_id,status,total) VALUES(1,1,'PENDENTE',10)")
+    migrar()
+    assert _contar("SELECT id,placa,placa_chave,km FROM carros ORDER BY id") == \
+        [(3, "ABC1C34", "ABC1C34", 5000), (4, "DEF1234", "DEF1C34", 1)]
+    assert _contar("SELECT carro_id FROM orcamentos") == [(3,)]
+
+
+def test_buscas_por_prefixo(banco, app):
+    migrar()
+    app.salvar_cliente("ANA", "", "", "")
+    app.salvar_carro(1, "abc-1234", "FIAT", "UNO", 0)
+    app.salvar_carro(1, "ABD1E23", "FIAT", "UNO", 0)
+    assert app.buscar_por_placa.__wrapped__("ABC1C")["placa"].tolist() == ["ABC1234"]
+    assert app.buscar_por_placa.__wrapped__("ab")["placa"].tolist() == ["ABC1234", "ABD1E23"]
+    app.salvar_catalogo([("TROCA DE ÓLEO", 80.0), ("TROCA DE FILTRO", 40.0), ("50% DESCONTO", 1.0)], [], [])
+    busca = app.buscar_servicos.__wrapped__
+    assert busca("troca")["descricao"].tolist() == ["TROCA DE FILTRO", "TROCA DE ÓLEO"]
+    assert busca("50%")["descricao"].tolist() == ["50% DESCONTO"]
+    assert busca("5%").empty
+    assert busca("2")["id"].tolist() == [2]
+    # Não cabem num inteiro do banco: só a busca pela descrição
+    assert busca("123456789012345678901234").empty and busca("²").empty
+    assert app.tem_servicos.__wrapped__()
+
+
+def test_reajustar_catalogo(banco, app):
+    migrar()
+    app.salvar_catalogo([("ALINHAMENTO", 80.0), ("BALANCEAMENTO", 33.33)], [], [])
+    assert app.reajustar_catalogo(10) == 2
+    assert _contar("SELECT descricao,valor FROM catalogo_servicos ORDER BY id") == \
+        [("ALINHAMENTO", 88.0), ("BALANCEAMENTO", 36.66)]
+    # Meio centavo: 85,56 - 12,5% = 74,865 arredonda igual nos dois bancos
+    app.salvar_catalogo([], [("ALINHAMENTO", 85.56, 1)], [])
+    app.reajustar_catalogo(-12.5)
+    assert _contar("SELECT valor FROM catalogo_servicos WHERE id=1") == [(74.87,)]
+
+
+def test_migracao_6_copia_menus_e_mantem_coluna_antiga(banco):
+    migrar(ate=5)
+    csv = "🏠 Dashboard,💰 Orçamentos,🏠 Dashboard,,📋 Histórico"
+    with db.transacao() as c:
+        c.execute("INSERT INTO usuarios(username,nome,nivel,menus_permitidos) VALUES('ana','ANA','usuario',?)",
+                  (csv,))
+        c.execute("INSERT INTO usuarios(username,nome,nivel,menus_permitidos) VALUES('bia','BIA','usuario',NULL)")
+    migrar()
+    assert {m for (m,) in _contar("SELECT menu FROM usuario_menus WHERE usuario_id=1")} == \
+        {m for m in csv.split(",") if m}
+    assert _contar("SELECT COUNT(*) FROM usuario_menus WHERE usuario_id=2") == [(0,)]
+    assert _contar("SELECT menus_permitidos FROM usuarios WHERE id=1") == [(csv,)]
+
+
+def test_migracao_9_nao_une_placas_de_donos_diferentes(banco, caplog):
+    migrar(ate=8)
+    with db.transacao() as c:
+        c.executemany("INSERT INTO clientes(nome) VALUES(?)", [("A",), ("B",)])
+        c.executemany("INSERT INTO carros(cliente_id,placa,km) VALUES(?,?,?)",
+                      [(1, "ABC-1234", 5000), (2, "ABC1C34", 100), (1, "abc1234", 6000)])
+        c.executemany("INSERT INTO orcamentos(cliente_id,carro_id,status,total) VALUES(?,?,'PENDENTE',10)",
+                      [(1, 1), (2, 2)])
+    migrar()
+    # 1 e 3 são do mesmo dono e se unem no 3, o mais recente, que fica com a chave;
+    # o 2, de outro dono, continua com os seus orçamentos e recebe a chave com sufixo
+    assert _contar("SELECT id,cliente_id,placa_chave,km FROM carros ORDER BY id") == \
+        [(2, 2, "ABC1C34#2", 100), (3, 1, "ABC1C34", 6000)]
+    assert _contar("SELECT cliente_id,carro_id FROM orcamentos ORDER BY id") == [(1, 3), (2, 2)]
+    assert "ABC1C34#2" in caplog.text
+
+
+def test_catalogo_em_grade(banco, app):
+    import pandas as pd
+    migrar()
+    app.salvar_catalogo([("ALINHAMENTO", 80.0), ("BALANCEAMENTO", 40.0), ("LAVAGEM", 30.0)], [], [])
+    original = app.get_servicos.__wrapped__()[['id', 'descricao', 'valor']]
+    assert app.diff_catalogo(original, original.copy()) == ([], [], [], [])
+
+    # Como o st.data_editor devolve: linha alterada, linha excluída e linhas novas (id vazio) no fim
+    editado = original.copy()
+    editado.loc[editado['descricao'] == 'ALINHAMENTO', 'valor'] = 85.555
+    editado = editado[editado['descricao'] != 'LAVAGEM']
+    novas = pd.DataFrame({'id': [None, None], 'descricao': [' polimento ', ''], 'valor': [120, 10]})
+    editado = pd.concat([editado, novas], ignore_index=True)
+    novos, alterados, excluidos, erros = app.diff_catalogo(original, editado)
+    assert erros == ["Linha 4: descrição e valor maior que zero são obrigatórios"]
+    novos, alterados, excluidos, erros = app.diff_catalogo(original, editado.drop(index=3))
+    assert (novos, alterados, excluidos, erros) == ([("POLIMENTO", 120.0)], [("ALINHAMENTO", 85.56, 1)], [(3,)], [])
+
+    app.salvar_catalogo(novos, alterados, excluidos)
+    assert _contar("SELECT id,descricao,valor FROM catalogo_servicos ORDER BY id") == \
+        [(1, "ALINHAMENTO", 85.56), (2, "BALANCEAMENTO", 40.0), (4, "POLIMENTO", 120.0)]
+    assert app.reajustar_catalogo(-12.5) == 3
+    assert _contar("SELECT valor FROM catalogo_servicos ORDER BY id") == [(74.87,), (35.0,), (105.0,)]
+
+
+def test_permissoes_em_grade_ida_e_volta(banco, app):
+    migrar()
+    d, c, h = "🏠 Dashboard", "📚 Catálogo", "📜 Histórico"
+    assert app.salvar_usuario("ana", "ANA", "usuario", [d, c], senha="x")[0]
+    assert app.salvar_usuario("bia", "BIA", "usuario", [d], senha="x")[0]
+    original = app.get_matriz_permissoes.__wrapped__()
+    assert "📈 Desempenho" not in original.columns   # menu só de admin fica fora da grade
+    assert app.diff_permissoes(original, original.copy()) == ([], [])
+
+    editada = original.copy()
+    ana = editada.index[editada['username'] == 'ana'][0]
+    bia = editada.index[editada['username'] == 'bia'][0]
+    editada.at[ana, c] = False
+    editada.at[bia, h] = True
+    incluir, remover = app.diff_permissoes(original, editada)
+    assert (incluir, remover) == ([(2, h)], [(1, c)])
+    app.salvar_permissoes(incluir, remover)
+    assert app.menus_do_usuario.__wrapped__(1) == {d} and app.menus_do_usuario.__wrapped__(2) == {d, h}
+    relida = app.get_matriz_permissoes.__wrapped__()
+    assert app.diff_permissoes(relida, editada) == ([], [])
+
+    # E de volta ao original
+    app.salvar_permissoes(*app.diff_permissoes(relida, original))
+    assert app.diff_permissoes(app.get_matriz_permissoes.__wrapped__(), original) == ([], [])
+    assert app.menus_do_usuario.__wrapped__(1) == {d, c}
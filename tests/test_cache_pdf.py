@@ -0,0 +1,71 @@
+"""
+Cache de PDFs: versão pelo conteúdo, LRU em memória e limites do disco
+"""
+
+import os
+import time
+
+from oficina import db
+from oficina.cache_pdf import CachePDF
+from oficina.migracoes import migrar
+
+
+def _envelhecer(caminho, segundos):
+    t = time.time() - segundos
+    os.utime(caminho, (t, t))
+
+
+def test_lru_em_memoria():
+    c = CachePDF(max_itens=2)
+    c.guardar(1, "v", b"um"); c.guardar(2, "v", b"dois")
+    assert c.obter(1, "v") == b"um"          # 1 passa a ser o usado mais recentemente
+    c.guardar(3, "v", b"tres")
+    assert c.obter(2, "v") is None
+    assert (c.obter(1, "v"), c.obter(3, "v")) == (b"um", b"tres")
+    assert c.estatisticas() == {"hits": 3, "misses": 1, "itens": 2, "taxa_acerto": 0.75}
+
+
+def test_nova_versao_substitui_a_antiga(tmp_path):
+    c = CachePDF(diretorio=str(tmp_path))
+    c.guardar(1, "a", b"antigo"); c.guardar(2, "a", b"outro")
+    c.guardar(1, "b", b"novo")
+    assert c.obter(1, "a") is None and c.obter(1, "b") == b"novo"
+    assert sorted(os.listdir(tmp_path)) == ["1_b.pdf", "2_a.pdf"]
+
+
+def test_disco_sobrevive_ao_reinicio_e_despeja_o_menos_usado(tmp_path):
+    c = CachePDF(diretorio=str(tmp_path), max_arquivos=2)
+    c.guardar(1, "v", b"um"); c.guardar(2, "v", b"dois")
+    _envelhecer(tmp_path / "1_v.pdf", 100)
+    _envelhecer(tmp_path / "2_v.pdf", 50)
+    reiniciado = CachePDF(diretorio=str(tmp_path), max_arquivos=2)
+    assert reiniciado.obter(1, "v") == b"um"   # lido do disco: vira o mais recente
+    reiniciado.guardar(3, "v", b"tres")
+    assert sorted(os.listdir(tmp_path)) == ["1_v.pdf", "3_v.pdf"]
+
+
+def test_limite_de_bytes_no_disco(tmp_path):
+    c = CachePDF(diretorio=str(tmp_path), max_bytes=250)
+    for oid in (1, 2):
+        c.guardar(oid, "v", b"x" * 100)
+        _envelhecer(tmp_path / f"{oid}_v.pdf", 100 - oid)
+    c.guardar(3, "v", b"x" * 100)
+    assert sorted(os.listdir(tmp_path)) == ["2_v.pdf", "3_v.pdf"]
+    assert c.obter(1, "v") == b"x" * 100   # a memória tem limite próprio (max_itens)
+
+
+def test_edicao_do_orcamento_gera_outro_pdf(banco_sqlite, app):
+    migrar()
+    app.salvar_cliente("ANA", "", "", "")
+    app.salvar_carro(1, "ABC1234", "FIAT", "UNO", 0)
+    oid = app.salvar_orcamento(1, 1, "PENDENTE", "", [
+        {'servico_id': None, 'descricao': 'TROCA', 'quantidade': 1, 'valor_unitario': 50.0, 'subtotal': 50.0}])
+    c = CachePDF()
+    primeiro = app.gerar_pdf_orcamento(oid, c).getvalue()
+    assert app.gerar_pdf_orcamento(oid, c).getvalue() == primeiro
+    assert (c.hits, c.misses) == (1, 1)
+    with db.transacao() as cur:
+        cur.execute("UPDATE itens_orcamento SET quantidade=2, subtotal=100 WHERE orcamento_id=?", (oid,))
+    segundo = app.gerar_pdf_orcamento(oid, c).getvalue()
+    assert (c.hits, c.misses) == (1, 2) and segundo != primeiro
+    assert c.estatisticas()["itens"] == 1   # a versão antiga saiu
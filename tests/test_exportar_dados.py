@@ -0,0 +1,62 @@
+"""
+Exportação de serviços realizados e orçamentos em CSV e Parquet
+"""
+
+import io
+
+import pyarrow.parquet as pq
+import pytest
+
+from oficina import db, exportar_dados
+from oficina.migracoes import migrar
+
+
+@pytest.fixture
+def dados(banco, app):
+    migrar()
+    app.salvar_cliente("ANA", "", "", "")
+    app.salvar_carro(1, "ABC1234", "FIAT", "UNO", 0)
+    itens = [{'servico_id': None, 'descricao': d, 'quantidade': q, 'valor_unitario': v, 'subtotal': q * v}
+             for d, q, v in (("ÓLEO", 2, 12.5), ("FILTRO", 1, 40.0))]
+    app.salvar_orcamento(1, 1, "APROVADO", "obs", itens)
+    app.salvar_orcamento(1, 1, "PENDENTE", "", itens[:1])
+    with db.transacao() as c:
+        c.execute("UPDATE orcamentos SET data='2026-03-05 14:30'")
+        c.execute("UPDATE servicos_realizados SET data='2026-03-05 14:30'")
+
+
+def _csv(conjunto, **filtros):
+    f = io.BytesIO()
+    n = exportar_dados.exportar(f, conjunto, "csv", **filtros)
+    texto = f.getvalue().decode("utf-8")
+    assert texto.startswith("\ufeff")
+    return n, [l.split(";") for l in texto[1:].splitlines()]
+
+
+def test_csv(dados):
+    n, linhas = _csv("servicos")
+    cab, *corpo = linhas
+    assert cab == exportar_dados.CONJUNTOS["servicos"]["esquema"].names
+    assert n == len(corpo) == 2
+    assert [dict(zip(cab, l)) for l in corpo][0] == {
+        "servico_id": "1", "data": "2026-03-05 14:30", "orcamento_id": "1", "cliente": "ANA",
+        "placa": "ABC1234", "marca": "FIAT", "modelo": "UNO", "total": "65,0", "observacoes": "obs",
+        "item": "ÓLEO", "quantidade": "2", "valor_unitario": "12,5", "subtotal": "25,0"}
+
+
+def test_csv_sem_linhas_tem_cabecalho(dados):
+    n, linhas = _csv("orcamentos", status=["RECUSADO"])
+    assert n == 0
+    assert linhas == [exportar_dados.CONJUNTOS["orcamentos"]["esquema"].names]
+
+
+@pytest.mark.parametrize("status, linhas", [(None, 3), (["PENDENTE"], 1), (["RECUSADO"], 0)])
+def test_parquet(dados, status, linhas):
+    f = io.BytesIO()
+    assert exportar_dados.exportar(f, "orcamentos", "parquet", status=status, tamanho=2) == linhas
+    t = pq.read_table(io.BytesIO(f.getvalue()))
+    assert t.schema.equals(exportar_dados.CONJUNTOS["orcamentos"]["esquema"], check_metadata=False)
+    assert t.num_rows == linhas
+    if linhas:
+        assert t.column("subtotal").to_pylist()[:linhas] == [25.0, 40.0, 25.0][:linhas]
+        assert t.column("data").to_pylist()[0] == "2026-03-05 14:30"
@@ -0,0 +1,39 @@
+"""
+Formatação vetorizada (oficina.formatos_series) contra as funções por valor (oficina.formatos)
+"""
+
+import random
+
+import pandas as pd
+import pytest
+
+from oficina.formatos import fmt_data, fmt_km, fmt_moeda
+from oficina.formatos_series import fmt_data_series, fmt_km_series, fmt_moeda_series
+
+
+def _valores_moeda():
+    fixos = [0.0, -0.0, 0.005, 0.015, 1.115, 12.345, 0.125, 0.375, -2.675, -0.001, 1e-20,
+             3 * 33.33, 1234567.891, 999.995, -1000000.0, 2.0 ** 53]
+    rnd = random.Random(12)
+    # Subtotais como os do app: quantidade × valor unitário
+    return fixos + [rnd.randint(1, 40) * round(rnd.uniform(0, 5000), rnd.choice((2, 3))) for _ in range(2000)]
+
+
+def test_fmt_moeda_series_igual_a_fmt_moeda():
+    s = pd.Series(_valores_moeda())
+    assert fmt_moeda_series(s).tolist() == [fmt_moeda(v) for v in s]
+
+
+def test_fmt_moeda_series_nulos():
+    assert fmt_moeda_series(pd.Series([1.5, None])).tolist() == ["R$ 1,50", pd.NA]
+
+
+@pytest.mark.parametrize("valores", [[0, 999, 1000, 1234567, -45000], [12.9, "abc", None]])
+def test_fmt_km_series_igual_a_fmt_km(valores):
+    s = pd.Series(valores, dtype=object)
+    assert fmt_km_series(s).tolist() == [fmt_km(v) for v in s]
+
+
+def test_fmt_data_series_igual_a_fmt_data():
+    s = pd.Series(["2026-01-31 08:05:00", "2026-02-01", "31/01/2026"])
+    assert fmt_data_series(s).tolist() == [fmt_data(v) for v in s]
@@ -0,0 +1,54 @@
+"""
+Importação em lote: linhas recusadas pelo banco e transação única por lote
+"""
+
+import pytest
+
+from oficina import db
+from oficina.importar import _Carros, _gravar_lote, importar
+from oficina.migracoes import migrar
+
+
+def _carro(placa):
+    return (1, placa, placa, "FIAT", "UNO", 0)
+
+
+def _placas():
+    conn = db.get_conn()
+    try: return [p for (p,) in conn.execute("SELECT placa FROM carros ORDER BY id")]
+    finally: conn.close()
+
+
+@pytest.fixture
+def com_carro(banco):
+    migrar()
+    with db.transacao() as c:
+        c.execute("INSERT INTO clientes(nome) VALUES('ANA')")
+        c.execute("INSERT INTO carros(cliente_id,placa,placa_chave,marca,modelo,km) VALUES(?,?,?,?,?,?)",
+                  _carro("ABC1234"))
+
+
+def test_linha_repetida_vai_para_erros(com_carro):
+    # A placa já existe no banco (ex.: gravada por outra sessão depois da validação)
+    erros = []
+    lote = [(2, _carro("AAA1111")), (3, _carro("ABC1234")), (4, _carro("BBB2222"))]
+    assert _gravar_lote(_Carros.sql, lote, erros) == 2
+    assert [n for n, _ in erros] == [3]
+    assert _placas() == ["ABC1234", "AAA1111", "BBB2222"]
+
+
+def test_erro_no_meio_do_lote_nao_grava_nada(com_carro):
+    lote = [(2, _carro("AAA1111")), (3, _carro("ABC1234")), (4, (1, "BBB2222")), (5, _carro("CCC3333"))]
+    with pytest.raises(Exception):
+        _gravar_lote(_Carros.sql, lote, [])
+    assert _placas() == ["ABC1234"]
+
+
+def test_importar_csv(com_carro, tmp_path):
+    arq = tmp_path / "carros.csv"
+    arq.write_text("placa;marca;modelo;km;cliente_id\nxyz-9876;fiat;uno;1.000;1\nabc1234;fiat;uno;;1\n"
+                   "QWE1234;;uno;;1\n", encoding="utf-8")
+    res = importar("carros", str(arq))
+    assert (res["lidas"], res["gravadas"]) == (3, 1)
+    assert [n for n, _ in res["erros"]] == [3, 4]
+    assert _placas() == ["ABC1234", "XYZ9876"]
@@ -0,0 +1,71 @@
+"""
+Tarefas em segundo plano: dono, sinal de vida e retomada das interrompidas
+"""
+
+import pytest
+
+from oficina import db, jobs
+from oficina.migracoes import migrar
+
+
+def _tarefa_teste(destino, progresso, texto=""):
+    with open(destino, "w", encoding="utf-8") as f:
+        f.write(texto)
+    return "teste.txt", "text/plain", texto
+
+
+jobs.registrar("teste", _tarefa_teste)
+
+
+@pytest.fixture
+def fila(banco, tmp_path, monkeypatch):
+    migrar()
+    monkeypatch.setattr(jobs, "PASTA", str(tmp_path / "jobs"))
+    yield
+    jobs.parar()
+
+
+def _inserir(status, dono, atualizado_em, tentativas=0):
+    with db.transacao() as c:
+        return c.execute("""INSERT INTO jobs(tipo,parametros,status,dono,tentativas,criado_em,atualizado_em)
+                            VALUES('teste','{"texto": "ok"}',?,?,?,?,?) RETURNING id""",
+                         (status, dono, tentativas, atualizado_em, atualizado_em)).fetchone()[0]
+
+
+def test_enviar_e_concluir(fila):
+    jid = jobs.enviar("teste", texto="abc")
+    job = jobs.aguardar(jid, 10)
+    assert (job["status"], job["resumo"], job["dono"], job["tentativas"]) == ("CONCLUIDO", "abc", jobs.INSTANCIA, 1)
+
+
+def test_assume_tarefa_de_dono_parado(fila):
+    antigo = jobs._agora(-2 * jobs.ABANDONO)
+    jid = _inserir("EXECUTANDO", "outro-processo", antigo, tentativas=1)
+    pendente = _inserir("PENDENTE", None, antigo)   # de antes da migração 14
+    assert jobs.retomar() == [jid, pendente]
+    for j in (jid, pendente):
+        job = jobs.aguardar(j, 10)
+        assert (job["status"], job["dono"]) == ("CONCLUIDO", jobs.INSTANCIA)
+    assert jobs.consultar(jid)["tentativas"] == 2
+
+
+def test_sinal_de_vida_sem_progresso(fila):
+    # Dono vivo: o batimento renova a tarefa mesmo sem progresso() e ninguém a assume
+    jid = _inserir("EXECUTANDO", jobs.INSTANCIA, jobs._agora(-2 * jobs.ABANDONO), tentativas=1)
+    jobs._bater()
+    assert jobs.retomar() == []
+    assert jobs.consultar(jid)["status"] == "EXECUTANDO"
+
+
+def test_desiste_depois_de_max_tentativas(fila):
+    jid = _inserir("EXECUTANDO", "outro-processo", jobs._agora(-2 * jobs.ABANDONO),
+                   tentativas=jobs.MAX_TENTATIVAS)
+    assert jobs.retomar() == []
+    job = jobs.consultar(jid)
+    assert job["status"] == "ERRO" and job["expira_em"]
+
+
+def test_limpar_expirados_sem_expiracao(fila):
+    jid = _inserir("ERRO", "outro-processo", jobs._agora(-2 * jobs.TTL_RESULTADO))
+    assert jobs.limpar_expirados() == 1
+    assert jobs.consultar(jid) is None
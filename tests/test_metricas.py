@@ -0,0 +1,32 @@
+"""
+Log JSON-lines das métricas: só um nome de arquivo dentro de PASTA_LOG
+"""
+
+import json
+
+import pytest
+
+from oficina import metricas
+
+
+@pytest.fixture
+def pasta_log(tmp_path, monkeypatch):
+    monkeypatch.setattr(metricas, "PASTA_LOG", str(tmp_path / "metricas"))
+    yield tmp_path / "metricas"
+    metricas.configurar_log(None)
+
+
+@pytest.mark.parametrize("nome", ["../fora.jsonl", "/tmp/fora.jsonl", "sub/dentro.jsonl", ".."])
+def test_recusa_caminhos(pasta_log, nome):
+    with pytest.raises(ValueError):
+        metricas.configurar_log(nome)
+    assert metricas.arquivo_log() is None
+
+
+def test_grava_na_pasta_do_log(pasta_log):
+    metricas.configurar_log("m.jsonl")
+    assert metricas.arquivo_log() == str(pasta_log / "m.jsonl")
+    with metricas.medir_pagina("teste"):
+        pass
+    metricas.configurar_log(None)
+    assert json.loads((pasta_log / "m.jsonl").read_text(encoding="utf-8"))["pagina"] == "teste"
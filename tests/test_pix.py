@@ -0,0 +1,54 @@
+"""
+PIX: CRC16 por tabela contra a versão bit a bit original e payload BRCode
+"""
+
+import random
+
+import pytest
+
+from oficina import pix
+
+
+def _crc16_bit_a_bit(data):
+    """Implementação original (laço de 8 bits por byte), referência do CRC16-CCITT"""
+    crc = 0xFFFF
+    for byte in data.encode('utf-8'):
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = (crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return f"{crc:04X}"
+
+
+def test_crc16_valor_conhecido():
+    assert pix.crc16_ccitt("123456789") == "29B1"   # CRC-16/CCITT-FALSE
+    assert pix.crc16_ccitt("") == "FFFF"
+
+
+def test_crc16_igual_ao_bit_a_bit():
+    rnd = random.Random(7)
+    textos = ["".join(rnd.choice("0123456789ABCDEFGHIJ.*-/ çãéÓ") for _ in range(rnd.randint(1, 300)))
+              for _ in range(300)]
+    for t in textos + [pix.payload_pix("19995056708", 123.45)[:-4]]:
+        assert pix.crc16_ccitt(t) == _crc16_bit_a_bit(t)
+
+
+@pytest.mark.parametrize("chave, valor", [("(19) 99505-6708", 150.0), ("oficina@exemplo.com", 0.1),
+                                          ("123.456.789-09", 1234.5)])
+def test_payload_termina_no_crc_dele(chave, valor):
+    p = pix.payload_pix(chave, valor, "Oficina do Zé")
+    assert p[-8:-4] == "6304"
+    assert p[-4:] == _crc16_bit_a_bit(p[:-4])
+    assert f"54{len(f'{valor:.2f}'):02d}{valor:.2f}" in p
+
+
+def test_payload_telefone():
+    p = pix.payload_pix("(19) 99505-6708", 150.0)
+    assert "0114+5519995056708" in p and p == pix.payload_pix("(19) 99505-6708", 150.0)
+
+
+def test_qrcode_devolve_buffer_novo():
+    pytest.importorskip("qrcode")
+    a, b = pix.gerar_qrcode_pix("19995056708", 10.0), pix.gerar_qrcode_pix("19995056708", 10.0)
+    a.read()
+    assert b.read(8) == b"\x89PNG\r\n\x1a\n"
@@ -0,0 +1,42 @@
+"""
+Planos das consultas quentes (migracoes.CONSULTAS_INDEXADAS) antes e depois das migrações
+"""
+
+import pytest
+
+from benchmarks import gerar_dados
+from oficina import db
+from oficina.migracoes import CONSULTAS_INDEXADAS, migrar, plano_indexado, planos_consultas
+
+
+@pytest.fixture
+def conn(banco_sqlite):
+    conn = db.get_conn()
+    yield conn
+    conn.close()
+
+
+def test_sem_indices_varre(conn):
+    migrar(conn, ate=1)
+    planos = planos_consultas(conn)
+    assert not planos["get_carros_por_cliente"][0]
+    assert not planos["itens do PDF"][0]
+
+
+@pytest.mark.parametrize("nome", CONSULTAS_INDEXADAS)
+def test_usa_indice_depois_de_migrar(conn, nome):
+    # Com dados e ANALYZE, para o planejador escolher como escolheria em produção
+    gerar_dados.gerar(2000)
+    ok, linhas = planos_consultas(conn)[nome]
+    assert ok, " | ".join(linhas)
+
+
+@pytest.mark.parametrize("sql, linhas, ok", [
+    ("SELECT * FROM t ORDER BY a LIMIT ?", ["SCAN t USING INDEX idx_a"], True),
+    ("SELECT * FROM t ORDER BY a", ["SCAN t USING INDEX idx_a"], False),
+    ("SELECT * FROM t ORDER BY a LIMIT ?", ["SCAN t"], False),
+    ("SELECT * FROM t ORDER BY a LIMIT ?", ["SCAN t", "USE TEMP B-TREE FOR ORDER BY"], False),
+    ("SELECT * FROM t WHERE a=?", ["SEARCH t USING INDEX idx_a (a=?)"], True),
+])
+def test_regra_do_plano(sql, linhas, ok):
+    assert plano_indexado(sql, linhas) == ok
@@ -0,0 +1,90 @@
+"""
+Backend PostgreSQL: tradução dos parâmetros, trava de escrita, cursor no servidor e LISTEN/NOTIFY
+"""
+
+import threading
+import time
+
+import pytest
+
+from oficina import cache_consultas, db
+from oficina.migracoes import migrar
+
+psycopg2 = pytest.importorskip("psycopg2")
+from oficina import postgres  # noqa: E402  (depende do psycopg2)
+
+
+@pytest.mark.parametrize("sqlite, pg", [
+    ("SELECT * FROM t WHERE a=? AND b=?", "SELECT * FROM t WHERE a=%s AND b=%s"),
+    ("SELECT '?' , \"col?\" FROM t WHERE a=?", "SELECT '?' , \"col?\" FROM t WHERE a=%s"),
+    ("SELECT 'it''s ?' WHERE a=?", "SELECT 'it''s ?' WHERE a=%s"),
+    ("SELECT * FROM t WHERE d LIKE ? || '%'", "SELECT * FROM t WHERE d LIKE %s || '%%'"),
+    ("SELECT 10 % 3, ?", "SELECT 10 %% 3, %s"),
+])
+def test_traduzir(sqlite, pg):
+    assert postgres.traduzir(sqlite) == pg
+
+
+def test_parametros_e_literais_com_porcentagem(banco_postgres):
+    migrar()
+    with db.transacao() as c:
+        c.execute("INSERT INTO configuracoes(chave,valor) VALUES(?,'50% ?')", ("a?",))
+    conn = db.get_conn()
+    try:
+        assert conn.execute("SELECT chave,valor FROM configuracoes WHERE valor LIKE '50%' AND chave=?",
+                            ("a?",)).fetchall() == [("a?", "50% ?")]
+        # Sem parâmetros o texto vai direto ao psycopg2, sem tradução
+        assert conn.execute("SELECT COUNT(*) FROM configuracoes WHERE valor LIKE '%?'").fetchone() == (1,)
+    finally:
+        conn.close()
+
+
+def test_iniciar_escrita_exclui_outra_conexao(banco_postgres):
+    migrar()
+    a, b = db.get_conn(), db.get_conn()
+    try:
+        db.iniciar_escrita(a, "teste")
+        assert not b.execute("SELECT pg_try_advisory_xact_lock(hashtext(?))", ("teste",)).fetchone()[0]
+        b.rollback()
+        a.commit()   # fim da transação libera a trava
+        assert b.execute("SELECT pg_try_advisory_xact_lock(hashtext(?))", ("teste",)).fetchone()[0]
+        b.rollback()
+    finally:
+        a.close(); b.close()
+
+
+def test_pool_espera_conexao_livre(banco_postgres):
+    conns = [db.get_conn() for _ in range(db.POOL_MAX)]
+    obtida = []
+    t = threading.Thread(target=lambda: obtida.append(db.get_conn()))
+    t.start()
+    time.sleep(0.2)
+    assert not obtida          # pool cheio: espera em vez de PoolError
+    conns.pop().close()
+    t.join(5)
+    assert obtida
+    for c in conns + obtida: c.close()
+
+
+def test_ler_em_blocos_usa_cursor_no_servidor(banco_postgres):
+    migrar()
+    with db.transacao() as c:
+        c.executemany("INSERT INTO clientes(nome) VALUES(?)", [(f"C{i}",) for i in range(25)])
+    blocos = list(db.ler_em_blocos("SELECT id,nome FROM clientes WHERE id > ? ORDER BY id", (0,), tamanho=10))
+    assert [len(b) for b in blocos] == [10, 10, 5]
+    assert list(blocos[0].columns) == ["id", "nome"]
+
+
+def test_invalidacao_de_outra_replica(banco_postgres):
+    migrar()
+    db.get_conn().close()   # abre o pool e a thread de LISTEN
+    geracao = cache_consultas._geracoes["clientes"]
+    outra = psycopg2.connect(db.DB)
+    outra.autocommit = True
+    fim = time.monotonic() + 10
+    # A thread pode ainda estar conectando: repete o aviso até ele chegar
+    while cache_consultas._geracoes["clientes"] == geracao and time.monotonic() < fim:
+        outra.cursor().execute("SELECT pg_notify(%s, %s)", (postgres.CANAL, "outra-replica:clientes"))
+        time.sleep(0.2)
+    outra.close()
+    assert cache_consultas._geracoes["clientes"] > geracao